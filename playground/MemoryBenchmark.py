@@ -0,0 +1,50 @@
+# ad-hoc script for seeing how much memory it takes to hold a whole corpus in memory, the way `dry search -i` does
+# run it on a project's corpus dir, before and after a change to the Line/Row/Cell classes, and compare the numbers
+# e.g. `python playground/MemoryBenchmark.py projects/Daool --no-cache`
+
+from drybones.ReadingUtil import get_lines_from_all_drybones_files_in_dir
+import argparse
+import gc
+import resource
+import sys
+import time
+from pathlib import Path
+
+
+def get_rss_bytes():
+    # current resident set size (Linux), or the peak if /proc isn't there (macOS reports ru_maxrss in bytes, Linux in KiB)
+    try:
+        with open("/proc/self/status") as f:
+            for l in f:
+                if l.startswith("VmRSS:"):
+                    return int(l.split()[1]) * 1024
+    except OSError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus_dir", type=Path)
+parser.add_argument("--no-cache", action="store_true", help="parse every file instead of loading from the parse cache")
+parser.add_argument("-j", "--workers", type=int, default=1)
+args = parser.parse_args()
+
+gc.collect()
+rss_before = get_rss_bytes()
+t0 = time.perf_counter()
+lines = get_lines_from_all_drybones_files_in_dir(args.corpus_dir, use_cache=not args.no_cache, n_workers=args.workers)
+t1 = time.perf_counter()
+gc.collect()
+rss_after = get_rss_bytes()
+
+n_rows = sum(len(line.rows) for line in lines)
+n_cells = sum(len(row.cells) for line in lines for row in line.rows)
+n_strs = sum(len(cell.strs) for line in lines for row in line.rows for cell in row.cells)
+n_distinct_strs = len({id(s) for line in lines for row in line.rows for cell in row.cells for s in cell.strs})
+n_distinct_labels = len({id(row.label) for line in lines for row in line.rows})
+mib = (rss_after - rss_before) / (1 << 20)
+
+print(f"loaded {len(lines)} lines, {n_rows} rows, {n_cells} cells in {t1 - t0:.2f} s", file=sys.stderr)
+print(f"{n_strs} cell strings, {n_distinct_strs} distinct string objects, {n_distinct_labels} distinct RowLabel objects", file=sys.stderr)
+print(f"resident size grew by {mib:.1f} MiB ({(rss_after - rss_before) / max(1, len(lines)):.0f} bytes per line)", file=sys.stderr)
@@ -0,0 +1,55 @@
+# ad-hoc script for timing the things that hash and compare RowLabels the most: loading a corpus, looking up rows by label, and building the known analyses
+# run it from inside a project (get_known_analyses reads the project's diacritics.conf), before and after a change to RowLabel, and compare the numbers
+# e.g. `cd projects/Daool && python ../../playground/RowLabelBenchmark.py . --no-cache`
+
+from drybones.AnalysisUtil import get_known_analyses
+from drybones.ReadingUtil import get_lines_from_all_drybones_files_in_dir
+from drybones.RowLabel import RowLabel, DEFAULT_ROW_LABELS, DEFAULT_BASELINE_LABEL
+import argparse
+import sys
+import time
+from pathlib import Path
+
+
+def timed(description, func):
+    t0 = time.perf_counter()
+    result = func()
+    t1 = time.perf_counter()
+    print(f"{description}: {t1 - t0:.3f} s", file=sys.stderr)
+    return result
+
+
+def look_up_every_label(lines, n_reps):
+    # what commands do when they go through a corpus looking for particular rows
+    n_found = 0
+    for _ in range(n_reps):
+        for line in lines:
+            for label in DEFAULT_ROW_LABELS:
+                if line[label] is not None:
+                    n_found += 1
+    return n_found
+
+
+def hash_labels_of_every_row(lines):
+    # e.g. tallying which labels are used in the corpus
+    counts = {}
+    for line in lines:
+        for row in line.rows:
+            counts[row.label] = counts.get(row.label, 0) + 1
+    return counts
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus_dir", type=Path)
+parser.add_argument("--no-cache", action="store_true", help="parse every file instead of loading from the parse cache")
+parser.add_argument("-j", "--workers", type=int, default=1)
+parser.add_argument("-n", "--reps", type=int, default=5, help="how many times to go through the corpus looking up labels")
+args = parser.parse_args()
+
+lines = timed("load corpus", lambda: get_lines_from_all_drybones_files_in_dir(args.corpus_dir, use_cache=not args.no_cache, n_workers=args.workers))
+timed(f"look up {len(DEFAULT_ROW_LABELS)} labels in {len(lines)} lines x{args.reps}", lambda: look_up_every_label(lines, args.reps))
+timed("count labels of every row", lambda: hash_labels_of_every_row(lines))
+# labels made separately from the ones in the loaded lines, so lookups can't just compare identity
+fresh_label = RowLabel(DEFAULT_BASELINE_LABEL.string, aligned=True)
+timed("look up a non-shared label in every line", lambda: sum(line[fresh_label] is not None for line in lines))
+timed("build known analyses", lambda: get_known_analyses(lines))
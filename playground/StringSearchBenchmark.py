@@ -0,0 +1,64 @@
+# ad-hoc script for timing plain string search (the default `dry search` mode) on the longest rows of a corpus, e.g. Translation and Note rows
+# compares the old way of finding matches (comparing a slice at every index of the row) with str.find, and for several strings at once,
+# str.find once per string with one trie-shaped regex of all of them (what search macros use; a pure-Python Aho-Corasick matcher was about 4x slower than the regex)
+# e.g. `cd projects/Daool && python ../../playground/StringSearchBenchmark.py . the a -l Translation Note`
+
+from drybones.SearchMacros import get_trie_regex
+from drybones.SearchUtil import get_string_matches, get_regex_matches
+from drybones.ReadingUtil import get_lines_from_all_drybones_files_in_dir
+from drybones.StringMatch import StringMatch
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+
+def timed(description, func):
+    t0 = time.perf_counter()
+    result = func()
+    t1 = time.perf_counter()
+    print(f"{description}: {t1 - t0:.3f} s", file=sys.stderr)
+    return result
+
+
+def get_string_matches_by_slicing(pattern, test_string):
+    # what get_string_matches used to do; note that it also finds overlapping matches
+    matches = []
+    for i in range(len(test_string) - len(pattern) + 1):
+        substring = test_string[i : i+len(pattern)]
+        if substring == pattern:
+            matches.append(StringMatch(test_string, i, i+len(pattern)))
+    return matches
+
+
+def search_rows(rows, n_reps, match_func):
+    n_matches = 0
+    for _ in range(n_reps):
+        for s in rows:
+            n_matches += len(match_func(s))
+    return n_matches
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus_dir", type=Path)
+parser.add_argument("patterns", nargs="+", help="strings to search for; each one is timed on its own, and then all of them at once")
+parser.add_argument("-l", "--labels", nargs="+", default=["Translation", "Note"], help="labels of the rows to search in")
+parser.add_argument("-n", "--reps", type=int, default=5, help="how many times to go through the rows")
+args = parser.parse_args()
+
+lines = timed("load corpus", lambda: get_lines_from_all_drybones_files_in_dir(args.corpus_dir))
+rows = [row.get_contents() for line in lines for row in line.rows if row.label.string in args.labels]
+# also the same rows joined into a few very long strings, like notes that go on for paragraphs
+long_rows = [" ".join(rows[i : i+100]) for i in range(0, len(rows), 100)]
+print(f"{len(rows)} rows, average length {sum(len(s) for s in rows) / max(1, len(rows)):.1f} chars", file=sys.stderr)
+
+for name, these_rows in [("rows", rows), ("rows joined by 100", long_rows)]:
+    for pattern in args.patterns:
+        n_old = timed(f"{name}, {pattern!r}, slicing", lambda: search_rows(these_rows, args.reps, lambda s: get_string_matches_by_slicing(pattern, s)))
+        n_new = timed(f"{name}, {pattern!r}, str.find", lambda: search_rows(these_rows, args.reps, lambda s: get_string_matches(pattern, s, full_match=False)))
+        print(f"    matches: {n_old} (slicing, with overlaps) vs {n_new} (str.find)", file=sys.stderr)
+    if len(args.patterns) > 1:
+        pattern = re.compile(get_trie_regex(args.patterns))
+        timed(f"{name}, all patterns, str.find once per pattern", lambda: search_rows(these_rows, args.reps, lambda s: [m for p in args.patterns for m in get_string_matches(p, s, full_match=False)]))
+        timed(f"{name}, all patterns, trie regex", lambda: search_rows(these_rows, args.reps, lambda s: get_regex_matches(pattern, s, full_match=False)))
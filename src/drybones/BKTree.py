@@ -0,0 +1,107 @@
+# a BK-tree of the distinct words and morphemes in the corpus (the tokens of the search index), for fuzzy `dry search` queries like f2/omore
+# every word in the tree is under its parent at its edit distance from the parent, so by the triangle inequality,
+# a word within distance k of the query can only be under the children at distances d-k to d+k, where d is the query's distance from the parent;
+# most of the tree is skipped, so a fuzzy query only computes the distance to a small part of the vocabulary, and never to every token in the corpus
+# the matching words are mapped back to the rows they're in by the search index's postings
+
+import pickle
+import random
+from typing import List, Tuple
+
+from drybones.ParseCache import write_atomically
+from drybones.SearchIndex import load_pickle_or_none
+
+
+class BKTree:
+    FORMAT_VERSION = 1  # bump this whenever build_bk_tree() changes what it stores
+
+    def __init__(self, words: List[str], children: List[dict]):
+        self.words = words  # node id -> word; node 0 is the root
+        self.children = children  # node id -> {edit distance: child node id}
+
+    def __len__(self):
+        return len(self.words)
+
+    def add(self, word: str) -> None:
+        if len(self.words) == 0:
+            self.words.append(word)
+            self.children.append({})
+            return
+        node = 0
+        while True:
+            d = get_edit_distance(word, self.words[node])
+            if d == 0:
+                # already in the tree
+                return
+            child = self.children[node].get(d)
+            if child is None:
+                self.children[node][d] = len(self.words)
+                self.words.append(word)
+                self.children.append({})
+                return
+            node = child
+
+    def find(self, word: str, max_distance: int) -> List[Tuple[int, str]]:
+        # (edit distance, word) for every word in the tree within max_distance of word, closest first
+        if len(self.words) == 0:
+            return []
+        results = []
+        nodes_to_check = [0]
+        while len(nodes_to_check) > 0:
+            node = nodes_to_check.pop()
+            d = get_edit_distance(word, self.words[node])
+            if d <= max_distance:
+                results.append((d, self.words[node]))
+            for child_d, child in self.children[node].items():
+                if d - max_distance <= child_d <= d + max_distance:
+                    nodes_to_check.append(child)
+        return sorted(results)
+
+    def to_state(self) -> tuple:
+        return (self.words, self.children)
+
+    @staticmethod
+    def from_state(state: tuple):
+        return BKTree(*state)
+
+
+def get_bk_tree(search_index) -> BKTree:
+    # kept in memory on the search index for the rest of the session (or the daemon's life), and on disk with the index like the concordance
+    if search_index.bk_tree is not None:
+        return search_index.bk_tree
+    fp = None if search_index.search_dir is None else search_index.search_dir / f"bktree-{search_index.corpus_key}-{BKTree.FORMAT_VERSION}.pickle"
+    state = None if fp is None else load_pickle_or_none(fp)
+    if state is not None:
+        bk_tree = BKTree.from_state(state)
+    else:
+        bk_tree = build_bk_tree(search_index.postings.keys())
+        if fp is not None:
+            write_atomically(fp, pickle.dumps(bk_tree.to_state(), protocol=pickle.HIGHEST_PROTOCOL))
+    search_index.bk_tree = bk_tree
+    return bk_tree
+
+
+def build_bk_tree(words) -> BKTree:
+    bk_tree = BKTree([], [])
+    # in a fixed shuffled order, since adding the words in sorted order puts similar words one under another and makes the tree deep
+    words = sorted(words)
+    random.Random(0).shuffle(words)
+    for word in words:
+        bk_tree.add(word)
+    return bk_tree
+
+
+def get_edit_distance(a: str, b: str) -> int:
+    # Levenshtein distance, keeping only one row of the table at a time
+    # (StringValidation.levenshtein() builds the whole table, which is fine for text names but not for looking through the vocabulary)
+    if len(a) < len(b):
+        a, b = b, a
+    if len(b) == 0:
+        return len(a)
+    previous_row = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current_row = [i]
+        for j, char_b in enumerate(b, 1):
+            current_row.append(min(previous_row[j] + 1, current_row[j-1] + 1, previous_row[j-1] + (char_a != char_b)))
+        previous_row = current_row
+    return previous_row[-1]
@@ -0,0 +1,235 @@
+# `dry search` queries that combine several (row query, text query) terms with AND, OR, NOT, and parentheses, and match whole lines
+# e.g. `Gloss fut AND Translation r/will AND NOT Judgment *` is every line with "fut" in its gloss and "will" in its translation that isn't marked ungrammatical
+# the terms of an AND are run from the cheapest to the most expensive (judging by how many rows the search index says each one would have to look at),
+# and each term after the first only looks at the rows of the lines that are still left, so an expensive regex only runs on the few lines that got through the other terms
+# the query tree is made of tuples: (TERM, row query, text query), (AND, children), (OR, children), (NOT, child), where children is a tuple of trees
+
+import re
+import shlex
+from typing import Iterator, List, Tuple
+
+from drybones.SearchUtil import get_search_plan, iter_text_matches_in_index, is_regex_is_match
+
+
+TERM = "term"
+AND_KEYWORD = "AND"
+OR_KEYWORD = "OR"
+NOT_KEYWORD = "NOT"
+OPEN_PAREN = "("
+CLOSE_PAREN = ")"
+KEYWORDS = [AND_KEYWORD, OR_KEYWORD, NOT_KEYWORD, OPEN_PAREN, CLOSE_PAREN]
+
+REGEX_COST_FACTOR = 4  # running a regex on a row costs about this many times as much as looking for a plain string in it
+
+
+class BooleanQuery:
+    def __init__(self, tree: tuple, text: str):
+        self.tree = tree
+        self.text = text  # what the user typed
+
+    def __str__(self):
+        return self.text
+
+    def get_key(self) -> tuple:
+        # the same for queries that are the same except for spacing and quoting
+        return self.tree
+
+    def iter_matches(self, search_index, within_line_ids: set|None=None, pool=None, patterns: dict|None=None) -> Iterator[Tuple[int, List[Tuple[int, int]]]]:
+        # (row id, spans of the row's contents as in the file) for the rows of the matching lines that matched a term, in corpus order
+        # a line that matches only because of NOTs (e.g. `NOT Judgment *`) has no term to highlight, so its first row is given with no spans
+        # pool is a SearchShardPool for the terms to be run in, as in SearchUtil.iter_text_matches_in_index(); patterns is the terms' compiled regexes, as in SearchUtil.iter_search_matches()
+        search_plans = {}
+        line_ids = get_line_ids(self.tree, search_index, within_line_ids, search_plans, pool=pool, patterns=patterns)
+        spans_by_row_id = {}
+        for term in iter_positive_terms(self.tree):
+            for row_id, spans in iter_term_matches(term, search_index, line_ids, search_plans, pool=pool, patterns=patterns):
+                spans_by_row_id.setdefault(row_id, []).extend(spans)
+        line_first_row_ids = search_index.get_line_first_row_ids()
+        row_line_ids = search_index.get_row_line_ids()
+        lines_with_spans = {row_line_ids[row_id] for row_id in spans_by_row_id}
+        for line_id in line_ids - lines_with_spans:
+            spans_by_row_id[line_first_row_ids[line_id]] = []
+        for row_id in sorted(spans_by_row_id):
+            yield row_id, search_index.get_original_spans(row_id, merge_spans(spans_by_row_id[row_id]))
+
+    def map_terms(self, func):
+        # a copy of the query with func((row query, text query)) -> (row query, text query) applied to every term, e.g. to expand search macros
+        return BooleanQuery(map_terms(self.tree, func), self.text)
+
+    def has_matches_in_lines(self, search_index, line_ids: set, pool=None, patterns: dict|None=None) -> bool:
+        # pool and patterns as in iter_matches(), so a regex term that runs too long is cancelled here too
+        return len(get_line_ids(self.tree, search_index, line_ids, {}, pool=pool, patterns=patterns)) > 0
+
+
+def is_boolean_query(tokens: List[str]) -> bool:
+    return any(token in KEYWORDS for token in tokens)
+
+
+def parse_boolean_query(s: str) -> BooleanQuery:
+    # raises ValueError if it's not a valid query
+    # parentheses have to be separate words, so they don't get mixed up with the ones in regexes; to search for one of the keywords themselves, use s/ (e.g. s/AND)
+    tokens = shlex.split(s)
+    tree, i = parse_or(tokens, 0)
+    if i != len(tokens):
+        raise ValueError(f"unexpected {tokens[i]!r} in query")
+    for _, _, text_query in iter_terms(tree):
+        text_query_is_regex, _, text_query_stripped = is_regex_is_match(text_query)
+        if text_query_is_regex:
+            # so an invalid regex fails before anything is searched
+            try:
+                re.compile(text_query_stripped)
+            except re.error as e:
+                raise ValueError(f"invalid regex {text_query_stripped!r}: {e}")
+    return BooleanQuery(tree, s)
+
+
+def parse_or(tokens: List[str], i: int) -> Tuple[tuple, int]:
+    children = []
+    while True:
+        child, i = parse_and(tokens, i)
+        children.append(child)
+        if i < len(tokens) and tokens[i] == OR_KEYWORD:
+            i += 1
+        else:
+            break
+    return (children[0] if len(children) == 1 else (OR_KEYWORD, tuple(children))), i
+
+
+def parse_and(tokens: List[str], i: int) -> Tuple[tuple, int]:
+    children = []
+    while True:
+        child, i = parse_not(tokens, i)
+        # (a AND b) AND c is the same as a AND b AND c, and putting them together lets all three be ordered by cost
+        children += child[1] if child[0] == AND_KEYWORD else [child]
+        if i < len(tokens) and tokens[i] == AND_KEYWORD:
+            i += 1
+        else:
+            break
+    return (children[0] if len(children) == 1 else (AND_KEYWORD, tuple(children))), i
+
+
+def parse_not(tokens: List[str], i: int) -> Tuple[tuple, int]:
+    if i < len(tokens) and tokens[i] == NOT_KEYWORD:
+        child, i = parse_not(tokens, i + 1)
+        return (NOT_KEYWORD, child), i
+    return parse_atom(tokens, i)
+
+
+def parse_atom(tokens: List[str], i: int) -> Tuple[tuple, int]:
+    if i >= len(tokens):
+        raise ValueError("query ends where a term was expected")
+    if tokens[i] == OPEN_PAREN:
+        tree, i = parse_or(tokens, i + 1)
+        if i >= len(tokens) or tokens[i] != CLOSE_PAREN:
+            raise ValueError(f"missing {CLOSE_PAREN!r} in query")
+        return tree, i + 1
+    if i + 1 >= len(tokens) or tokens[i] in KEYWORDS or tokens[i+1] in KEYWORDS:
+        raise ValueError(f"expected a row query and a text query at {' '.join(tokens[i:i+2])!r}")
+    return (TERM, tokens[i], tokens[i+1]), i + 2
+
+
+def map_terms(tree: tuple, func) -> tuple:
+    if tree[0] == TERM:
+        return (TERM, *func(tree[1:]))
+    elif tree[0] == NOT_KEYWORD:
+        return (NOT_KEYWORD, map_terms(tree[1], func))
+    else:
+        return (tree[0], tuple(map_terms(child, func) for child in tree[1]))
+
+
+def iter_terms(tree: tuple) -> Iterator[tuple]:
+    if tree[0] == TERM:
+        yield tree
+    elif tree[0] == NOT_KEYWORD:
+        yield from iter_terms(tree[1])
+    else:
+        for child in tree[1]:
+            yield from iter_terms(child)
+
+
+def iter_positive_terms(tree: tuple) -> Iterator[tuple]:
+    # the terms that a line has to match (or could match, under an OR) rather than not match
+    if tree[0] == TERM:
+        yield tree
+    elif tree[0] in [AND_KEYWORD, OR_KEYWORD]:
+        for child in tree[1]:
+            yield from iter_positive_terms(child)
+
+
+def get_line_ids(tree: tuple, search_index, within_line_ids: set|None, search_plans: dict, pool=None, patterns: dict|None=None) -> set:
+    # the lines (out of within_line_ids, or out of all of them if it's None) that match the tree
+    kind = tree[0]
+    if kind == TERM:
+        row_line_ids = search_index.get_row_line_ids()
+        return {row_line_ids[row_id] for row_id, _ in iter_term_matches(tree, search_index, within_line_ids, search_plans, pool=pool, patterns=patterns)}
+    elif kind == OR_KEYWORD:
+        return set().union(*(get_line_ids(child, search_index, within_line_ids, search_plans, pool=pool, patterns=patterns) for child in tree[1]))
+    elif kind == NOT_KEYWORD:
+        all_line_ids = set(range(search_index.get_n_lines())) if within_line_ids is None else within_line_ids
+        return all_line_ids - get_line_ids(tree[1], search_index, all_line_ids, search_plans, pool=pool, patterns=patterns)
+    elif kind == AND_KEYWORD:
+        # the most selective children first, so the later (more expensive) ones only look at what's left; NOTs last, since they can only take lines away
+        positives = sorted((child for child in tree[1] if child[0] != NOT_KEYWORD), key=lambda child: estimate_cost(child, search_index, search_plans, patterns=patterns))
+        negatives = sorted((child for child in tree[1] if child[0] == NOT_KEYWORD), key=lambda child: estimate_cost(child[1], search_index, search_plans, patterns=patterns))
+        line_ids = within_line_ids
+        for child in positives:
+            line_ids = get_line_ids(child, search_index, line_ids, search_plans, pool=pool, patterns=patterns)
+            if len(line_ids) == 0:
+                return line_ids
+        if line_ids is None:
+            line_ids = set(range(search_index.get_n_lines()))
+        for child in negatives:
+            line_ids = line_ids - get_line_ids(child[1], search_index, line_ids, search_plans, pool=pool, patterns=patterns)
+            if len(line_ids) == 0:
+                break
+        return line_ids
+    else:
+        raise ValueError(f"unknown query tree node {tree!r}")
+
+
+def estimate_cost(tree: tuple, search_index, search_plans: dict, patterns: dict|None=None) -> float:
+    # roughly how much work it is to run this part of the query on every line, from how many rows the index says it would have to look at
+    kind = tree[0]
+    if kind == TERM:
+        text_query_is_regex, _, _ = is_regex_is_match(tree[2])
+        return len(get_term_row_ids(tree, search_index, search_plans, patterns=patterns)) * (REGEX_COST_FACTOR if text_query_is_regex else 1)
+    elif kind == OR_KEYWORD:
+        return sum(estimate_cost(child, search_index, search_plans, patterns=patterns) for child in tree[1])
+    elif kind == AND_KEYWORD:
+        return min((estimate_cost(child, search_index, search_plans, patterns=patterns) for child in tree[1] if child[0] != NOT_KEYWORD), default=len(search_index))
+    else:
+        return len(search_index)
+
+
+def get_term_search_plan(term: tuple, search_index, search_plans: dict, patterns: dict|None=None) -> Tuple[List[int], str]:
+    # (the rows the term's text query has to be run on, what to run on them); the same term can come up more than once in a query, and is always costed before it's run
+    plan = search_plans.get(term)
+    if plan is None:
+        _, row_query, text_query = term
+        plan = get_search_plan(row_query, text_query, search_index, patterns=patterns)
+        search_plans[term] = plan
+    return plan
+
+
+def get_term_row_ids(term: tuple, search_index, search_plans: dict, patterns: dict|None=None) -> List[int]:
+    return get_term_search_plan(term, search_index, search_plans, patterns=patterns)[0]
+
+
+def iter_term_matches(term: tuple, search_index, within_line_ids: set|None, search_plans: dict, pool=None, patterns: dict|None=None) -> Iterator[Tuple[int, List[Tuple[int, int]]]]:
+    # (row id, spans of the normalized contents), only in the rows of within_line_ids if it's given
+    row_ids, text_match_query = get_term_search_plan(term, search_index, search_plans, patterns=patterns)
+    if within_line_ids is not None:
+        row_line_ids = search_index.get_row_line_ids()
+        row_ids = [row_id for row_id in row_ids if row_line_ids[row_id] in within_line_ids]
+    return iter_text_matches_in_index(text_match_query, row_ids, search_index, pool=pool, patterns=patterns)
+
+
+def merge_spans(spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    # in order and not overlapping, for when more than one term matched in the same row
+    merged = []
+    for start, end in sorted(spans):
+        if len(merged) > 0 and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
@@ -5,14 +5,13 @@
 
 class Cell:
     INTRA_CELL_DELIMITER = "-"
+    __slots__ = ("strs",)  # there are millions of these in a big corpus, so no per-instance __dict__, and the joined string is made when it's asked for instead of stored
 
     def __init__(self, strs):
         self.strs = strs
-        self.str = self.to_str()
 
     def to_str(self):
-        if hasattr(self, "str"):
-            return self.str
+        # joining a single-morpheme cell just returns that same string object, so this is cheap for most cells
         return Cell.INTRA_CELL_DELIMITER.join(self.strs)
     
     def strip(self):
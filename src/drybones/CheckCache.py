@@ -0,0 +1,74 @@
+# results of `dry check` for each file, kept in the project's .drybones cache dir
+# so after fixing some problems, checking again only re-checks the files that changed since the last check
+
+import json
+import os
+from pathlib import Path
+from typing import List
+
+from drybones.ParseCache import write_atomically
+
+
+class CheckCache:
+    FORMAT_VERSION = 1  # bump this whenever the checks in CheckingUtil change, so every file gets checked again
+    FILE_NAME = "check_results.json"
+
+    def __init__(self, cache_dir: Path, root_dir: Path):
+        self.fp = cache_dir / CheckCache.FILE_NAME
+        self.root_dir = root_dir
+        self.entries = self.load()
+        self.dirty = False
+
+    def load(self) -> dict:
+        try:
+            with open(self.fp, encoding="utf-8") as f:
+                contents = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if contents.get("version") != CheckCache.FORMAT_VERSION:
+            return {}
+        return contents.get("files", {})
+
+    def get_key(self, fp: Path) -> str:
+        fp = Path(fp).absolute()
+        try:
+            return fp.relative_to(self.root_dir).as_posix()
+        except ValueError:
+            return fp.as_posix()
+
+    def get(self, fp: Path):
+        # (problems, designations) from the last check, if the file hasn't changed since then
+        entry = self.entries.get(self.get_key(fp))
+        if entry is None:
+            return None
+        try:
+            st = os.stat(fp)
+        except OSError:
+            # gone since the dir was scanned; checking it again will say so
+            return None
+        if entry["size"] != st.st_size or entry["mtime_ns"] != st.st_mtime_ns:
+            return None
+        problems = [tuple(x) for x in entry["problems"]]
+        designations = [tuple(x) for x in entry["designations"]]
+        return problems, designations
+
+    def put(self, fp: Path, size: int, mtime_ns: int, result: tuple) -> None:
+        # size and mtime should be from before the file was checked, so if it changed during the check, it gets checked again next time
+        problems, designations = result
+        self.entries[self.get_key(fp)] = {"size": size, "mtime_ns": mtime_ns, "problems": problems, "designations": designations}
+        self.dirty = True
+
+    def prune(self, fps_present: List[Path]) -> None:
+        keys_present = {self.get_key(fp) for fp in fps_present}
+        for key in list(self.entries.keys()):
+            if key not in keys_present:
+                del self.entries[key]
+                self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        self.fp.parent.mkdir(parents=True, exist_ok=True)
+        contents = {"version": CheckCache.FORMAT_VERSION, "files": self.entries}
+        write_atomically(self.fp, json.dumps(contents).encode("utf-8"))
+        self.dirty = False
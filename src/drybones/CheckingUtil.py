@@ -0,0 +1,174 @@
+# checking .dry files for everything that would make other commands stop with an error, and reporting all of it at once
+# unlike the loader, nothing in here aborts on the first problem, each problem is collected as (line number in the file, message) so the user can fix them all in one go
+
+import os
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+from typing import List, Tuple
+
+from drybones.Line import Line
+from drybones.LineGroupString import ResidueString
+from drybones.ReadingUtil import iter_line_group_strings_from_drybones_file
+from drybones.Row import Row
+from drybones.RowLabel import RowLabel, DEFAULT_ROW_LABELS_BY_STRING, DEFAULT_LINE_DESIGNATION_LABEL, DEFAULT_BASELINE_LABEL, DEFAULT_PARSE_LABEL, DEFAULT_GLOSS_LABEL
+from drybones.Cell import Cell
+
+
+AFTER_LINE_DISPLAY = Line.AFTER_LINE.strip()
+INVISIBLE_CHARS_NOT_CAUGHT_BY_CATEGORY = ["\u200b", "\ufeff"]  # zero-width space and byte order mark (the zero-width joiner and non-joiner are left alone, some orthographies need them)
+
+
+def check_drybones_file_for_cache(fp: Path) -> tuple:
+    # runs in a worker process when checking in parallel
+    # the file is stat'ed before it's read, so if it changes while we're checking it, the cached result will look out of date
+    # size and mtime are None (so the result isn't cached) if the file couldn't be read at all, e.g. it was deleted after the dir was scanned
+    try:
+        st = os.stat(fp)
+        return st.st_size, st.st_mtime_ns, check_drybones_file(fp)
+    except OSError as e:
+        return None, None, ([(1, f"could not read file: {e.strerror or e}")], [])
+
+
+def check_drybones_file(fp: Path) -> Tuple[List[Tuple[int, str]], List[Tuple[str, int]]]:
+    # returns (problems, designations), where designations are (designation, line number) for every line group,
+    # so designations can also be checked against the other texts once every file has been checked
+    problems = []
+    designations = []
+    first_line_number_by_designation = {}
+    line_number = 1  # where the next thing we read from the file starts
+    previous_group_closed = True
+    try:
+        for item in iter_line_group_strings_from_drybones_file(fp):
+            if type(item) is ResidueString:
+                previous_group_closed = True
+                line_number += item.string.count("\n")
+                continue
+
+            if not previous_group_closed:
+                problems.append((line_number, f"the line group before this one is not closed with {AFTER_LINE_DISPLAY}"))
+            # BEFORE_LINE is on line_number, the group's rows start on the next line, and AFTER_LINE is on the line after the group's last row
+            first_row_line_number = line_number + 1
+            designation, group_problems = check_line_group(item.string, first_row_line_number)
+            problems += group_problems
+            if designation is not None:
+                designations.append((designation, first_row_line_number))
+                if designation in first_line_number_by_designation:
+                    problems.append((first_row_line_number, f"duplicate line designation {designation!r}, already used on line {first_line_number_by_designation[designation]}"))
+                else:
+                    first_line_number_by_designation[designation] = first_row_line_number
+            line_number = first_row_line_number + item.string.count("\n") + 1
+            previous_group_closed = False  # until we see the residue after it, which is only there if AFTER_LINE was found
+    except UnicodeDecodeError as e:
+        problems.append((line_number, f"file is not valid UTF-8 from here on ({e.reason}), could not check the rest of it"))
+        return problems, designations
+
+    if not previous_group_closed:
+        problems.append((line_number, f"the last line group is not closed with {AFTER_LINE_DISPLAY}"))
+    return problems, designations
+
+
+def check_line_group(line_group: str, first_row_line_number: int) -> Tuple[str|None, List[Tuple[int, str]]]:
+    problems = []
+    designation = None
+    first_aligned_row = None  # (label string, number of cells, line number)
+    row_line_number_by_label = {}
+    cells_by_label = {}
+    for i, row_str in enumerate(line_group.split("\n")):
+        row_line_number = first_row_line_number + i
+        if row_str == "":
+            continue
+        problems += [(row_line_number, message) for message in check_characters(row_str)]
+
+        label_str, sep, row_text = row_str.partition(RowLabel.AFTER_LABEL_CHAR)
+        if sep == "":
+            problems.append((row_line_number, f"row has no label (no {RowLabel.AFTER_LABEL_CHAR!r} in it): {row_str!r}"))
+            continue
+        label_problem = check_row_label_string(label_str)
+        if label_problem is not None:
+            problems.append((row_line_number, label_problem))
+            continue
+        if label_str in row_line_number_by_label:
+            problems.append((row_line_number, f"row label {label_str!r} is already used in this line group on line {row_line_number_by_label[label_str]}"))
+            continue
+        row_line_number_by_label[label_str] = row_line_number
+        row_text = row_text.strip()
+
+        if label_str == DEFAULT_LINE_DESIGNATION_LABEL.string:
+            if row_text == "":
+                problems.append((row_line_number, "line designation is empty"))
+            else:
+                designation = row_text
+            continue
+
+        label = DEFAULT_ROW_LABELS_BY_STRING.get(label_str)
+        if label is None or not label.is_aligned():
+            continue
+        cell_texts = row_text.split(Row.INTRA_ROW_DELIMITER)
+        if "" in cell_texts and row_text != "":
+            problems.append((row_line_number, f"{label_str} row has an empty cell (extra space?)"))
+        cells_by_label[label_str] = cell_texts
+        if first_aligned_row is None:
+            first_aligned_row = (label_str, len(cell_texts), row_line_number)
+        elif len(cell_texts) != first_aligned_row[1]:
+            other_label_str, other_length, other_line_number = first_aligned_row
+            problems.append((row_line_number, f"{label_str} row has {len(cell_texts)} cells but the {other_label_str} row on line {other_line_number} has {other_length}"))
+
+    if designation is None and DEFAULT_LINE_DESIGNATION_LABEL.string not in row_line_number_by_label:
+        problems.append((first_row_line_number, f"line group has no designation row ({DEFAULT_LINE_DESIGNATION_LABEL.with_after_label_char()})"))
+    problems += check_analysis_rows(cells_by_label, row_line_number_by_label, first_row_line_number)
+    return designation, problems
+
+
+def check_analysis_rows(cells_by_label: dict, row_line_number_by_label: dict, first_row_line_number: int) -> List[Tuple[int, str]]:
+    # the things that make building the known analyses (for `dry parse` and `dry analyze`) fail
+    baseline_str = DEFAULT_BASELINE_LABEL.string
+    parse_str = DEFAULT_PARSE_LABEL.string
+    gloss_str = DEFAULT_GLOSS_LABEL.string
+    has_parse = parse_str in cells_by_label
+    has_gloss = gloss_str in cells_by_label
+    problems = []
+    if has_parse != has_gloss:
+        present, missing = (parse_str, gloss_str) if has_parse else (gloss_str, parse_str)
+        problems.append((row_line_number_by_label[present], f"line has a {present} row but no {missing} row"))
+    if (has_parse or has_gloss) and baseline_str not in cells_by_label:
+        problems.append((first_row_line_number, f"line has {parse_str} and/or {gloss_str} rows but no {baseline_str} row"))
+    if has_parse and has_gloss and len(cells_by_label[parse_str]) == len(cells_by_label[gloss_str]):
+        for cell_i, (parse_cell, gloss_cell) in enumerate(zip(cells_by_label[parse_str], cells_by_label[gloss_str])):
+            n_morphemes = len(parse_cell.split(Cell.INTRA_CELL_DELIMITER))
+            n_glosses = len(gloss_cell.split(Cell.INTRA_CELL_DELIMITER))
+            if n_morphemes != n_glosses:
+                problems.append((row_line_number_by_label[gloss_str], f"word {cell_i+1} has {n_morphemes} morphemes ({parse_cell}) but {n_glosses} glosses ({gloss_cell})"))
+    return problems
+
+
+def check_row_label_string(label_str: str) -> str | None:
+    # same rules as RowLabel.__init__, but returns a message instead of failing an assertion
+    if label_str == "":
+        return "row label is empty"
+    bad_chars = sorted(set(c for c in label_str if c in RowLabel.PROHIBITED_CHARS or c.isspace()))
+    if len(bad_chars) > 0:
+        return f"row label {label_str!r} contains characters that aren't allowed in labels: {bad_chars}"
+    if label_str in RowLabel.PROHIBITED_STRINGS:
+        return f"row label {label_str!r} is not allowed"
+    return None
+
+
+def check_characters(row_str: str) -> List[str]:
+    # control characters (tabs, stray carriage returns, etc.), zero-width spaces, and replacement characters from a bad conversion, which are invisible or look like something else in the terminal
+    messages = []
+    for col, c in enumerate(row_str):
+        if c == "\ufffd":
+            messages.append(f"column {col+1}: replacement character U+FFFD (text was probably converted from the wrong encoding at some point)")
+        elif unicodedata.category(c) == "Cc" or c in INVISIBLE_CHARS_NOT_CAUGHT_BY_CATEGORY:
+            messages.append(f"column {col+1}: invisible character {c!r} (U+{ord(c):04X} {unicodedata.name(c, 'control character')})")
+    return messages
+
+
+def get_designation_problems_across_texts(designations_by_fp: dict) -> List[Tuple[str, List[Tuple[Path, int]]]]:
+    # designations are supposed to be unique in the whole project, not just within a text (e.g. "WP1 23")
+    locations_by_designation = defaultdict(list)
+    for fp, designations in designations_by_fp.items():
+        for designation, line_number in designations:
+            locations_by_designation[designation].append((fp, line_number))
+    return [(designation, locations) for designation, locations in sorted(locations_by_designation.items()) if len(set(fp for fp, line_number in locations)) > 1]
@@ -0,0 +1,225 @@
+# an index of the columns of every line in the corpus, for `dry query`
+# a column is one word of a line together with the cells under it in the line's other aligned rows (e.g. its Parse and Gloss),
+# so a query can ask for things like "the morpheme kha glossed irr.ss" or "the word akai in a line whose Judgment is *"
+# the columns are stored as one list of cells per aligned row label, and every cell, morpheme, and unaligned row is in a postings dict,
+# so a query only looks at the columns that have all of the things it asks for, without going through any lines
+# like the search index, everything is compared with diacritics converted to base, and it's built from the search index's rows rather than from the lines
+
+import pickle
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterator, List, Tuple
+
+from drybones.Cell import Cell
+from drybones.ParseCache import write_atomically
+from drybones.Row import Row
+from drybones.RowLabel import DEFAULT_ROW_LABELS_BY_STRING
+from drybones.SearchIndex import load_pickle_or_none
+
+
+CELL_EQUALS_OPERATOR = "="  # the whole cell (or the whole row, for unaligned rows) is the value
+CELL_CONTAINS_OPERATOR = "~"  # one of the cell's morphemes (or one of the row's words, for unaligned rows) is the value
+OPERATORS = [CELL_EQUALS_OPERATOR, CELL_CONTAINS_OPERATOR]
+
+NO_ROW = 2**32 - 1  # in row_ids_by_label, for columns whose line doesn't have that row
+
+
+class ColumnIndex:
+    FORMAT_VERSION = 1  # bump this whenever build_column_index() changes what it stores
+
+    def __init__(self, search_index, column_line_ids: array, column_word_indices: array, cells_by_label: dict, row_ids_by_label: dict, line_first_row_ids: array, cell_postings: dict, morpheme_postings: dict, line_postings: dict, line_word_postings: dict):
+        self.search_index = search_index
+        self.column_line_ids = column_line_ids  # column id -> line id
+        self.column_word_indices = column_word_indices  # column id -> which word of its line it is
+        self.cells_by_label = cells_by_label  # aligned label -> column id -> the normalized cell under that column in that row, or None if the line has no such row
+        self.row_ids_by_label = row_ids_by_label  # aligned label -> column id -> search index row id of that row, for showing the cells as they are in the file
+        self.line_first_row_ids = line_first_row_ids  # line id -> search index row id of its first row
+        self.cell_postings = cell_postings  # (aligned label, normalized cell) -> array of column ids
+        self.morpheme_postings = morpheme_postings  # (aligned label, normalized morpheme) -> array of column ids
+        self.line_postings = line_postings  # (unaligned label, normalized contents) -> array of line ids
+        self.line_word_postings = line_word_postings  # (unaligned label, normalized word) -> array of line ids
+
+    def __len__(self):
+        return len(self.column_line_ids)
+
+    def iter_matching_columns(self, conditions: List[Tuple[str, str, str]]) -> Iterator[int]:
+        # ids of the columns that meet every (label, operator, normalized value) condition, in corpus order
+        column_conditions = [c for c in conditions if is_aligned_label(c[0])]
+        line_conditions = [c for c in conditions if not is_aligned_label(c[0])]
+
+        column_id_sets = [set(self.get_column_ids_for_condition(*c)) for c in column_conditions]
+        line_id_sets = [set(self.get_line_ids_for_condition(*c)) for c in line_conditions]
+        line_ids = None
+        for line_id_set in sorted(line_id_sets, key=len):
+            line_ids = line_id_set if line_ids is None else line_ids & line_id_set
+        if len(column_id_sets) == 0:
+            # only conditions on whole lines, so every column of those lines
+            if line_ids is None:
+                return
+            column_id_sets = [{column_id for line_id in line_ids for column_id in self.get_column_ids_in_line(line_id)}]
+
+        candidates = None
+        for column_id_set in sorted(column_id_sets, key=len):
+            candidates = column_id_set if candidates is None else candidates & column_id_set
+            if len(candidates) == 0:
+                return
+        for column_id in sorted(candidates):
+            if line_ids is not None and self.column_line_ids[column_id] not in line_ids:
+                continue
+            if self.morphemes_line_up(column_id, column_conditions):
+                yield column_id
+
+    def get_column_ids_for_condition(self, label: str, operator: str, value: str) -> array:
+        if operator == CELL_EQUALS_OPERATOR:
+            return self.cell_postings.get((label, value), array("I"))
+        else:
+            return self.morpheme_postings.get((label, value), array("I"))
+
+    def get_line_ids_for_condition(self, label: str, operator: str, value: str) -> array:
+        if operator == CELL_EQUALS_OPERATOR:
+            return self.line_postings.get((label, value), array("I"))
+        else:
+            return self.line_word_postings.get((label, value), array("I"))
+
+    def get_column_ids_in_line(self, line_id: int) -> range:
+        # columns are numbered in corpus order, so a line's columns are a run of ids
+        return range(bisect_left(self.column_line_ids, line_id), bisect_right(self.column_line_ids, line_id))
+
+    def morphemes_line_up(self, column_id: int, column_conditions: List[Tuple[str, str, str]]) -> bool:
+        # morpheme conditions on different rows that are split into the same number of morphemes in this column (e.g. Parse and Gloss)
+        # have to be met by the same morpheme, e.g. kha has to be the morpheme glossed irr.ss, not just somewhere in the same word
+        # conditions on the same row are each met on their own (e.g. Parse~kha Parse~ta is a word with both morphemes in it), so it's enough for one morpheme to meet a condition from every row
+        values_by_label_by_count = {}
+        for label, operator, value in column_conditions:
+            if operator != CELL_CONTAINS_OPERATOR:
+                continue
+            morphemes = self.cells_by_label[label][column_id].split(Cell.INTRA_CELL_DELIMITER)
+            values_by_label = values_by_label_by_count.setdefault(len(morphemes), {})
+            values_by_label.setdefault(label, (morphemes, set()))[1].add(value)
+        for n_morphemes, values_by_label in values_by_label_by_count.items():
+            if len(values_by_label) < 2:
+                continue
+            if not any(all(morphemes[i] in values for morphemes, values in values_by_label.values()) for i in range(n_morphemes)):
+                return False
+        return True
+
+    def get_column_cells(self, column_id: int) -> dict:
+        # aligned label -> the cell under this column as it is in the file, for the rows the line has
+        word_index = self.column_word_indices[column_id]
+        cells = {}
+        for label, row_ids in self.row_ids_by_label.items():
+            row_id = row_ids[column_id]
+            if row_id != NO_ROW:
+                cells[label] = self.search_index.row_contents[row_id].split(Row.INTRA_ROW_DELIMITER)[word_index]
+        return cells
+
+    def get_column_designation(self, column_id: int) -> str:
+        return self.search_index.row_designations[self.line_first_row_ids[self.column_line_ids[column_id]]]
+
+    def to_state(self) -> tuple:
+        return (self.column_line_ids, self.column_word_indices, self.cells_by_label, self.row_ids_by_label, self.line_first_row_ids, self.cell_postings, self.morpheme_postings, self.line_postings, self.line_word_postings)
+
+    @staticmethod
+    def from_state(search_index, state: tuple):
+        return ColumnIndex(search_index, *state)
+
+
+def is_aligned_label(label: str) -> bool:
+    # the same rule the .dry file loader uses: only the default aligned labels are split into cells
+    row_label = DEFAULT_ROW_LABELS_BY_STRING.get(label)
+    return row_label is not None and row_label.is_aligned()
+
+
+def parse_column_query(condition_strs: List[str]) -> List[Tuple[str, str, str]]:
+    # e.g. ["Parse~kha", "Gloss~irr.ss"] -> [("Parse", "~", "kha"), ("Gloss", "~", "irr.ss")]
+    conditions = []
+    for condition_str in condition_strs:
+        operator_index = min((i for i in (condition_str.find(op) for op in OPERATORS) if i > 0), default=None)
+        if operator_index is None:
+            raise ValueError(f"condition {condition_str!r} should be a row label, then {' or '.join(OPERATORS)}, then a value, e.g. Gloss{CELL_CONTAINS_OPERATOR}1sg")
+        label, operator, value = condition_str[:operator_index], condition_str[operator_index], condition_str[operator_index+1:]
+        if value == "":
+            raise ValueError(f"condition {condition_str!r} has no value")
+        if is_aligned_label(label) and (Row.INTRA_ROW_DELIMITER in value or (operator == CELL_CONTAINS_OPERATOR and Cell.INTRA_CELL_DELIMITER in value)):
+            raise ValueError(f"condition {condition_str!r} should be about a single {'morpheme' if operator == CELL_CONTAINS_OPERATOR else 'cell'}")
+        conditions.append((label, operator, value))
+    if len(conditions) == 0:
+        raise ValueError("query has no conditions")
+    return conditions
+
+
+def get_column_index(search_index) -> ColumnIndex:
+    # kept with the search index it was built from, like the concordance
+    if search_index.search_dir is None:
+        return build_column_index(search_index)
+    fp = search_index.search_dir / f"columns-{search_index.corpus_key}-{ColumnIndex.FORMAT_VERSION}.pickle"
+    state = load_pickle_or_none(fp)
+    if state is not None:
+        return ColumnIndex.from_state(search_index, state)
+    column_index = build_column_index(search_index)
+    write_atomically(fp, pickle.dumps(column_index.to_state(), protocol=pickle.HIGHEST_PROTOCOL))
+    return column_index
+
+
+def build_column_index(search_index) -> ColumnIndex:
+    column_line_ids = array("I")
+    column_word_indices = array("I")
+    cells_by_label = {}
+    row_ids_by_label = {}
+    line_first_row_ids = array("I")
+    cell_postings = {}
+    morpheme_postings = {}
+    line_postings = {}
+    line_word_postings = {}
+
+    def add_posting(postings, key, value):
+        ids = postings.get(key)
+        if ids is None:
+            ids = array("I")
+            postings[key] = ids
+        if len(ids) == 0 or ids[-1] != value:
+            ids.append(value)
+
+    last_line_key = None
+    first_column_id = 0
+    for row_id in range(len(search_index)):
+        line_key = (search_index.row_file_ids[row_id], search_index.row_line_indices[row_id])
+        if line_key != last_line_key:
+            last_line_key = line_key
+            line_first_row_ids.append(row_id)
+            first_column_id = len(column_line_ids)
+        line_id = len(line_first_row_ids) - 1
+        label = search_index.row_labels[row_id]
+        normalized = search_index.row_normalized_contents[row_id]
+
+        if not is_aligned_label(label):
+            add_posting(line_postings, (label, normalized), line_id)
+            for word in set(normalized.split(Row.INTRA_ROW_DELIMITER)):
+                add_posting(line_word_postings, (label, word), line_id)
+            continue
+
+        cells = normalized.split(Row.INTRA_ROW_DELIMITER)
+        # the first aligned row of the line makes its columns (the loader already made sure all the aligned rows have the same number of cells)
+        while len(column_line_ids) < first_column_id + len(cells):
+            column_word_indices.append(len(column_line_ids) - first_column_id)
+            column_line_ids.append(line_id)
+        if label not in cells_by_label:
+            cells_by_label[label] = []
+            row_ids_by_label[label] = array("I")
+        label_cells = cells_by_label[label]
+        label_row_ids = row_ids_by_label[label]
+        for i, cell in enumerate(cells):
+            column_id = first_column_id + i
+            # columns of lines without this row (so far) get None
+            label_cells.extend([None] * (column_id + 1 - len(label_cells)))
+            label_row_ids.extend([NO_ROW] * (column_id + 1 - len(label_row_ids)))
+            label_cells[column_id] = cell
+            label_row_ids[column_id] = row_id
+            add_posting(cell_postings, (label, cell), column_id)
+            for morpheme in cell.split(Cell.INTRA_CELL_DELIMITER):
+                add_posting(morpheme_postings, (label, morpheme), column_id)
+
+    for label in cells_by_label:
+        cells_by_label[label].extend([None] * (len(column_line_ids) - len(cells_by_label[label])))
+        row_ids_by_label[label].extend([NO_ROW] * (len(column_line_ids) - len(row_ids_by_label[label])))
+    return ColumnIndex(search_index, column_line_ids, column_word_indices, cells_by_label, row_ids_by_label, line_first_row_ids, cell_postings, morpheme_postings, line_postings, line_word_postings)
@@ -0,0 +1,173 @@
+# keyword-in-context (KWIC) view of every occurrence of a word, morpheme, or gloss, for `dry concordance`
+# the chosen rows (Baseline, Parse, and Gloss by default) are split into tokens, and every token position is put into a suffix array,
+# sorted by the tokens from there to the end of its row; all the occurrences of a sequence of tokens are then next to each other in it,
+# so finding them is a binary search, and they come out sorted by the right context for free
+# a second array, sorted by the tokens from each position back to the start of its row, does the same for sorting by left context
+# tokens are compared with diacritics converted to base, like in `dry search`; contexts never go across the end of a row
+
+import pickle
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from hashlib import sha256
+from typing import Iterator, List, Tuple
+
+from drybones.Cell import Cell
+from drybones.ParseCache import write_atomically
+from drybones.Row import Row
+from drybones.SearchIndex import load_pickle_or_none
+
+
+SORT_BY_RIGHT = "right"
+SORT_BY_LEFT = "left"
+SORT_ORDERS = [SORT_BY_RIGHT, SORT_BY_LEFT]
+
+WORD_PATTERN = re.compile(f"[^{re.escape(Row.INTRA_ROW_DELIMITER)}]+")
+MORPHEME_PATTERN = re.compile(f"[^{re.escape(Row.INTRA_ROW_DELIMITER + Cell.INTRA_CELL_DELIMITER)}]+")
+
+
+class Concordance:
+    FORMAT_VERSION = 1  # bump this whenever build_concordance() changes what it stores
+
+    def __init__(self, search_index, split_morphemes: bool, vocabulary: List[str], tokens: array, row_ids: array, token_rows: array, token_starts: array, token_ends: array, row_first_positions: array, suffix_array: array, reverse_suffix_array: array):
+        self.search_index = search_index
+        self.split_morphemes = split_morphemes
+        self.vocabulary = vocabulary  # token strings, sorted; a token's id is its position here, so comparing ids compares the strings
+        self.token_ids_by_string = {s: i for i, s in enumerate(vocabulary)}
+        self.tokens = tokens  # position -> token id, for every token of every row, in corpus order
+        self.row_ids = row_ids  # the search index's row id for each row in the concordance
+        self.token_rows = token_rows  # position -> index of its row in row_ids
+        self.token_starts = token_starts  # position -> where the token starts in the row's normalized contents
+        self.token_ends = token_ends
+        self.row_first_positions = row_first_positions  # row -> first position in it; has one more item at the end, so row i's positions go up to row_first_positions[i+1]
+        self.suffix_array = suffix_array  # positions sorted by get_right_key()
+        self.reverse_suffix_array = reverse_suffix_array  # positions sorted by get_left_key()
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def get_row_end(self, position: int) -> int:
+        return self.row_first_positions[self.token_rows[position] + 1]
+
+    def get_row_start(self, position: int) -> int:
+        return self.row_first_positions[self.token_rows[position]]
+
+    def get_right_key(self, position: int, length: int|None=None) -> array:
+        # the tokens from this position to the end of its row (or only the first `length` of them)
+        row_end = self.get_row_end(position)
+        end = row_end if length is None else min(row_end, position + length)
+        return self.tokens[position:end]
+
+    def get_left_key(self, position: int, length: int|None=None) -> array:
+        # the tokens from this position back to the start of its row, nearest first
+        row_start = self.get_row_start(position)
+        start = row_start if length is None else max(row_start, position - length + 1)
+        key = self.tokens[start:position+1]
+        key.reverse()
+        return key
+
+    def get_query_tokens(self, query: str) -> array | None:
+        # the query's token ids, or None if some token in it is nowhere in the rows
+        # the query has to be normalized already (diacritics converted to base)
+        token_pattern = MORPHEME_PATTERN if self.split_morphemes else WORD_PATTERN
+        token_ids = array("I")
+        for token in token_pattern.findall(query):
+            token_id = self.token_ids_by_string.get(token)
+            if token_id is None:
+                return None
+            token_ids.append(token_id)
+        return token_ids
+
+    def get_occurrence_positions(self, query: str, sort_by: str=SORT_BY_RIGHT) -> array:
+        # the position of the first token of every occurrence of the query, sorted by what comes after it (or before it, for SORT_BY_LEFT)
+        # finding them is just two binary searches, however many occurrences there are
+        query_tokens = self.get_query_tokens(query)
+        if query_tokens is None or len(query_tokens) == 0:
+            return array("I")
+        n = len(query_tokens)
+        if sort_by == SORT_BY_RIGHT:
+            key = lambda position: self.get_right_key(position, n)
+            lo = bisect_left(self.suffix_array, query_tokens, key=key)
+            hi = bisect_right(self.suffix_array, query_tokens, key=key)
+            return self.suffix_array[lo:hi]
+        elif sort_by == SORT_BY_LEFT:
+            # the reverse array is sorted by the tokens going backwards, so look for the query backwards, ending at its last token
+            reversed_query_tokens = query_tokens[::-1]
+            key = lambda position: self.get_left_key(position, n)
+            lo = bisect_left(self.reverse_suffix_array, reversed_query_tokens, key=key)
+            hi = bisect_right(self.reverse_suffix_array, reversed_query_tokens, key=key)
+            return array("I", (position - n + 1 for position in self.reverse_suffix_array[lo:hi]))
+        else:
+            raise ValueError(f"unknown sort order {sort_by!r}, should be one of {SORT_ORDERS}")
+
+    def iter_occurrences(self, query: str, n_context_tokens: int, sort_by: str=SORT_BY_RIGHT) -> Iterator[Tuple[int, str, str, str]]:
+        # (row id, left context, the occurrence itself, right context) for each occurrence, with the text as it is in the file
+        # the strings are only made as the occurrences are asked for, so a pager showing the first screenful doesn't have to wait for all of them
+        n = len(self.get_query_tokens(query) or ())
+        for position in self.get_occurrence_positions(query, sort_by=sort_by):
+            row_id = self.row_ids[self.token_rows[position]]
+            context_start = max(self.get_row_start(position), position - n_context_tokens)
+            context_end = min(self.get_row_end(position), position + n + n_context_tokens)
+            # the normalized boundaries of the left context, the occurrence, and the right context
+            boundaries = [self.token_starts[context_start], self.token_starts[position], self.token_ends[position + n - 1], self.token_ends[context_end - 1]]
+            a, b, c, d = self.get_original_boundaries(row_id, boundaries)
+            contents = self.search_index.row_contents[row_id]
+            yield row_id, contents[a:b], contents[b:c], contents[c:d]
+
+    def get_original_boundaries(self, row_id: int, boundaries: List[int]) -> List[int]:
+        # positions in the row's normalized contents -> positions in its contents as in the file
+        if self.search_index.offsets_by_row_id.get(row_id) is None:
+            return boundaries
+        return [self.search_index.get_original_spans(row_id, [(i, i)])[0][0] for i in boundaries]
+
+    def to_state(self) -> tuple:
+        return (self.split_morphemes, self.vocabulary, self.tokens, self.row_ids, self.token_rows, self.token_starts, self.token_ends, self.row_first_positions, self.suffix_array, self.reverse_suffix_array)
+
+    @staticmethod
+    def from_state(search_index, state: tuple):
+        return Concordance(search_index, *state)
+
+
+def get_concordance(search_index, labels: List[str], split_morphemes: bool=False):
+    # sorting every position takes a few seconds for a big corpus, so the result is kept with the search index it was built from
+    if search_index.search_dir is None:
+        return build_concordance(search_index, labels, split_morphemes)
+    options_key = sha256(repr((Concordance.FORMAT_VERSION, sorted(labels), split_morphemes)).encode("utf-8")).hexdigest()[:16]
+    # named after the search index, so it's pruned along with it when the corpus changes
+    fp = search_index.search_dir / f"concordance-{search_index.corpus_key}-{options_key}.pickle"
+    state = load_pickle_or_none(fp)
+    if state is not None:
+        return Concordance.from_state(search_index, state)
+    concordance = build_concordance(search_index, labels, split_morphemes)
+    write_atomically(fp, pickle.dumps(concordance.to_state(), protocol=pickle.HIGHEST_PROTOCOL))
+    return concordance
+
+
+def build_concordance(search_index, labels: List[str], split_morphemes: bool) -> Concordance:
+    token_pattern = MORPHEME_PATTERN if split_morphemes else WORD_PATTERN
+    token_strings = []
+    row_ids = array("I")
+    token_rows = array("I")
+    token_starts = array("I")
+    token_ends = array("I")
+    row_first_positions = array("I")
+    for row_id in search_index.get_row_ids_with_labels(labels):
+        row_number = len(row_ids)
+        row_ids.append(row_id)
+        row_first_positions.append(len(token_strings))
+        for m in token_pattern.finditer(search_index.row_normalized_contents[row_id]):
+            token_strings.append(m.group())
+            token_rows.append(row_number)
+            token_starts.append(m.start())
+            token_ends.append(m.end())
+    row_first_positions.append(len(token_strings))
+
+    vocabulary = sorted(set(token_strings))
+    token_ids_by_string = {s: i for i, s in enumerate(vocabulary)}
+    tokens = array("I", (token_ids_by_string[s] for s in token_strings))
+    concordance = Concordance(search_index, split_morphemes, vocabulary, tokens, row_ids, token_rows, token_starts, token_ends, row_first_positions, array("I"), array("I"))
+    # comparing the keys (slices of the token id array) is done in C, and rows are short, so just sorting the positions is fast enough
+    positions = range(len(tokens))
+    concordance.suffix_array = array("I", sorted(positions, key=concordance.get_right_key))
+    concordance.reverse_suffix_array = array("I", sorted(positions, key=concordance.get_left_key))
+    return concordance
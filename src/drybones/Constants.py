@@ -8,5 +8,6 @@ HOME_DIR = Path.home()
 DRYBONES_DIR_NAME = ".drybones"
 GLOBAL_CONFIG_FP = HOME_DIR / ".drybones.conf"
 PROJECT_CONFIG_FILE_NAME = "project.yaml"
+CACHE_DIR_NAME = "cache"  # inside the .drybones dir, for things derived from the .dry files that can be rebuilt at any time
 if not GLOBAL_CONFIG_FP.exists():
     GLOBAL_CONFIG_FP.touch()
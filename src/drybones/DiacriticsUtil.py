@@ -84,6 +84,44 @@ def translate_diacritic_alternatives_in_string(s: str, d: DiacriticDict, to_base
     return s
 
 
+def translate_diacritic_alternatives_to_base_with_offsets(s: str, d: DiacriticDict):
+    # same result as translate_diacritic_alternatives_in_string(s, d, to_base=True), doing the same replacements in the same order
+    # but also keeps track of where each char of the result came from in s, so a span found in the result can be mapped back to s (e.g. for highlighting search results)
+    # returns (result, starts, ends) where result[i] came from s[starts[i]:ends[i]], or (s, None, None) if nothing was replaced
+    starts = None
+    ends = None
+    for k, base, alternatives in d.items():
+        for old in [k] + alternatives:
+            if old == "" or old not in s:
+                continue
+            if starts is None:
+                starts = list(range(len(s)))
+                ends = list(range(1, len(s) + 1))
+            s, starts, ends = replace_with_offsets(s, starts, ends, old, base)
+    return s, starts, ends
+
+
+def replace_with_offsets(s: str, starts: List[int], ends: List[int], old: str, new: str):
+    # like s.replace(old, new), where every char of new takes up the whole span of the original string that old took up
+    result, new_starts, new_ends = [], [], []
+    i = 0
+    while True:
+        j = s.find(old, i)
+        if j == -1:
+            break
+        result.append(s[i:j])
+        new_starts += starts[i:j]
+        new_ends += ends[i:j]
+        result.append(new)
+        new_starts += [starts[j]] * len(new)
+        new_ends += [ends[j + len(old) - 1]] * len(new)
+        i = j + len(old)
+    result.append(s[i:])
+    new_starts += starts[i:]
+    new_ends += ends[i:]
+    return "".join(result), new_starts, new_ends
+
+
 
 if __name__ == "__main__":
     test_strs = [
@@ -1,10 +1,10 @@
 import click
 from hashlib import sha256
 
-from drybones.ReadingUtil import get_lines_and_residues_from_drybones_file
+from drybones.ReadingUtil import get_lines_and_residues_from_drybones_file_with_cache, get_parse_cache
 
 
-def setup_file_editing_operation(drybones_fp, overwrite):
+def setup_file_editing_operation(drybones_fp, overwrite, use_cache=True):
     if overwrite:
         new_drybones_fp = drybones_fp
 
@@ -20,7 +20,11 @@ def setup_file_editing_operation(drybones_fp, overwrite):
         # don't need to worry about overwriting the input file because we're writing to a different path
         initial_hash = None
 
-    lines, residues_by_location = get_lines_and_residues_from_drybones_file(drybones_fp)
+    # with the parse cache, only the lines that were edited since the last time this file was loaded get parsed again
+    cache = get_parse_cache(drybones_fp.parent) if use_cache else None
+    lines, residues_by_location = get_lines_and_residues_from_drybones_file_with_cache(drybones_fp, cache)
+    if cache is not None:
+        cache.save()
     line_designations_in_order = [l.designation for l in lines]
     new_lines_by_designation = {l.designation: l for l in lines}
 
@@ -11,17 +11,50 @@ from drybones.Validation import Validated, Invalidated, InvalidationError
 class Line:
     BEFORE_LINE = "┌------------┐\n"
     AFTER_LINE  = "\n└------------┘"
+    # the designation row and the lookup dicts are only built the first time something asks for them
+    # most lines in a loaded corpus are only ever iterated over (searching, tallying analyses), so building them up front would be most of the memory a line takes
+    __slots__ = ("designation", "rows", "_designation_row", "_row_by_label", "_row_label_by_string")
 
     def __init__(self, designation: str, rows: List[Row]):
         assert type(rows) is list
         assert all(type(x) is Row for x in rows)
         self.designation = designation
-        self.designation_row = Line.create_designation_row(self.designation)
         Line.check_no_designation_in_content_rows(rows)
         self.rows = rows
         self.validate_row_lengths()
-        self.row_by_label = self.construct_row_by_label()
-        self.row_label_by_string = self.construct_row_label_by_string()
+        self._designation_row = None
+        self._row_by_label = None
+        self._row_label_by_string = None
+
+    @staticmethod
+    def from_trusted(designation: str, rows: List[Row]):
+        # skips the checks in __init__, for rows that we know are already valid: the .dry file loader has checked alignment as it made them, and the parse cache only has lines that were loaded that way
+        # anything built from user input or by editing a line should go through Line(...) so it gets checked
+        line = Line.__new__(Line)
+        line.designation = designation
+        line.rows = rows
+        line._designation_row = None
+        line._row_by_label = None
+        line._row_label_by_string = None
+        return line
+
+    @property
+    def designation_row(self) -> Row:
+        if self._designation_row is None:
+            self._designation_row = Line.create_designation_row(self.designation)
+        return self._designation_row
+
+    @property
+    def row_by_label(self) -> dict:
+        if self._row_by_label is None:
+            self._row_by_label = self.construct_row_by_label()
+        return self._row_by_label
+
+    @property
+    def row_label_by_string(self) -> dict:
+        if self._row_label_by_string is None:
+            self._row_label_by_string = self.construct_row_label_by_string()
+        return self._row_label_by_string
 
     def construct_row_by_label(self):
         d = {}
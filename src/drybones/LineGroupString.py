@@ -0,0 +1,22 @@
+# the original file contents of a .dry file, after breaking it apart into line groups and residues but before parsing anything
+# so we can parse one line group at a time, and keep the residues (whatever is between line groups) exactly as the user wrote them
+
+
+class LineGroupString:
+    def __init__(self, string: str, index: int, start_byte: int, end_byte: int):
+        self.string = string  # everything between Line.BEFORE_LINE and Line.AFTER_LINE
+        self.index = index  # position among the line groups in the file, regardless of the group's labeled number/designation
+        self.start_byte = start_byte  # where the group's contents are in the file, so they can be read again without reading the rest of the file
+        self.end_byte = end_byte
+
+    def __repr__(self):
+        return f"<LineGroupString {self.index} bytes {self.start_byte}:{self.end_byte}>"
+
+
+class ResidueString:
+    def __init__(self, string: str, location: float):
+        self.string = string
+        self.location = location  # +/- 0.5 from the index of the neighboring line group, same as the keys of residues_by_location
+
+    def __repr__(self):
+        return f"<ResidueString at {self.location}>"
@@ -0,0 +1,119 @@
+# where each line group is in a .dry file, by byte offset
+# so that one line can be read and parsed without reading and parsing the rest of the text
+# kept in the project's .drybones cache dir next to the parse cache, and rebuilt whenever the .dry file's size or mtime changes
+
+import json
+import os
+from hashlib import sha256
+from pathlib import Path
+from typing import List, Tuple
+
+from drybones.Line import Line
+from drybones.ParseCache import write_atomically
+from drybones.ProjectUtil import get_cache_dir
+from drybones.ReadingUtil import iter_line_group_strings_from_drybones_file, get_line_from_line_group_string, decode_drybones_bytes
+from drybones.LineGroupString import LineGroupString
+from drybones.RowLabel import RowLabel, DEFAULT_LINE_DESIGNATION_LABEL, DEFAULT_ROW_LABELS_BY_STRING
+
+
+LINE_INDEX_DIR_NAME = "line_index"
+
+
+class LineIndex:
+    FORMAT_VERSION = 1
+
+    def __init__(self, fp: Path, size: int, mtime_ns: int, entries: List[Tuple[str, int, int]]):
+        self.fp = fp
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.entries = entries  # (designation, start_byte, end_byte) for each line group, in file order
+        # designation -> index of the first line group with it
+        # the lookup itself is a dict lookup, but it's built here from the entries, which all come from parsing the whole JSON file in get_line_index(),
+        # so getting one line is still linear in the number of line groups in the text (just without reading or parsing the .dry file itself)
+        self.index_by_designation = {}
+        for i, (designation, _, _) in enumerate(entries):
+            if designation is not None:
+                self.index_by_designation.setdefault(designation, i)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        return self.entries[index]
+
+    def is_up_to_date(self) -> bool:
+        try:
+            st = os.stat(self.fp)
+        except FileNotFoundError:
+            return False
+        return st.st_size == self.size and st.st_mtime_ns == self.mtime_ns
+
+    def read_line(self, index: int) -> Line:
+        # index is 0-based position among the line groups, i.e. line number minus 1
+        designation, start_byte, end_byte = self.entries[index]
+        with open(self.fp, "rb") as f:
+            f.seek(start_byte)
+            group_bytes = f.read(end_byte - start_byte)
+        row_labels_by_string = {k:v for k,v in DEFAULT_ROW_LABELS_BY_STRING.items()}
+        return get_line_from_line_group_string(decode_drybones_bytes(group_bytes), self.fp, row_labels_by_string)
+
+    def get_index_of_designation(self, designation: str) -> int | None:
+        return self.index_by_designation.get(designation)
+
+    def to_json_dict(self) -> dict:
+        return {"version": LineIndex.FORMAT_VERSION, "size": self.size, "mtime_ns": self.mtime_ns, "entries": self.entries}
+
+    @staticmethod
+    def from_json_dict(fp: Path, d: dict):
+        if d.get("version") != LineIndex.FORMAT_VERSION:
+            return None
+        entries = [tuple(x) for x in d["entries"]]
+        return LineIndex(fp, d["size"], d["mtime_ns"], entries)
+
+    @staticmethod
+    def build(fp: Path):
+        # stat before reading, so if the file changes while we're reading it, the index will look out of date next time rather than silently being wrong
+        st = os.stat(fp)
+        entries = []
+        for item in iter_line_group_strings_from_drybones_file(fp):
+            if type(item) is LineGroupString:
+                designation = get_designation_from_line_group_string(item.string)
+                entries.append((designation, item.start_byte, item.end_byte))
+        return LineIndex(fp, st.st_size, st.st_mtime_ns, entries)
+
+
+def get_designation_from_line_group_string(line_group: str) -> str | None:
+    # just find the designation row, without parsing the rest of the group (the last one wins, same as when parsing the whole line)
+    designation = None
+    for row_str in line_group.split("\n"):
+        label_str, sep, row_text = row_str.partition(RowLabel.AFTER_LABEL_CHAR)
+        if sep != "" and label_str == DEFAULT_LINE_DESIGNATION_LABEL.string:
+            designation = row_text.strip()
+    return designation
+
+
+def get_line_index(fp: Path, corpus_dir: Path) -> LineIndex:
+    index_fp = get_line_index_fp(fp, corpus_dir)
+    if index_fp is not None:
+        try:
+            with open(index_fp, encoding="utf-8") as f:
+                line_index = LineIndex.from_json_dict(fp, json.load(f))
+        except (OSError, ValueError, KeyError):
+            line_index = None
+        if line_index is not None and line_index.is_up_to_date():
+            return line_index
+
+    line_index = LineIndex.build(fp)
+    if index_fp is not None:
+        index_fp.parent.mkdir(parents=True, exist_ok=True)
+        write_atomically(index_fp, json.dumps(line_index.to_json_dict()).encode("utf-8"))
+    return line_index
+
+
+def get_line_index_fp(fp: Path, corpus_dir: Path) -> Path | None:
+    cache_dir = get_cache_dir(corpus_dir)
+    if cache_dir is None:
+        return None
+    # one small file per text, named by a hash of the text's path so texts in different subdirs with similar names can't collide
+    key = Path(fp).absolute().as_posix()
+    return cache_dir / LINE_INDEX_DIR_NAME / (sha256(key.encode("utf-8")).hexdigest()[:32] + ".json")
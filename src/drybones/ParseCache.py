@@ -0,0 +1,209 @@
+# persistent cache of parsed .dry files, kept in the project's .drybones dir
+# so commands that load the whole corpus don't have to re-parse every file on every run
+# the .dry files are still the ground truth (see notes/design.txt), the cache can be deleted at any time and it will just be rebuilt
+
+import json
+import os
+import pickle
+import shutil
+import sys
+from hashlib import sha256
+from pathlib import Path
+from typing import List
+
+from drybones.Cell import Cell
+from drybones.Line import Line
+from drybones.LinesAndResidues import LinesAndResidues
+from drybones.Row import Row
+from drybones.RowLabel import DEFAULT_ROW_LABELS_BY_STRING, get_shared_row_label
+
+
+class ParseCache:
+    FORMAT_VERSION = 2  # bump this whenever encode_lines_and_residues() changes what it stores
+    MANIFEST_FILE_NAME = "parsed_manifest.json"
+    BLOBS_DIR_NAME = "parsed"
+
+    def __init__(self, cache_dir: Path, root_dir: Path):
+        # cache_dir is where the cache files live, root_dir is what the file keys are relative to (the project dir)
+        self.cache_dir = cache_dir
+        self.root_dir = root_dir
+        self.manifest_fp = cache_dir / ParseCache.MANIFEST_FILE_NAME
+        self.blobs_dir = cache_dir / ParseCache.BLOBS_DIR_NAME
+        self.entries = self.load_manifest()
+        self.previous_hashes = {}  # key -> hash the file had before it changed, so lines that didn't change can be reused from the old blob
+        self.dirty = False
+
+    def load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_fp, encoding="utf-8") as f:
+                contents = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if contents.get("version") != ParseCache.FORMAT_VERSION:
+            # blobs were written by a different version of the classes, don't try to unpickle them
+            shutil.rmtree(self.blobs_dir, ignore_errors=True)
+            return {}
+        return contents.get("files", {})
+
+    def get_key(self, fp: Path) -> str:
+        fp = Path(fp).absolute()
+        try:
+            return fp.relative_to(self.root_dir).as_posix()
+        except ValueError:
+            # file is outside the project, just key it by its absolute path
+            return fp.as_posix()
+
+    def get_content_hash(self, fp: Path) -> str:
+        # size and mtime are checked first, this is only done when they don't match what we saw last time
+        # so if the file was just touched (or renamed, or copied), we still get a cache hit as long as the contents are the same
+        key = self.get_key(fp)
+        st = os.stat(fp)
+        entry = self.entries.get(key)
+        if entry is not None and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["hash"]
+        h = sha256()
+        with open(fp, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        content_hash = h.hexdigest()
+        if entry is not None and entry["hash"] != content_hash:
+            self.previous_hashes[key] = entry["hash"]
+        self.entries[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": content_hash}
+        self.dirty = True
+        return content_hash
+
+    def get_blob_fp(self, content_hash: str) -> Path:
+        return self.blobs_dir / f"{content_hash}.pickle"
+
+    def get(self, fp: Path) -> LinesAndResidues | None:
+        blob_fp = self.get_blob_fp(self.get_content_hash(fp))
+        try:
+            with open(blob_fp, "rb") as f:
+                encoded = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # corrupted or otherwise unreadable blob, treat it as a miss and it will be overwritten by put()
+            return None
+        return decode_lines_and_residues(encoded)
+
+    def has(self, fp: Path) -> bool:
+        return self.get_blob_fp(self.get_content_hash(fp)).exists()
+
+    def get_previous_blob_fp(self, fp: Path) -> Path | None:
+        # the blob from before the file's latest change, if it's still around (it gets deleted by prune() once nothing points to it)
+        self.get_content_hash(fp)
+        previous_hash = self.previous_hashes.get(self.get_key(fp))
+        if previous_hash is None:
+            return None
+        blob_fp = self.get_blob_fp(previous_hash)
+        return blob_fp if blob_fp.exists() else None
+
+    def get_previous_lines_by_group_hash(self, fp: Path):
+        previous_blob_fp = self.get_previous_blob_fp(fp)
+        if previous_blob_fp is None:
+            return None
+        return load_previous_lines_by_group_hash(previous_blob_fp)
+
+    def put(self, fp: Path, lines_and_residues: LinesAndResidues, group_hashes: List[str]) -> None:
+        self.put_encoded(fp, encode_lines_and_residues(lines_and_residues, group_hashes))
+
+    def put_encoded(self, fp: Path, encoded: tuple) -> None:
+        blob_fp = self.get_blob_fp(self.get_content_hash(fp))
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        write_atomically(blob_fp, pickle.dumps(encoded, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def prune(self, fps_present: List[Path]) -> None:
+        # forget files that were deleted or renamed, and delete blobs that no file points to anymore
+        keys_present = {self.get_key(fp) for fp in fps_present}
+        for key in list(self.entries.keys()):
+            if key not in keys_present:
+                del self.entries[key]
+                self.dirty = True
+        hashes_in_use = {entry["hash"] for entry in self.entries.values()}
+        if self.blobs_dir.exists():
+            for blob_fp in self.blobs_dir.glob("*.pickle"):
+                if blob_fp.stem not in hashes_in_use:
+                    blob_fp.unlink(missing_ok=True)
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        contents = {"version": ParseCache.FORMAT_VERSION, "files": self.entries}
+        write_atomically(self.manifest_fp, json.dumps(contents, indent=1, sort_keys=True).encode("utf-8"))
+        self.dirty = False
+
+
+# the cache stores lines as nested tuples/lists of plain strings rather than pickling the Line/Row/Cell objects themselves
+# unpickling builtins happens entirely in C, whereas unpickling our own classes costs a Python-level call per object (and there are millions of cells in a big corpus)
+
+def encode_lines_and_residues(lines_and_residues: LinesAndResidues, group_hashes: List[str]) -> tuple:
+    # group_hashes are the hashes of each line's original text in the file (see get_line_group_hash()), so that when the file changes, the lines that didn't can be reused
+    lines, residues_by_location = lines_and_residues
+    assert len(group_hashes) == len(lines)
+    encoded_lines = [encode_line(line) for line in lines]
+    return (encoded_lines, residues_by_location, group_hashes)
+
+
+def encode_line(line: Line) -> tuple:
+    encoded_rows = [(row.label.string, row.label.is_aligned(), [cell.strs for cell in row.cells]) for row in line.rows]
+    return (line.designation, encoded_rows)
+
+
+def decode_lines_and_residues(encoded: tuple) -> LinesAndResidues:
+    encoded_lines, residues_by_location, group_hashes = encoded
+    row_labels_by_string = {k:v for k,v in DEFAULT_ROW_LABELS_BY_STRING.items()}
+    lines = [decode_line(encoded_line, row_labels_by_string) for encoded_line in encoded_lines]
+    return LinesAndResidues(lines, residues_by_location)
+
+
+def decode_line(encoded_line: tuple, row_labels_by_string: dict) -> Line:
+    designation, encoded_rows = encoded_line
+    rows = []
+    for label_str, aligned, cell_strs in encoded_rows:
+        try:
+            label = row_labels_by_string[label_str]
+        except KeyError:
+            label = get_shared_row_label(label_str, aligned=aligned)
+            row_labels_by_string[label_str] = label
+        if aligned:
+            # morphemes and glosses repeat a lot across the corpus (and across files, which pickle can't share), so intern them to keep one copy of each
+            cells = [Cell([sys.intern(s) for s in strs]) for strs in cell_strs]
+        else:
+            cells = [Cell(strs) for strs in cell_strs]
+        rows.append(Row.from_trusted(label, cells))
+    # these were checked when the file was first parsed, don't check them again every time they come out of the cache
+    return Line.from_trusted(designation, rows)
+
+
+class PreviouslyParsedLines:
+    # group hash -> Line, from the cache blob of an older version of a file
+    # only the lines that are actually reused get decoded
+    def __init__(self, encoded_lines_by_group_hash: dict):
+        self.encoded_lines_by_group_hash = encoded_lines_by_group_hash
+        self.row_labels_by_string = {k:v for k,v in DEFAULT_ROW_LABELS_BY_STRING.items()}
+
+    def get(self, group_hash: str) -> Line | None:
+        encoded_line = self.encoded_lines_by_group_hash.get(group_hash)
+        if encoded_line is None:
+            return None
+        return decode_line(encoded_line, self.row_labels_by_string)
+
+
+def load_previous_lines_by_group_hash(blob_fp: Path) -> PreviouslyParsedLines | None:
+    try:
+        with open(blob_fp, "rb") as f:
+            encoded_lines, residues_by_location, group_hashes = pickle.load(f)
+    except Exception:
+        # it's only an optimization, if the old blob is gone or unreadable just parse everything
+        return None
+    return PreviouslyParsedLines(dict(zip(group_hashes, encoded_lines)))
+
+
+def write_atomically(fp: Path, data: bytes) -> None:
+    # write to a temp file and then rename, so another drybones process never sees a half-written cache file
+    tmp_fp = fp.with_name(f"{fp.name}.{os.getpid()}.tmp")
+    with open(tmp_fp, "wb") as f:
+        f.write(data)
+    os.replace(tmp_fp, fp)
@@ -11,7 +11,7 @@ import os
 import yaml
 from pathlib import Path
 
-from drybones.Constants import DRYBONES_DIR_NAME
+from drybones.Constants import DRYBONES_DIR_NAME, CACHE_DIR_NAME
 
 
 @click.pass_context
@@ -148,6 +148,14 @@ def get_corpus_dir(drybones_fp:Path) -> Path:
         return d2.parent
 
 
+def get_cache_dir(corpus_dir:Path) -> Path | None:
+    # where derived data (parsed files, indexes) is kept for this corpus; None if we're not in a project, in which case nothing gets cached
+    drybones_dir = get_closest_parent_drybones_dir(corpus_dir)
+    if drybones_dir is None:
+        return None
+    return drybones_dir / CACHE_DIR_NAME
+
+
 def is_filesystem_root(p:Path) -> bool:
     return p == p.parent
 
@@ -2,25 +2,45 @@
 # but NOT for actually doing any displaying
 
 import click
+import gc
+import os
+import re
+import sys
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, ExitStack
+from hashlib import blake2b
 from pathlib import Path
 from typing import List
 
 from drybones.Cell import Cell
-from drybones.Constants import DRYBONES_FILE_EXTENSION
+from drybones.Constants import DRYBONES_FILE_EXTENSION, DRYBONES_DIR_NAME
 from drybones.Line import Line
+from drybones.LineGroupString import LineGroupString, ResidueString
 from drybones.LinesAndResidues import LinesAndResidues
+from drybones.ParseCache import ParseCache, encode_lines_and_residues, decode_lines_and_residues, load_previous_lines_by_group_hash
+from drybones.ProjectUtil import get_cache_dir
 from drybones.Row import Row
-from drybones.RowLabel import RowLabel, DEFAULT_LINE_DESIGNATION_LABEL, DEFAULT_ROW_LABELS_BY_STRING
+from drybones.RowLabel import RowLabel, DEFAULT_LINE_DESIGNATION_LABEL, DEFAULT_ROW_LABELS_BY_STRING, get_shared_row_label
 from drybones.Text import Text
+from drybones.TextRegistry import TextRegistry
 from drybones.StringValidation import validate_string
 from drybones.Validation import Validated, Invalidated
 
 
+DRYBONES_FILE_ENCODING = "utf-8"
+READ_CHUNK_SIZE = 1 << 16
+assert Line.BEFORE_LINE.endswith("\n") and Line.AFTER_LINE.startswith("\n")
+BEFORE_LINE_BYTES_PATTERN = re.compile(re.escape(Line.BEFORE_LINE[:-1].encode(DRYBONES_FILE_ENCODING)) + rb"\r?\n")
+AFTER_LINE_BYTES_PATTERN = re.compile(rb"\r?\n" + re.escape(Line.AFTER_LINE[1:].encode(DRYBONES_FILE_ENCODING)))
+MAX_BEFORE_LINE_BYTES_LENGTH = len(Line.BEFORE_LINE.encode(DRYBONES_FILE_ENCODING)) + 1
+PARALLEL_LOAD_MIN_FILES = 16  # with fewer files than this to parse, starting the worker processes costs more than it saves
+
+
 def get_drybones_file_from_text_name(text_name: str, corpus_dir: Path, key_error_returns_key: bool=False) -> Path:
-    name_to_text = get_all_texts_in_dir(corpus_dir, with_contents=False)
+    fps_by_name = get_drybones_fps_by_text_name(corpus_dir)
     try:
-        text = name_to_text[text_name]
+        return fps_by_name[text_name]
     except KeyError as e:
         if key_error_returns_key:
             # treat the passed "text_name" string as a filename
@@ -28,12 +48,14 @@ def get_drybones_file_from_text_name(text_name: str, corpus_dir: Path, key_error
         else:
             raise e
 
-    return text.source_fp
-
 
 def get_lines_and_residues_from_text_name(text_name: str, corpus_dir: Path) -> LinesAndResidues:
     fp = get_drybones_file_from_text_name(text_name, corpus_dir)
-    return get_lines_and_residues_from_drybones_file(fp)
+    cache = get_parse_cache(corpus_dir)
+    lines_and_residues = get_lines_and_residues_from_drybones_file_with_cache(fp, cache)
+    if cache is not None:
+        cache.save()
+    return lines_and_residues
 
 
 def get_raw_line_strs_from_file(fp: Path, with_newlines:bool=False) -> List[str]:
@@ -48,94 +70,184 @@ def get_raw_line_strs_from_file(fp: Path, with_newlines:bool=False) -> List[str]
 
 
 def get_lines_and_residues_from_drybones_file(fp: Path, enforce_unique_designations:bool=True) -> LinesAndResidues:
-    line_groups, residues_by_location = get_line_group_strings_from_drybones_file(fp)
     lines = []
+    residues_by_location = {}
+    for item in iter_lines_and_residues_from_drybones_file(fp, enforce_unique_designations=enforce_unique_designations):
+        if type(item) is ResidueString:
+            residues_by_location[item.location] = item.string
+        else:
+            lines.append(item)
+    # click.echo(f"loaded lines from {fp}")
+    return LinesAndResidues(lines, residues_by_location)
+
+
+def iter_lines_and_residues_from_drybones_file(fp: Path, enforce_unique_designations:bool=True):
+    # yields each Line (and each ResidueString) as soon as its line group has been read from the file
     row_labels_by_string = {k:v for k,v in DEFAULT_ROW_LABELS_BY_STRING.items()}
     if enforce_unique_designations:
         desigs_seen = set()
-    for line_group in line_groups:
-        line_designation = None
-        row_strs = line_group.split("\n")
-        rows = []
-        row_length = None
-        for row_str in row_strs:
-            if row_str == "":
-                continue
-            label_str, *row_text_pieces = row_str.split(RowLabel.AFTER_LABEL_CHAR)
-            if len(row_text_pieces) == 0:
-                click.echo(f"\nError! in file {fp}\nrow has no label:\n{row_str!r}\n", err=True)
-                raise click.Abort()
-            else:
-                row_text = RowLabel.AFTER_LABEL_CHAR.join(row_text_pieces)
-            
-            row_text = row_text.strip()
-            try:
-                label = row_labels_by_string[label_str]
-            except KeyError:
-                label = RowLabel(label_str, aligned=False)
-                row_labels_by_string[label_str] = label
-
-            if label == DEFAULT_LINE_DESIGNATION_LABEL:
-                line_designation = row_text
-                continue  # don't include this in the content rows
-
-            if label.is_aligned():
-                cell_texts = row_text.split(Row.INTRA_ROW_DELIMITER)
-                cells = []
-                for cell_text in cell_texts:
-                    cell = Cell(cell_text.split(Cell.INTRA_CELL_DELIMITER))
-                    cells.append(cell)
-                this_row_length = len(cells)
-                if row_length is None:
-                    row_length = this_row_length
-                else:
-                    if this_row_length != row_length:
-                        line_group_display = "\n> " + line_group.replace("\n", "\n> ") + "\n"
-                        click.echo(f"\nError! in file {fp}\nIn line group:\n{line_group_display}\nexpected row of length {row_length} but got {this_row_length}:\n{row_text}", err=True)
-                        raise click.Abort()
-            else:
-                cells = [Cell([row_text])]
-            
-            row = Row(label, cells)
-            rows.append(row)
+    for item in iter_line_group_strings_from_drybones_file(fp):
+        if type(item) is ResidueString:
+            yield item
+            continue
+        line = get_line_from_line_group_string(item.string, fp, row_labels_by_string)
         if enforce_unique_designations:
-            if line_designation in desigs_seen:
-                click.echo(f"duplicate line designation: {line_designation!r}", err=True)
-                raise click.Abort()
-            else:
-                desigs_seen.add(line_designation)
-        line = Line(line_designation, rows)
+            check_designation_not_seen(line.designation, desigs_seen)
+        yield line
+
+
+def get_lines_and_residues_from_drybones_file_incrementally(fp: Path, previous_lines_by_group_hash=None):
+    # like get_lines_and_residues_from_drybones_file(), but also returns the hash of each line group's text (in the same order as the lines)
+    # any line group whose hash is in previous_lines_by_group_hash (from the last time this file was parsed) isn't parsed again, the Line from then is reused
+    # so after editing one line of a long text, only that line gets parsed
+    row_labels_by_string = {k:v for k,v in DEFAULT_ROW_LABELS_BY_STRING.items()}
+    desigs_seen = set()
+    lines = []
+    group_hashes = []
+    residues_by_location = {}
+    for item in iter_line_group_strings_from_drybones_file(fp):
+        if type(item) is ResidueString:
+            residues_by_location[item.location] = item.string
+            continue
+        group_hash = get_line_group_hash(item.string)
+        line = None if previous_lines_by_group_hash is None else previous_lines_by_group_hash.get(group_hash)
+        if line is None:
+            line = get_line_from_line_group_string(item.string, fp, row_labels_by_string)
+        check_designation_not_seen(line.designation, desigs_seen)
         lines.append(line)
-    # click.echo(f"loaded lines from {fp}")
-    return LinesAndResidues(lines, residues_by_location)
+        group_hashes.append(group_hash)
+    return LinesAndResidues(lines, residues_by_location), group_hashes
+
+
+def get_line_group_hash(line_group: str) -> str:
+    # not hash(), since that is different in every process and these get saved in the parse cache
+    return blake2b(line_group.encode(DRYBONES_FILE_ENCODING), digest_size=16).hexdigest()
+
+
+def check_designation_not_seen(designation: str, desigs_seen: set) -> None:
+    if designation in desigs_seen:
+        click.echo(f"duplicate line designation: {designation!r}", err=True)
+        raise click.Abort()
+    desigs_seen.add(designation)
+
+
+def get_line_from_line_group_string(line_group: str, fp: Path, row_labels_by_string: dict) -> Line:
+    # row_labels_by_string is shared between the line groups of a file, and new labels found in this group get added to it
+    line_designation = None
+    row_strs = line_group.split("\n")
+    rows = []
+    row_length = None
+    for row_str in row_strs:
+        if row_str == "":
+            continue
+        label_str, *row_text_pieces = row_str.split(RowLabel.AFTER_LABEL_CHAR)
+        if len(row_text_pieces) == 0:
+            click.echo(f"\nError! in file {fp}\nrow has no label:\n{row_str!r}\n", err=True)
+            raise click.Abort()
+        else:
+            row_text = RowLabel.AFTER_LABEL_CHAR.join(row_text_pieces)
+
+        row_text = row_text.strip()
+        try:
+            label = row_labels_by_string[label_str]
+        except KeyError:
+            label = get_shared_row_label(label_str, aligned=False)
+            row_labels_by_string[label_str] = label
+
+        if label == DEFAULT_LINE_DESIGNATION_LABEL:
+            line_designation = row_text
+            continue  # don't include this in the content rows
+
+        if label.is_aligned():
+            cell_texts = row_text.split(Row.INTRA_ROW_DELIMITER)
+            cells = []
+            for cell_text in cell_texts:
+                # morphemes and glosses repeat a lot across the corpus, so intern them to keep one copy of each
+                cell = Cell([sys.intern(s) for s in cell_text.split(Cell.INTRA_CELL_DELIMITER)])
+                cells.append(cell)
+            this_row_length = len(cells)
+            if row_length is None:
+                row_length = this_row_length
+            else:
+                if this_row_length != row_length:
+                    line_group_display = "\n> " + line_group.replace("\n", "\n> ") + "\n"
+                    click.echo(f"\nError! in file {fp}\nIn line group:\n{line_group_display}\nexpected row of length {row_length} but got {this_row_length}:\n{row_text}", err=True)
+                    raise click.Abort()
+        else:
+            cells = [Cell([row_text])]
+
+        row = Row.from_trusted(label, cells)
+        rows.append(row)
+    # the checks in Line.__init__ are already done: alignment was checked above, and the designation row was left out of the content rows
+    return Line.from_trusted(line_designation, rows)
 
 
 def get_line_group_strings_from_drybones_file(fp: Path):
-    with open(fp) as f:
-        contents = f.read()
-    l = contents.split(Line.BEFORE_LINE)
     groups = []
-    residue_before_first_group = l[0]
-    residues_by_location = {-0.5: residue_before_first_group}  # location is +/- 0.5 from group index (regardless of the group's labeled number/designation)
-    for s in l[1:]:
-        group, *residues = s.split(Line.AFTER_LINE)  # there may be stray AFTER_LINE delimiters in the residue
-        groups.append(group)
-        if len(residues) > 0:
-            residue = Line.AFTER_LINE.join(residues)
-            last_group_index = len(groups) - 1
-            location = last_group_index + 0.5
-            assert location not in residues_by_location
-            residues_by_location[location] = residue
-    # TODO make a LineGroupString object and ResidueString object for holding the original file contents after breaking it apart
-    # then can call a function on a LineGroupString to parse it into a Line
-    # but want the top-level parse command call to be able to just grab the original string for a group that was unedited, and for a residue, without me stripping off whitespace and then adding it back on (error prone)
+    residues_by_location = {}  # location is +/- 0.5 from group index (regardless of the group's labeled number/designation)
+    for item in iter_line_group_strings_from_drybones_file(fp):
+        if type(item) is ResidueString:
+            assert item.location not in residues_by_location
+            residues_by_location[item.location] = item.string
+        else:
+            groups.append(item.string)
     return groups, residues_by_location
 
 
-def get_text_from_file(fp: Path, with_contents: bool=True):
+def iter_line_group_strings_from_drybones_file(fp: Path):
+    # reads the file a chunk at a time and yields a LineGroupString or ResidueString as soon as each one is complete
+    # so we never hold more than one chunk plus one line group in memory, rather than the whole file and all of its pieces at once
+    # the pieces are split on the bytes of the delimiters, so we know where each group is in the file (for seeking back to it later)
+    # and CRLF line endings are accepted in and around the delimiters, like reading the file in text mode would do
+    with open(fp, "rb") as f:
+        buf = bytearray()
+        buf_start_byte = 0  # file offset of buf[0]
+        search_from = 0
+        piece_index = -1  # the residue before the first group is piece -1, then each group (with any residue after it) is one piece
+        at_eof = False
+        while True:
+            m = BEFORE_LINE_BYTES_PATTERN.search(buf, search_from)
+            if m is None:
+                if at_eof:
+                    break
+                chunk = f.read(READ_CHUNK_SIZE)
+                if len(chunk) == 0:
+                    at_eof = True
+                else:
+                    # a delimiter could be split between the end of the buffer and the new chunk, so back up enough to find it
+                    search_from = max(0, len(buf) - MAX_BEFORE_LINE_BYTES_LENGTH + 1)
+                    buf += chunk
+                continue
+            yield from split_piece_of_drybones_file(bytes(buf[:m.start()]), piece_index, buf_start_byte)
+            piece_index += 1
+            buf_start_byte += m.end()
+            del buf[:m.end()]
+            search_from = 0
+        yield from split_piece_of_drybones_file(bytes(buf), piece_index, buf_start_byte)
+
+
+def split_piece_of_drybones_file(piece: bytes, piece_index: int, start_byte: int):
+    if piece_index == -1:
+        yield ResidueString(decode_drybones_bytes(piece), location=-0.5)
+        return
+    m = AFTER_LINE_BYTES_PATTERN.search(piece)  # there may be stray AFTER_LINE delimiters in the residue, only the first one ends the group
+    group_end = len(piece) if m is None else m.start()
+    yield LineGroupString(decode_drybones_bytes(piece[:group_end]), index=piece_index, start_byte=start_byte, end_byte=start_byte + group_end)
+    if m is not None:
+        yield ResidueString(decode_drybones_bytes(piece[m.end():]), location=piece_index + 0.5)
+
+
+def decode_drybones_bytes(b: bytes) -> str:
+    s = b.decode(DRYBONES_FILE_ENCODING)
+    if "\r" in s:
+        s = s.replace("\r\n", "\n")
+    return s
+
+
+def get_text_from_file(fp: Path, with_contents: bool=True, cache: ParseCache|None=None):
     name = fp.stem  # for now just take name from the filename, but later want it to match the line designations and/or be in some metadata in the text's .dry file itself
     if with_contents:
-        lines, residues = get_lines_and_residues_from_drybones_file(fp)
+        lines, residues = get_lines_and_residues_from_drybones_file_with_cache(fp, cache)
     else:
         lines, residues = [], []
     t = Text(name, lines, residues, source_fp=fp)
@@ -143,29 +255,84 @@ def get_text_from_file(fp: Path, with_contents: bool=True):
 
 
 def get_text_names_in_dir(d: Path):
-    name_to_text = get_all_texts_in_dir(d, with_contents=False)
-    return list(name_to_text.keys())
+    return list(get_drybones_fps_by_text_name(d).keys())
 
 
-def get_all_texts_in_dir(d: Path, with_contents: bool=True):
-    fps = get_all_drybones_files_in_dir(d)
+def get_all_texts_in_dir(d: Path, with_contents: bool=True, use_cache: bool=True, show_progress: bool=False, n_workers: int|None=None):
+    fps = get_all_drybones_files_in_dir(d)  # checks for duplicate text names before parsing anything
+
+    if not with_contents:
+        return {fp.stem: get_text_from_file(fp, with_contents=False) for fp in fps}
+
+    cache = get_parse_cache(d) if use_cache else None
     name_to_text = {}
+    for fp, (lines, residues) in iter_contents_of_drybones_files(fps, cache=cache, n_workers=n_workers, show_progress=show_progress):
+        text = Text(fp.stem, lines, residues, source_fp=fp)
+        name_to_text[text.name] = text
+
+    if cache is not None:
+        cache.prune(fps)
+        cache.save()
+
+    return name_to_text
+
+
+def iter_contents_of_drybones_files(fps: List[Path], cache: ParseCache|None=None, n_workers: int|None=None, show_progress: bool=False):
+    # yields (fp, LinesAndResidues) for each file, in the same order as fps
+    # files that aren't already in the cache are parsed by a pool of worker processes, if there are enough of them to be worth starting the pool
+    if cache is None:
+        fps_to_parse = fps
+    else:
+        fps_to_parse = [fp for fp in fps if not cache.has(fp)]
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    use_pool = n_workers > 1 and len(fps_to_parse) >= PARALLEL_LOAD_MIN_FILES
+
+    futures = {}
+    with ExitStack() as stack:
+        stack.enter_context(paused_garbage_collection())
+        if use_pool:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=min(n_workers, len(fps_to_parse))))
+            for fp in fps_to_parse:
+                previous_blob_fp = None if cache is None else cache.get_previous_blob_fp(fp)
+                futures[fp] = executor.submit(get_encoded_lines_and_residues_from_drybones_file, fp, previous_blob_fp)
+        try:
+            for i, fp in enumerate(fps):
+                if show_progress:
+                    click.echo(f"loading lines from file {i+1}/{len(fps)}\r", nl=False)
+                if fp in futures:
+                    # the workers send back plain strings and lists rather than Line objects, since those are much faster to pass between processes
+                    encoded = futures.pop(fp).result()
+                    if cache is not None:
+                        cache.put_encoded(fp, encoded)
+                    lines_and_residues = decode_lines_and_residues(encoded)
+                else:
+                    lines_and_residues = get_lines_and_residues_from_drybones_file_with_cache(fp, cache)
+                yield fp, lines_and_residues
+        finally:
+            # if we stopped early (error in some file, or the caller didn't need the rest), don't keep the pool busy parsing files nobody will look at
+            for future in futures.values():
+                future.cancel()
+    if show_progress:
+        click.echo()
+
+
+def get_encoded_lines_and_residues_from_drybones_file(fp: Path, previous_blob_fp: Path|None=None) -> tuple:
+    # runs in a worker process
+    # previous_blob_fp is the parse cache's blob from before the file last changed, if there is one, so the worker only has to parse the line groups that changed
+    with paused_garbage_collection():
+        previous_lines_by_group_hash = None if previous_blob_fp is None else load_previous_lines_by_group_hash(previous_blob_fp)
+        lines_and_residues, group_hashes = get_lines_and_residues_from_drybones_file_incrementally(fp, previous_lines_by_group_hash)
+        return encode_lines_and_residues(lines_and_residues, group_hashes)
+
+
+def check_no_duplicate_text_names(fps: List[Path]) -> None:
     name_to_fps = defaultdict(list)
-    has_duplicates = False
     for fp in fps:
-        text = get_text_from_file(fp, with_contents=with_contents)
-        name = text.name
-        name_to_fps[name].append(fp)
-        if len(name_to_fps[name]) > 1:
-            has_duplicates = True
-        
-        # if we have any duplicates already, we no longer care about returning the dict of name to text
-        # but we will still check for more duplicates so we can list all of them at once to the user
-        if not has_duplicates:
-            # add this text to the dict that we will return
-            name_to_text[name] = text
-
-    if has_duplicates:
+        name_to_fps[fp.stem].append(fp)
+
+    # list all of the duplicates at once to the user
+    if any(len(these_fps) > 1 for these_fps in name_to_fps.values()):
         click.echo("\nDuplicate text names found:")
         for name, these_fps in sorted(name_to_fps.items()):
             if len(these_fps) > 1:
@@ -173,24 +340,123 @@ def get_all_texts_in_dir(d: Path, with_contents: bool=True):
                 for fp in sorted(these_fps):
                     click.echo(f"\t\t{fp}")
         raise click.Abort()
-    
-    return name_to_text
 
 
 def get_all_drybones_files_in_dir(d: Path):
-    return list(d.glob("**/*" + DRYBONES_FILE_EXTENSION))
+    # sorted so that the corpus is always loaded (and searched, etc.) in the same order, no matter what order the filesystem lists things in
+    return sorted(get_drybones_fps_by_text_name(d).values())
+
+
+def get_drybones_file_states(d: Path) -> dict:
+    # fp -> (size, mtime), for telling which files changed since something was loaded from them
+    states = {}
+    for fp in get_all_drybones_files_in_dir(d):
+        st = os.stat(fp)
+        states[fp] = (st.st_size, st.st_mtime_ns)
+    return states
+
+
+def get_drybones_fps_by_text_name(d: Path) -> dict:
+    # uses the text registry if nothing has been added, removed, or renamed since it was saved, otherwise scans d and saves a new registry
+    cache_dir = get_cache_dir(d)
+    registry_fp = None if cache_dir is None else cache_dir / TextRegistry.FILE_NAME
+    if registry_fp is not None:
+        registry = TextRegistry.load(registry_fp, d)
+        if registry is not None and registry.is_up_to_date():
+            return registry.fps_by_name
+
+    fps, dir_mtimes = scan_dir_for_drybones_files(d)
+    check_no_duplicate_text_names(fps)  # so a saved registry never has duplicates in it; if one gets added, the dir's mtime changes and we come back here
+    fps_by_name = {fp.stem: fp for fp in fps}
+    if registry_fp is not None:
+        TextRegistry(d, fps_by_name, dir_mtimes).save(registry_fp)
+    return fps_by_name
+
+
+def scan_dir_for_drybones_files(d: Path):
+    # same files as d.glob("**/*.dry"), but also gets the mtime of each dir along the way, for the text registry
+    # each dir is stat'ed before it's listed, so anything added while we're scanning will make the registry look stale next time rather than be missed
+    fps = []
+    dir_mtimes = {}
+    dirs_to_scan = [d]
+    # symlinked dirs aren't followed (like the glob), so a link back up the tree can't send us around in circles
+    # a dir or entry that can't be read (e.g. no permission, or deleted while we're scanning) is skipped rather than stopping the whole scan
+    while len(dirs_to_scan) > 0:
+        this_dir = dirs_to_scan.pop()
+        try:
+            dir_mtimes[this_dir.relative_to(d).as_posix()] = os.stat(this_dir).st_mtime_ns
+            with os.scandir(this_dir) as entries:
+                entries = list(entries)
+        except OSError:
+            if this_dir == d:
+                raise
+            continue
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                # skip the .drybones dir, there are no texts in there and the cache gets written to all the time, which would keep making the registry stale
+                if entry.name != DRYBONES_DIR_NAME:
+                    dirs_to_scan.append(Path(entry.path))
+            elif entry.name.endswith(DRYBONES_FILE_EXTENSION):
+                fps.append(Path(entry.path))
+    return sorted(fps), dir_mtimes
 
 
-def get_lines_from_all_drybones_files_in_dir(d: Path):
-    name_to_text = get_all_texts_in_dir(d)
+def get_lines_from_all_drybones_files_in_dir(d: Path, use_cache: bool=True, n_workers: int|None=None):
+    name_to_text = get_all_texts_in_dir(d, use_cache=use_cache, show_progress=True, n_workers=n_workers)
     lines = []
-    for i, (name, t) in enumerate(name_to_text.items()):
+    for name, t in name_to_text.items():
         lines += t.lines
-        click.echo(f"loading lines from file {i+1}/{len(name_to_text)}\r", nl=False)
-    click.echo()
     return lines
 
 
+def iter_lines_from_all_drybones_files_in_dir(d: Path, use_cache: bool=True, n_workers: int|None=None):
+    # for callers that only need to go through the corpus once (e.g. tallying analyses, or a single search query)
+    # so lines can be used (and then dropped) a file at a time as they are loaded, instead of holding the whole corpus in memory first
+    fps = get_all_drybones_files_in_dir(d)
+    cache = get_parse_cache(d) if use_cache else None
+    for fp, lines_and_residues in iter_contents_of_drybones_files(fps, cache=cache, n_workers=n_workers, show_progress=True):
+        yield from lines_and_residues.lines
+
+    if cache is not None:
+        cache.prune(fps)
+        cache.save()
+
+
+def get_parse_cache(corpus_dir: Path) -> ParseCache | None:
+    cache_dir = get_cache_dir(corpus_dir)
+    if cache_dir is None:
+        return None
+    return ParseCache(cache_dir, root_dir=cache_dir.parent.parent.absolute())
+
+
+def get_lines_and_residues_from_drybones_file_with_cache(fp: Path, cache: ParseCache|None) -> LinesAndResidues:
+    if cache is None:
+        return get_lines_and_residues_from_drybones_file(fp)
+    lines_and_residues = cache.get(fp)
+    if lines_and_residues is None:
+        previous_lines_by_group_hash = cache.get_previous_lines_by_group_hash(fp)
+        lines_and_residues, group_hashes = get_lines_and_residues_from_drybones_file_incrementally(fp, previous_lines_by_group_hash)
+        cache.put(fp, lines_and_residues, group_hashes)
+    return lines_and_residues
+
+
+@contextmanager
+def paused_garbage_collection():
+    # loading the corpus (parsing or unpickling) creates a huge number of objects at once, none of which are garbage
+    # but they keep triggering full passes of the cyclic garbage collector over everything loaded so far, which makes loading several times slower
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
 def validate_text_name(text_name: str, corpus_dir: Path):
     text_name_options = get_text_names_in_dir(corpus_dir)
     validation = validate_string(text_name, text_name_options)
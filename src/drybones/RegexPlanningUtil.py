@@ -0,0 +1,94 @@
+# working out which literal strings a regex can't match without, so the search index can narrow down the rows to run it on
+# e.g. any row matching r"\bkha(i|u)+" has to contain "kha" and either "ai" or "au"; the index only knows trigrams, so literals shorter than 3 characters don't narrow anything down
+# a plan is a list of terms that all have to be present, where each term is either a literal string or ("or", [plan, plan, ...]); an empty plan means any row could match
+
+import re
+
+try:
+    import re._parser as sre_parse
+    from re._constants import LITERAL, AT, SUBPATTERN, BRANCH, MAX_REPEAT, MIN_REPEAT, ASSERT
+except ImportError:
+    # before Python 3.11
+    import sre_parse
+    from sre_constants import LITERAL, AT, SUBPATTERN, BRANCH, MAX_REPEAT, MIN_REPEAT, ASSERT
+
+from typing import List
+
+
+TRIGRAM_LENGTH = 3
+OR_TERM = "or"
+
+
+def get_regex_plan(pattern: str) -> List:
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        # the search itself will raise the error for the user to see
+        return []
+    if parsed.state.flags & re.IGNORECASE:
+        # the literals could be in any case in the text, which the index doesn't know about
+        return []
+    return get_plan_from_items(parsed)
+
+
+def get_plan_from_items(items) -> List:
+    plan = []
+    run = []  # characters that have to appear consecutively in the text
+
+    def end_run():
+        if len(run) >= TRIGRAM_LENGTH:
+            plan.append("".join(run))
+        run.clear()
+
+    for op, av in iter_items_with_plain_groups_flattened(items):
+        if op is LITERAL:
+            run.append(chr(av))
+        elif op is AT:
+            # anchors like ^ and \b don't take up any characters, so the run of literals continues across them
+            continue
+        elif op is SUBPATTERN:
+            # group with flags of its own
+            end_run()
+            _group, add_flags, _del_flags, p = av
+            if not add_flags & re.IGNORECASE:
+                plan += get_plan_from_items(p)
+        elif op is BRANCH:
+            end_run()
+            _, alternatives = av
+            alternative_plans = [get_plan_from_items(alternative) for alternative in alternatives]
+            if all(len(alternative_plan) > 0 for alternative_plan in alternative_plans):
+                plan.append((OR_TERM, alternative_plans))
+            # otherwise one of the alternatives can match without any literal we know about
+        elif op in (MAX_REPEAT, MIN_REPEAT) or op.name == "POSSESSIVE_REPEAT":
+            end_run()
+            min_count, _max_count, p = av
+            if min_count >= 1:
+                plan += get_plan_from_items(p)
+        elif op is ASSERT:
+            # a lookahead/lookbehind's literals still have to be in the text somewhere
+            end_run()
+            _direction, p = av
+            plan += get_plan_from_items(p)
+        elif op.name == "ATOMIC_GROUP":
+            end_run()
+            plan += get_plan_from_items(av)
+        else:
+            # character classes, wildcards, backreferences, negative lookarounds, etc. could be anything
+            end_run()
+    end_run()
+    return plan
+
+
+def iter_items_with_plain_groups_flattened(items):
+    # groups that don't change any flags don't change what the literals around them have to be next to, so "kh(ai)" needs "khai"
+    for op, av in items:
+        if op is SUBPATTERN:
+            _group, add_flags, del_flags, p = av
+            if add_flags == 0 and del_flags == 0:
+                yield from iter_items_with_plain_groups_flattened(p)
+                continue
+        yield op, av
+
+
+def get_trigrams(s: str) -> set:
+    return {s[i : i+TRIGRAM_LENGTH] for i in range(len(s) - TRIGRAM_LENGTH + 1)}
@@ -9,6 +9,7 @@ from drybones.RowLabel import RowLabel
 
 class Row:
     INTRA_ROW_DELIMITER = " "
+    __slots__ = ("label", "cells")
     
     def __init__(self, label: RowLabel, cells: List[Cell]):
         assert type(label) is RowLabel
@@ -17,6 +18,14 @@ class Row:
         assert all(type(x) is Cell for x in cells)
         self.cells = cells
 
+    @staticmethod
+    def from_trusted(label: RowLabel, cells: List[Cell]):
+        # skips the type checks in __init__, only for rows whose label and cells we made ourselves (the .dry file loader, the parse cache)
+        row = Row.__new__(Row)
+        row.label = label
+        row.cells = cells
+        return row
+
     def __len__(self):
         return len(self.cells)
     
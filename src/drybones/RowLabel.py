@@ -9,6 +9,7 @@ class RowLabel:
 
     PROHIBITED_CHARS = [" ", "\t", "\n", AFTER_LABEL_CHAR, ALL_OTHER_ROWS_CHAR, MULTIPLE_ROWS_SEPARATOR_CHAR]
     PROHIBITED_STRINGS = [RESIDUES_PSEUDO_LABEL]
+    __slots__ = ("string", "aligned", "_hash")
 
     def __init__(self, string, aligned: bool):
         assert not any(x in string for x in [" ", "\t", "\n", "\r"]), "whitespace not allowed in row label"
@@ -17,6 +18,7 @@ class RowLabel:
         assert string not in RowLabel.PROHIBITED_STRINGS, f"the label {string!r} is prohibited"
         self.string = string
         self.aligned = aligned
+        self._hash = hash(string)  # labels are looked up in dicts for every row of every line, so don't recompute this each time
 
     def is_aligned(self) -> bool:
         return self.aligned
@@ -34,6 +36,9 @@ class RowLabel:
         return self.without_after_label_char()
     
     def __eq__(self, other) -> bool:
+        # labels read from files are shared objects (see get_shared_row_label), so usually this is the same object
+        if self is other:
+            return True
         if type(other) is not RowLabel:
             return NotImplemented
         return self.string == other.string
@@ -44,7 +49,8 @@ class RowLabel:
         return self.string < other.string
     
     def __hash__(self):
-        return hash(repr(self))
+        # consistent with __eq__, which only compares the strings
+        return self._hash
     
     def relabel(self, string):
         return RowLabel(string, self.aligned)
@@ -74,3 +80,16 @@ DEFAULT_ROW_LABELS = [
 
 DEFAULT_ROW_LABELS_BY_STRING = {l.string: l for l in DEFAULT_ROW_LABELS}
 DEFAULT_ALIGNED_ROW_LABELS = [l for l in DEFAULT_ROW_LABELS if l.is_aligned()]
+
+SHARED_ROW_LABELS = {(l.string, l.aligned): l for l in DEFAULT_ROW_LABELS}
+
+
+def get_shared_row_label(string: str, aligned: bool) -> RowLabel:
+    # for labels read from files, so every row with the same label (in every file) points to the same RowLabel object instead of each file making its own
+    key = (string, aligned)
+    try:
+        return SHARED_ROW_LABELS[key]
+    except KeyError:
+        label = RowLabel(string, aligned=aligned)
+        SHARED_ROW_LABELS[key] = label
+        return label
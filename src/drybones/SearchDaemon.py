@@ -0,0 +1,308 @@
+# a background process that keeps a project's search index loaded, and answers `dry search` queries over a Unix domain socket
+# so a script running lots of one-shot searches doesn't load the whole corpus for every one of them
+# start/stop it with `dry daemon start` and `dry daemon stop`; `dry search` uses it automatically whenever it's running
+# messages are one JSON object per line, in both directions; results are sent with their lines encoded like in the parse cache
+# for batch mode, the matches are sent one message at a time as they're found, ending with {"end": true}
+
+import click
+import hashlib
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterator, List
+
+from drybones.DiacriticsUtil import get_char_to_alternatives_dict, get_diacritics_conf_fp
+from drybones.ParseCache import encode_line, decode_line
+from drybones.ProjectUtil import get_cache_dir
+from drybones.ReadingUtil import get_drybones_file_states
+from drybones.RowLabel import DEFAULT_ROW_LABELS_BY_STRING
+from drybones.SearchIndex import get_search_index
+from drybones.SearchResult import SearchResult
+from drybones.SearchShardPool import SearchShardPool
+from drybones.SearchUtil import get_search_results, iter_search_matches, get_search_match_dict
+
+
+SOCKET_FILE_NAME = "search.sock"
+MAX_SOCKET_PATH_LENGTH = 100  # the OS limit is a bit more than this (104 or 108 bytes), and a socket can't be made at a longer path at all
+DEFAULT_IDLE_TIMEOUT_MINUTES = 30
+STARTUP_TIMEOUT_SECONDS = 600  # building the index from scratch for a big corpus can take a while
+REQUEST_TIMEOUT_SECONDS = 10  # a client that connects and doesn't send its whole request within this long is dropped, so it can't hold up everyone else
+REGEX_TIMEOUT_SECONDS = 20  # regexes are run in a worker process and cancelled after this long; less than RESPONSE_TIMEOUT_SECONDS, so the client hears why rather than just giving up
+RESPONSE_TIMEOUT_SECONDS = 30  # a daemon that takes longer than this to answer is busy with something else (or stuck), so the client searches by itself instead
+
+
+class SearchDaemon:
+    def __init__(self, corpus_dir: Path, idle_timeout_minutes: float):
+        self.corpus_dir = corpus_dir
+        self.socket_fp = get_search_daemon_socket_fp(corpus_dir)
+        self.idle_timeout_seconds = idle_timeout_minutes * 60
+        self.diacritics_conf_fp = get_diacritics_conf_fp()
+        self.search_index = None
+        self.pool = None  # one worker process with the rows, for running regexes with a timeout
+        self.corpus_state = None
+        self.n_reloads = 0
+
+    def get_corpus_state(self) -> tuple:
+        # which files there are and when they last changed, so we can tell when the index needs updating
+        st = os.stat(self.diacritics_conf_fp)
+        return get_drybones_file_states(self.corpus_dir), (st.st_size, st.st_mtime_ns)
+
+    def reload_if_changed(self) -> None:
+        corpus_state = self.get_corpus_state()
+        if corpus_state == self.corpus_state:
+            return
+        # only the files that changed get re-indexed, see get_search_index()
+        diacritic_dict = get_char_to_alternatives_dict(self.diacritics_conf_fp)
+        self.search_index = get_search_index(self.corpus_dir, diacritic_dict)
+        if self.pool is not None:
+            # its copy of the rows is out of date now
+            self.pool.close()
+        self.pool = SearchShardPool(self.search_index, 1, timeout=REGEX_TIMEOUT_SECONDS)
+        self.corpus_state = corpus_state
+        self.n_reloads += 1
+
+    def serve(self) -> None:
+        if query_search_daemon(self.corpus_dir, {"command": "status"}) is not None:
+            raise RuntimeError(f"a search daemon is already running for {self.corpus_dir}")
+        # a socket file left over from a daemon that didn't get to clean up after itself
+        self.socket_fp.unlink(missing_ok=True)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(self.socket_fp))
+        os.chmod(self.socket_fp, 0o600)
+        # clients that connect while the index is still loading just wait in the backlog until we get to them
+        server.listen()
+        try:
+            self.reload_if_changed()
+            server.settimeout(self.idle_timeout_seconds)
+            while True:
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    # nobody has searched anything for a while, so give the memory back
+                    return
+                with conn:
+                    conn.settimeout(REQUEST_TIMEOUT_SECONDS)
+                    try:
+                        request = receive_message(conn)
+                    except (ConnectionError, socket.timeout):
+                        continue
+                    if request is None:
+                        continue
+                    conn.settimeout(None)
+                    try:
+                        for response in self.handle_request(request):
+                            send_message(conn, response)
+                    except ConnectionError:
+                        # client went away partway through, e.g. its output was piped into `head`
+                        pass
+                if request.get("command") == "stop":
+                    return
+        finally:
+            server.close()
+            self.socket_fp.unlink(missing_ok=True)
+            if self.pool is not None:
+                self.pool.close()
+
+    def handle_request(self, request: dict) -> Iterator[dict]:
+        # the messages to send back, in order
+        command = request.get("command")
+        if command == "status":
+            yield {"corpus_dir": str(self.corpus_dir), "pid": os.getpid(), "n_rows": len(self.search_index), "n_reloads": self.n_reloads, "idle_timeout_minutes": self.idle_timeout_seconds / 60}
+            return
+        elif command == "stop":
+            yield {"stopping": True}
+            return
+        elif command not in ["search", "search_matches", "count"]:
+            yield {"error": f"unknown command {command!r}"}
+            return
+
+        try:
+            self.reload_if_changed()
+        except click.Abort:
+            # the loader already said what's wrong, but to our stderr, which nobody sees
+            yield {"error": "could not load the corpus; run `dry check` to see what's wrong with it"}
+            return
+        except OSError as e:
+            # e.g. a file was deleted between listing the files and looking at them; the next query will try again
+            yield {"error": f"could not reload the corpus: {e}"}
+            return
+        row_query, text_query = request["row_query"], request["text_query"]
+        try:
+            if command == "search":
+                yield encode_search_results(get_search_results(row_query, text_query, self.search_index, pool=self.pool))
+            elif command == "count":
+                matches = itertools.islice(iter_search_matches(row_query, text_query, self.search_index, pool=self.pool), request.get("limit"))
+                yield {"count": sum(1 for _ in matches)}
+            else:
+                matches = itertools.islice(iter_search_matches(row_query, text_query, self.search_index, pool=self.pool), request.get("limit"))
+                for row_id, spans in matches:
+                    yield get_search_match_dict(self.search_index, row_id, spans)
+                yield {"end": True}
+        except Exception as e:
+            # e.g. an invalid regex, or one that took too long and was cancelled (SearchTimeoutException); tell the client rather than dying
+            yield {"error": f"{type(e).__name__}: {e}"}
+
+
+def get_search_daemon_socket_fp(corpus_dir: Path) -> Path | None:
+    cache_dir = get_cache_dir(corpus_dir)
+    if cache_dir is None or not hasattr(socket, "AF_UNIX"):
+        return None
+    fp = cache_dir.absolute() / SOCKET_FILE_NAME
+    if len(str(fp).encode("utf-8")) <= MAX_SOCKET_PATH_LENGTH:
+        return fp
+    # project is too deep in the filesystem for a socket to go in it, so put it in the temp dir, named after the project
+    key = hashlib.sha256(str(cache_dir.absolute()).encode("utf-8")).hexdigest()[:16]
+    return Path(tempfile.gettempdir()) / f"drybones-{os.getuid()}-{key}.sock"
+
+
+def connect_to_search_daemon(corpus_dir: Path) -> socket.socket | None:
+    # None if there's no daemon running for this project
+    socket_fp = get_search_daemon_socket_fp(corpus_dir)
+    if socket_fp is None or not socket_fp.exists():
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(RESPONSE_TIMEOUT_SECONDS)
+    try:
+        conn.connect(str(socket_fp))
+    except (ConnectionError, FileNotFoundError, socket.timeout):
+        # the daemon is gone and left its socket file behind, or it's too busy to take the connection
+        conn.close()
+        return None
+    return conn
+
+
+def query_search_daemon(corpus_dir: Path, request: dict) -> dict | None:
+    # None if there's no daemon running for this project
+    conn = connect_to_search_daemon(corpus_dir)
+    if conn is None:
+        return None
+    try:
+        with conn:
+            send_message(conn, request)
+            return receive_message(conn)
+    except ConnectionError:
+        # reset if the daemon stopped while we were waiting for it
+        return None
+    except socket.timeout:
+        # busy with another query, e.g. a regex that takes forever, so the caller can search without it
+        return None
+
+
+def search_with_daemon(corpus_dir: Path, row_query: str, text_query: str) -> List[SearchResult] | None:
+    # None if there's no daemon running, in which case the caller should load the index and search it itself
+    response = query_search_daemon(corpus_dir, {"command": "search", "row_query": row_query, "text_query": text_query})
+    if response is None:
+        return None
+    if "error" in response:
+        raise RuntimeError(f"search daemon could not run query: {response['error']}")
+    return decode_search_results(response)
+
+
+def search_matches_with_daemon(corpus_dir: Path, row_query: str, text_query: str, limit: int|None) -> Iterator[dict] | None:
+    # match dicts (see get_search_match_dict()) as the daemon finds them, or None if there's no daemon running
+    conn = connect_to_search_daemon(corpus_dir)
+    if conn is None:
+        return None
+    f = conn.makefile("rb")
+    try:
+        send_message(conn, {"command": "search_matches", "row_query": row_query, "text_query": text_query, "limit": limit})
+        # wait for the first message here, so if the daemon is too busy to answer, the caller can still search without it before anything has been printed
+        first_raw = f.readline()
+    except (ConnectionError, socket.timeout):
+        f.close()
+        conn.close()
+        return None
+    return iter_search_match_messages(conn, f, first_raw)
+
+
+def iter_search_match_messages(conn: socket.socket, f, first_raw: bytes) -> Iterator[dict]:
+    with conn, f:
+        try:
+            for raw in itertools.chain([first_raw], f):
+                if raw == b"":
+                    break
+                message = json.loads(raw.decode("utf-8"))
+                if "error" in message:
+                    raise RuntimeError(f"search daemon could not run query: {message['error']}")
+                if message.get("end"):
+                    return
+                yield message
+        except ConnectionError:
+            pass
+        except socket.timeout:
+            raise RuntimeError(f"search daemon stopped answering in the middle of the search (nothing for {RESPONSE_TIMEOUT_SECONDS} seconds)")
+    raise RuntimeError("search daemon stopped in the middle of the search")
+
+
+def count_matches_with_daemon(corpus_dir: Path, row_query: str, text_query: str, limit: int|None) -> int | None:
+    response = query_search_daemon(corpus_dir, {"command": "count", "row_query": row_query, "text_query": text_query, "limit": limit})
+    if response is None:
+        return None
+    if "error" in response:
+        raise RuntimeError(f"search daemon could not run query: {response['error']}")
+    return response["count"]
+
+
+def start_search_daemon(corpus_dir: Path, idle_timeout_minutes: float) -> dict:
+    # runs the daemon in its own session so it keeps going after this command exits, and waits until it's ready to answer queries
+    status = query_search_daemon(corpus_dir, {"command": "status"})
+    if status is not None:
+        return status
+    process = subprocess.Popen(
+        [sys.executable, "-m", "drybones.main", "daemon", "run", "--idle-timeout", str(idle_timeout_minutes)],
+        cwd=corpus_dir, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        status = query_search_daemon(corpus_dir, {"command": "status"})
+        if status is not None:
+            return status
+        if process.poll() is not None:
+            raise RuntimeError("search daemon stopped before it was ready; run `dry daemon run` to see why, or `dry check` to look for problems in the corpus")
+    raise TimeoutError(f"search daemon did not start within {STARTUP_TIMEOUT_SECONDS} seconds")
+
+
+def encode_search_results(search_results: List[SearchResult]) -> dict:
+    # each line is only sent once, even if it has several results in it
+    encoded_lines = []
+    line_number_by_id = {}
+    encoded_results = []
+    for sr in search_results:
+        line_number = line_number_by_id.get(id(sr.line))
+        if line_number is None:
+            line_number = len(encoded_lines)
+            line_number_by_id[id(sr.line)] = line_number
+            encoded_lines.append(encode_line(sr.line))
+        row_index = next(i for i, row in enumerate(sr.line.rows) if row is sr.row)
+        encoded_results.append((sr.string, sr.spans, line_number, row_index))
+    return {"lines": encoded_lines, "results": encoded_results}
+
+
+def decode_search_results(response: dict) -> List[SearchResult]:
+    row_labels_by_string = {k:v for k,v in DEFAULT_ROW_LABELS_BY_STRING.items()}
+    lines = [decode_line(encoded_line, row_labels_by_string) for encoded_line in response["lines"]]
+    search_results = []
+    for string, spans, line_number, row_index in response["results"]:
+        line = lines[line_number]
+        search_results.append(SearchResult(string=string, spans=[tuple(span) for span in spans], row=line.rows[row_index], line=line))
+    return search_results
+
+
+def send_message(conn: socket.socket, message: dict) -> None:
+    conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def receive_message(conn: socket.socket) -> dict | None:
+    with conn.makefile("rb") as f:
+        raw = f.readline()
+    if raw == b"":
+        return None
+    return json.loads(raw.decode("utf-8"))
@@ -0,0 +1,344 @@
+# an index of the rows of every text in the corpus, for `dry search`
+# so a query only has to look at the rows that could match it, instead of going through every row of every line
+# kept in the project's .drybones cache dir: one piece per .dry file (only rebuilt when that file, or diacritics.conf, changes), and the merged index of the whole corpus (only re-merged when some piece changed)
+# the trigram postings (for regex queries) are merged into a file of their own, so plain string searches don't have to load them
+
+import pickle
+from array import array
+from hashlib import sha256
+from pathlib import Path
+from typing import List, Tuple
+
+from drybones.Cell import Cell
+from drybones.DiacriticDict import DiacriticDict
+from drybones.DiacriticsUtil import translate_diacritic_alternatives_in_string, translate_diacritic_alternatives_to_base_with_offsets
+from drybones.ParseCache import write_atomically
+from drybones.ProjectUtil import get_cache_dir
+from drybones.RegexPlanningUtil import get_regex_plan, get_trigrams, OR_TERM
+from drybones.ReadingUtil import get_all_drybones_files_in_dir, get_parse_cache, get_lines_and_residues_from_drybones_file_with_cache, iter_contents_of_drybones_files, paused_garbage_collection
+from drybones.Row import Row
+
+
+SEARCH_INDEX_DIR_NAME = "search"
+
+
+class SearchIndex:
+    FORMAT_VERSION = 4  # bump this whenever build_search_index_piece() or merge_search_index_pieces() change what they store
+
+    def __init__(self, fps: List[Path], row_file_ids: array, row_line_indices: array, row_indices_in_line: array, row_labels: List[str], row_designations: List[str], row_contents: List[str], row_normalized_contents: List[str], offsets_by_row_id: dict, normalized_labels: dict, row_ids_by_label: dict, postings: dict, trigram_postings: dict|None=None, trigram_postings_fp: Path|None=None):
+        # each row in the corpus has a row id, which is its position in these lists; row ids are in corpus order (file, then line, then row)
+        self.fps = fps
+        self.row_file_ids = row_file_ids
+        self.row_line_indices = row_line_indices
+        self.row_indices_in_line = row_indices_in_line
+        self.row_labels = row_labels  # label strings
+        self.row_designations = row_designations
+        self.row_contents = row_contents  # as in the file, without diacritics converted
+        self.row_normalized_contents = row_normalized_contents  # with diacritics converted to base, which is what queries are matched against; the same object as in row_contents if there was nothing to convert
+        self.offsets_by_row_id = offsets_by_row_id  # row id -> (starts, ends) arrays, where normalized char i came from contents[starts[i]:ends[i]]; only for rows where something was converted
+        self.normalized_labels = normalized_labels  # label string -> label string with diacritics converted to base
+        self.row_ids_by_label = row_ids_by_label  # label string -> array of the ids of the rows with that label, in order; there are only a few distinct labels, so a row query only needs to be checked against each of them once
+        self.postings = postings  # token -> array of the ids of the rows it's in, in order; tokens are the words (split on spaces) and morphemes (words split on hyphens) of the rows' contents, with diacritics converted to base
+        self._trigram_postings = trigram_postings  # trigram -> array of the ids of the rows it's in, in order, with diacritics converted to base like the tokens; see get_trigram_postings()
+        self.trigram_postings_fp = trigram_postings_fp
+        self.lines_by_file_id = {}  # loaded as search results need them, see get_row_and_line()
+        self.parse_cache = None  # where get_row_and_line() loads lines from, if there is a project to cache them in
+        self.search_dir = None  # where the index is cached, and things built from it (like the concordance) can be too; None if there's no project to cache it in
+        self.corpus_key = None  # changes whenever any file in the corpus does, for naming things built from the index
+        self._row_line_ids = None  # row id -> line id, where lines are numbered in corpus order; see get_row_line_ids()
+        self._line_first_row_ids = None  # line id -> id of its first row, with one more item at the end so line i's rows go up to line_first_row_ids[i+1]
+        self.bk_tree = None  # of the tokens in the postings, for fuzzy queries; see BKTree.get_bk_tree()
+
+    def __len__(self):
+        return len(self.row_contents)
+
+    def get_row_and_line(self, row_id: int):
+        # the actual Row and Line objects, only loaded for the files that have search results in them
+        file_id = self.row_file_ids[row_id]
+        lines = self.lines_by_file_id.get(file_id)
+        if lines is None:
+            with paused_garbage_collection():
+                lines = get_lines_and_residues_from_drybones_file_with_cache(self.fps[file_id], self.parse_cache).lines
+            self.lines_by_file_id[file_id] = lines
+        line = lines[self.row_line_indices[row_id]]
+        return line.rows[self.row_indices_in_line[row_id]], line
+
+    def get_row_line_ids(self) -> array:
+        # for queries about whole lines, e.g. ones that combine conditions on different rows
+        if self._row_line_ids is None:
+            row_line_ids = array("I")
+            line_first_row_ids = array("I")
+            last_line_key = None
+            for row_id, line_key in enumerate(zip(self.row_file_ids, self.row_line_indices)):
+                if line_key != last_line_key:
+                    line_first_row_ids.append(row_id)
+                    last_line_key = line_key
+                row_line_ids.append(len(line_first_row_ids) - 1)
+            line_first_row_ids.append(len(self))
+            self._row_line_ids = row_line_ids
+            self._line_first_row_ids = line_first_row_ids
+        return self._row_line_ids
+
+    def get_line_first_row_ids(self) -> array:
+        self.get_row_line_ids()
+        return self._line_first_row_ids
+
+    def get_n_lines(self) -> int:
+        return len(self.get_line_first_row_ids()) - 1
+
+    def get_row_ids_with_labels(self, labels: List[str]) -> List[int]:
+        row_ids = []
+        for label in labels:
+            row_ids += self.row_ids_by_label[label]
+        return sorted(row_ids)
+
+    def get_original_spans(self, row_id: int, spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        # spans of the row's normalized contents -> spans of its contents as in the file, for highlighting
+        offsets = self.offsets_by_row_id.get(row_id)
+        if offsets is None:
+            return spans
+        starts, ends = offsets
+        original_spans = []
+        for start, end in spans:
+            original_start = starts[start] if start < len(starts) else len(self.row_contents[row_id])
+            original_end = ends[end - 1] if end > start else original_start
+            if len(original_spans) > 0 and original_start < original_spans[-1][1]:
+                # two matches in the same converted char, e.g. if one char was converted to more than one
+                original_spans[-1] = (original_spans[-1][0], max(original_end, original_spans[-1][1]))
+            else:
+                original_spans.append((original_start, original_end))
+        return original_spans
+
+    def get_candidate_row_ids_for_string_query(self, pattern: str, full_match: bool):
+        # the rows that might match a plain string query (the text_match_func still has to be run on them)
+        # or None if the index can't narrow it down and every row has to be checked
+        pieces = pattern.split(Row.INTRA_ROW_DELIMITER)
+        if all(piece == "" for piece in pieces):
+            return None
+
+        if full_match:
+            # the row's tokens have to be exactly the pattern's tokens
+            token_sets = [[piece] for piece in pieces if piece != ""]
+        elif len(pieces) == 1:
+            # the pattern has to be inside one word
+            token_sets = [[token for token in self.postings if pattern in token]]
+        else:
+            # the pattern goes across word boundaries: the first piece ends a word, the last one starts a word, and everything in between is whole words
+            token_sets = []
+            for i, piece in enumerate(pieces):
+                if piece == "":
+                    continue
+                if i == 0:
+                    token_sets.append([token for token in self.postings if token.endswith(piece)])
+                elif i == len(pieces) - 1:
+                    token_sets.append([token for token in self.postings if token.startswith(piece)])
+                else:
+                    token_sets.append([piece])
+
+        candidates = None
+        # intersect the smallest sets first so the intermediate results stay small
+        row_id_sets = sorted((self.get_row_ids_with_any_token(tokens) for tokens in token_sets), key=len)
+        for row_ids in row_id_sets:
+            candidates = row_ids if candidates is None else candidates & row_ids
+            if len(candidates) == 0:
+                break
+        return candidates
+
+    def get_candidate_row_ids_for_regex_query(self, pattern: str):
+        # same as for string queries, using the literals that the regex can't match without
+        plan = get_regex_plan(pattern)
+        if len(plan) == 0:
+            return None
+        return self.get_row_ids_for_regex_plan(plan)
+
+    def get_row_ids_for_regex_plan(self, plan: list):
+        row_id_sets = []
+        for term in plan:
+            if type(term) is tuple:
+                _or, alternative_plans = term
+                assert _or == OR_TERM
+                row_id_sets.append(set().union(*(self.get_row_ids_for_regex_plan(alternative_plan) for alternative_plan in alternative_plans)))
+            else:
+                trigram_postings = self.get_trigram_postings()
+                row_id_sets += [set(trigram_postings.get(trigram, ())) for trigram in get_trigrams(term)]
+        # this can let through rows where the trigrams are there but not in the right order, which is fine since the regex still gets run on every candidate
+        candidates = None
+        for row_ids in sorted(row_id_sets, key=len):
+            candidates = row_ids if candidates is None else candidates & row_ids
+            if len(candidates) == 0:
+                break
+        return candidates
+
+    def get_trigram_postings(self) -> dict:
+        if self._trigram_postings is None:
+            with open(self.trigram_postings_fp, "rb") as f:
+                self._trigram_postings = pickle.load(f)
+        return self._trigram_postings
+
+    def get_row_ids_with_any_token(self, tokens: List[str]) -> set:
+        row_ids = set()
+        for token in tokens:
+            row_ids.update(self.postings.get(token, ()))
+        return row_ids
+
+    def to_state(self) -> tuple:
+        # everything but the file paths, which depend on where the command is run from
+        return (self.row_file_ids, self.row_line_indices, self.row_indices_in_line, self.row_labels, self.row_designations, self.row_contents, self.row_normalized_contents, self.offsets_by_row_id, self.normalized_labels, self.row_ids_by_label, self.postings)
+
+    @staticmethod
+    def from_state(fps: List[Path], state: tuple):
+        return SearchIndex(fps, *state)
+
+
+def get_search_index(corpus_dir: Path, diacritic_dict: DiacriticDict, use_cache: bool=True, n_workers: int|None=None, show_progress: bool=False) -> SearchIndex:
+    fps = get_all_drybones_files_in_dir(corpus_dir)
+    cache_dir = get_cache_dir(corpus_dir) if use_cache else None
+    if cache_dir is None:
+        lines_by_file_id = {}
+        pieces = []
+        for file_id, (fp, lines_and_residues) in enumerate(iter_contents_of_drybones_files(fps, cache=None, n_workers=n_workers, show_progress=show_progress)):
+            pieces.append(build_search_index_piece(lines_and_residues.lines, diacritic_dict))
+            lines_by_file_id[file_id] = lines_and_residues.lines
+        search_index = merge_search_index_pieces(fps, pieces)
+        # we had to parse everything anyway, so keep the lines rather than parsing them again for the search results
+        search_index.lines_by_file_id = lines_by_file_id
+        return search_index
+
+    search_dir = cache_dir / SEARCH_INDEX_DIR_NAME
+    parse_cache = get_parse_cache(corpus_dir)
+    dict_hash = get_diacritic_dict_hash(diacritic_dict)
+    # pieces are named by the file's contents and the diacritics, so a file that didn't change keeps its piece, wherever it is
+    piece_fps = [search_dir / f"{parse_cache.get_content_hash(fp)}-{dict_hash}.pickle" for fp in fps]
+    corpus_key = sha256("\n".join(f"{fp.as_posix()} {piece_fp.name}" for fp, piece_fp in zip(fps, piece_fps)).encode("utf-8")).hexdigest()
+    merged_fp = search_dir / f"corpus-{corpus_key}.pickle"
+    trigrams_fp = search_dir / f"trigrams-{corpus_key}.pickle"
+
+    state = load_pickle_or_none(merged_fp) if trigrams_fp.exists() else None
+    if state is not None:
+        search_index = SearchIndex.from_state(fps, state)
+        search_index.trigram_postings_fp = trigrams_fp
+    else:
+        pieces = [load_pickle_or_none(piece_fp) for piece_fp in piece_fps]
+        fps_to_index = [fp for fp, piece in zip(fps, pieces) if piece is None]
+        if len(fps_to_index) > 0:
+            new_pieces = {}
+            for fp, lines_and_residues in iter_contents_of_drybones_files(fps_to_index, cache=parse_cache, n_workers=n_workers, show_progress=show_progress):
+                new_pieces[fp] = build_search_index_piece(lines_and_residues.lines, diacritic_dict)
+            search_dir.mkdir(parents=True, exist_ok=True)
+            for i, fp in enumerate(fps):
+                if pieces[i] is None:
+                    pieces[i] = new_pieces[fp]
+                    write_atomically(piece_fps[i], pickle.dumps(pieces[i], protocol=pickle.HIGHEST_PROTOCOL))
+        search_index = merge_search_index_pieces(fps, pieces)
+        search_dir.mkdir(parents=True, exist_ok=True)
+        write_atomically(trigrams_fp, pickle.dumps(search_index.get_trigram_postings(), protocol=pickle.HIGHEST_PROTOCOL))
+        write_atomically(merged_fp, pickle.dumps(search_index.to_state(), protocol=pickle.HIGHEST_PROTOCOL))
+        search_index.trigram_postings_fp = trigrams_fp
+        prune_search_index_dir(search_dir, keep={merged_fp.name, trigrams_fp.name} | {piece_fp.name for piece_fp in piece_fps})
+
+    parse_cache.prune(fps)
+    parse_cache.save()
+    search_index.parse_cache = parse_cache
+    search_index.search_dir = search_dir
+    search_index.corpus_key = corpus_key
+    return search_index
+
+
+def build_search_index_piece(lines, diacritic_dict: DiacriticDict) -> tuple:
+    # the index of a single file, with row numbers local to the file (merge_search_index_pieces() turns them into row ids)
+    rows = []  # (line index, row index in line, label string, designation, contents, normalized contents, offsets or None)
+    postings = {}
+    trigram_postings = {}
+    normalized_labels = {}
+    for line_index, line in enumerate(lines):
+        for row_index, row in enumerate(line.rows):
+            contents = row.get_contents()
+            local_row_number = len(rows)
+            normalized, starts, ends = translate_diacritic_alternatives_to_base_with_offsets(contents, diacritic_dict)
+            offsets = None if starts is None else (array("I", starts), array("I", ends))
+            rows.append((line_index, row_index, row.label.string, line.designation, contents, normalized, offsets))
+            if row.label.string not in normalized_labels:
+                normalized_labels[row.label.string] = translate_diacritic_alternatives_in_string(row.label.string, diacritic_dict, to_base=True)
+            for token in get_tokens(normalized):
+                row_numbers = postings.setdefault(token, array("I"))
+                if len(row_numbers) == 0 or row_numbers[-1] != local_row_number:
+                    row_numbers.append(local_row_number)
+            for trigram in get_trigrams(normalized):
+                trigram_postings.setdefault(trigram, array("I")).append(local_row_number)
+    return (rows, normalized_labels, postings, trigram_postings)
+
+
+def get_tokens(s: str) -> set:
+    tokens = set()
+    for word in s.split(Row.INTRA_ROW_DELIMITER):
+        tokens.add(word)
+        if Cell.INTRA_CELL_DELIMITER in word:
+            tokens.update(word.split(Cell.INTRA_CELL_DELIMITER))
+    return tokens
+
+
+def merge_search_index_pieces(fps: List[Path], pieces: List[tuple]) -> SearchIndex:
+    row_file_ids = array("I")
+    row_line_indices = array("I")
+    row_indices_in_line = array("I")
+    row_labels = []
+    row_designations = []
+    row_contents = []
+    row_normalized_contents = []
+    offsets_by_row_id = {}
+    normalized_labels = {}
+    row_ids_by_label = {}
+    postings = {}
+    trigram_postings = {}
+    for file_id, (rows, piece_normalized_labels, piece_postings, piece_trigram_postings) in enumerate(pieces):
+        first_row_id = len(row_contents)
+        normalized_labels.update(piece_normalized_labels)
+        for line_index, row_index, label, designation, contents, normalized, offsets in rows:
+            if offsets is not None:
+                offsets_by_row_id[len(row_contents)] = offsets
+            row_file_ids.append(file_id)
+            row_line_indices.append(line_index)
+            row_indices_in_line.append(row_index)
+            row_ids = row_ids_by_label.get(label)
+            if row_ids is None:
+                row_ids = array("I")
+                row_ids_by_label[label] = row_ids
+            row_ids.append(len(row_labels))
+            row_labels.append(label)
+            row_designations.append(designation)
+            row_contents.append(contents)
+            row_normalized_contents.append(contents if normalized == contents else normalized)
+        for token, row_numbers in piece_postings.items():
+            row_ids = postings.get(token)
+            if row_ids is None:
+                row_ids = array("I")
+                postings[token] = row_ids
+            row_ids.extend(first_row_id + n for n in row_numbers)
+        for trigram, row_numbers in piece_trigram_postings.items():
+            row_ids = trigram_postings.get(trigram)
+            if row_ids is None:
+                row_ids = array("I")
+                trigram_postings[trigram] = row_ids
+            row_ids.extend(first_row_id + n for n in row_numbers)
+    return SearchIndex(fps, row_file_ids, row_line_indices, row_indices_in_line, row_labels, row_designations, row_contents, row_normalized_contents, offsets_by_row_id, normalized_labels, row_ids_by_label, postings, trigram_postings=trigram_postings)
+
+
+def get_diacritic_dict_hash(diacritic_dict: DiacriticDict) -> str:
+    # the search index depends on how diacritics are converted, so it has to be rebuilt when diacritics.conf changes
+    s = repr([(SearchIndex.FORMAT_VERSION, k, base, alternatives) for k, base, alternatives in diacritic_dict.items()])
+    return sha256(s.encode("utf-8")).hexdigest()[:16]
+
+
+def load_pickle_or_none(fp: Path):
+    try:
+        with open(fp, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        # missing, or unreadable for whatever reason; it will just be rebuilt
+        return None
+
+
+def prune_search_index_dir(search_dir: Path, keep: set) -> None:
+    for fp in search_dir.glob("*.pickle"):
+        if fp.name not in keep:
+            fp.unlink(missing_ok=True)
@@ -0,0 +1,141 @@
+# shorthands for things that come up in a lot of `dry search` queries, e.g. [DS] for any of the different-subject markers
+# defined under `search-macros` in the project's config (.drybones/project.yaml), or in the global config (~/.drybones.conf) for ones used in every project:
+#     search-macros:
+#       DS: [pa, mana, ne, pua, pia, puna, pina]  # any of these strings
+#       C: "[ptkmnsrl]"  # a regex
+# a query uses a macro by putting its name in square brackets; only defined names are expanded, so regex character classes like [ptk] are left alone
+# a query with a macro in it is searched as a regex (a plain string query has the rest of it escaped), except with s/, which always searches for the string as typed, and fuzzy queries (f/), which are for a single word
+# a list of strings becomes a regex shaped like a trie, e.g. p(?:a|i(?:a|na)|u(?:a|na)) instead of pa|pia|pina|pua|puna,
+# so the regex engine only has to look at each character once instead of once per alternative; where one string starts another, the longer one is tried first
+
+import re
+import yaml
+from pathlib import Path
+from typing import List
+
+from drybones.BooleanQuery import BooleanQuery
+from drybones.Constants import GLOBAL_CONFIG_FP, PROJECT_CONFIG_FILE_NAME
+from drybones.ProjectUtil import get_closest_parent_drybones_dir
+from drybones.SearchUtil import is_regex_is_match, get_fuzzy_query, EXPLICIT_STRING_SEARCH_MARKER, REGEX_SEARCH_MARKER, REGEX_MATCH_MARKER
+
+
+SEARCH_MACROS_CONFIG_KEY = "search-macros"
+MACRO_NAME_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+MACRO_REFERENCE_PATTERN = re.compile(r"\[([A-Za-z_][A-Za-z0-9_]*)\]")
+
+
+class SearchMacros:
+    def __init__(self, regexes_by_name: dict):
+        self.regexes_by_name = regexes_by_name  # macro name -> the regex it expands to
+        self.expanded_queries = {}  # query -> (query with the macros expanded, its compiled regex or None if it had no macros), so each query is only expanded and compiled once per session
+        self.patterns = {}  # expanded query -> its compiled regex, for the search to use instead of compiling it again (see SearchUtil.iter_search_matches())
+
+    def __len__(self):
+        return len(self.regexes_by_name)
+
+    def expand_query(self, query: str) -> str:
+        # the query with every macro replaced by its regex, or the same query if it has no macros in it
+        entry = self.expanded_queries.get(query)
+        if entry is None:
+            expanded = self.get_expanded_query(query)
+            pattern = None
+            if expanded != query:
+                # so a bad combination of a macro with the rest of the query fails here rather than in the search
+                _, _, stripped = is_regex_is_match(expanded)
+                pattern = re.compile(stripped)
+                self.patterns[expanded] = pattern
+            entry = (expanded, pattern)
+            self.expanded_queries[query] = entry
+        return entry[0]
+
+    def expand_search_query(self, query):
+        # query is a (row query, text query) pair or a BooleanQuery
+        if type(query) is BooleanQuery:
+            return query.map_terms(self.expand_search_query)
+        row_query, text_query = query
+        return self.expand_query(row_query), self.expand_query(text_query)
+
+    def get_expanded_query(self, query: str) -> str:
+        if query.startswith(EXPLICIT_STRING_SEARCH_MARKER) or get_fuzzy_query(query) is not None:
+            return query
+        is_regex, is_match, stripped = is_regex_is_match(query)
+        pieces = []
+        last_end = 0
+        for m in MACRO_REFERENCE_PATTERN.finditer(stripped):
+            regex = self.regexes_by_name.get(m.group(1))
+            if regex is None:
+                continue
+            text_before = stripped[last_end:m.start()]
+            pieces.append(text_before if is_regex else re.escape(text_before))
+            pieces.append(f"(?:{regex})")
+            last_end = m.end()
+        if last_end == 0:
+            return query
+        text_after = stripped[last_end:]
+        pieces.append(text_after if is_regex else re.escape(text_after))
+        return (REGEX_MATCH_MARKER if is_match else REGEX_SEARCH_MARKER) + "".join(pieces)
+
+
+def get_search_macros(corpus_dir: Path) -> SearchMacros:
+    # the project's macros, plus the global ones it doesn't redefine
+    # raises ValueError if a macro is defined wrong
+    definitions = {}
+    drybones_dir = get_closest_parent_drybones_dir(corpus_dir)
+    config_fps = [GLOBAL_CONFIG_FP] + ([drybones_dir / PROJECT_CONFIG_FILE_NAME] if drybones_dir is not None else [])
+    for fp in config_fps:
+        definitions.update(get_search_macro_definitions_from_config(fp))
+
+    regexes_by_name = {}
+    for name, definition in definitions.items():
+        if type(name) is not str or MACRO_NAME_PATTERN.fullmatch(name) is None:
+            raise ValueError(f"search macro name {name!r} should be letters, digits, and underscores, not starting with a digit")
+        if type(definition) is list:
+            strings = [str(s) for s in definition if str(s) != ""]
+            if len(strings) == 0:
+                raise ValueError(f"search macro {name!r} has no strings in it")
+            regex = get_trie_regex(strings)
+        elif type(definition) is str:
+            regex = definition
+        else:
+            raise ValueError(f"search macro {name!r} should be a list of strings or a regex, not {definition!r}")
+        try:
+            re.compile(regex)
+        except re.error as e:
+            raise ValueError(f"search macro {name!r} is not a valid regex: {e}")
+        regexes_by_name[name] = regex
+    return SearchMacros(regexes_by_name)
+
+
+def get_search_macro_definitions_from_config(fp: Path) -> dict:
+    if not fp.exists():
+        return {}
+    with open(fp, encoding="utf-8") as f:
+        contents = yaml.safe_load(f)
+    if type(contents) is not dict:
+        # e.g. the global config, which is an empty file until something is put in it
+        return {}
+    definitions = contents.get(SEARCH_MACROS_CONFIG_KEY) or {}
+    if type(definitions) is not dict:
+        raise ValueError(f"`{SEARCH_MACROS_CONFIG_KEY}` in {fp} should map macro names to their definitions")
+    return definitions
+
+
+def get_trie_regex(strings: List[str]) -> str:
+    trie = {}
+    for s in strings:
+        node = trie
+        for c in s:
+            node = node.setdefault(c, {})
+        node[""] = {}  # a string ends here
+    return get_trie_node_regex(trie)
+
+
+def get_trie_node_regex(node: dict) -> str:
+    branches = [re.escape(c) + get_trie_node_regex(child) for c, child in sorted(node.items()) if c != ""]
+    if len(branches) == 0:
+        return ""
+    regex = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        # a string ends here but others go on; greedy, so the longer ones are tried first
+        return f"(?:{regex})?"
+    return regex
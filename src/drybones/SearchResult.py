@@ -23,32 +23,36 @@ class SearchResult:
         return s
 
     def get_highlighted_string(self):
-        # 012345678901234
-        # asdfghjkl
-        # a[s]dfghjkl
-        # a[s]d[fg]hjkl
-        # a[s]d[fg][h]jkl
-        # 012345678901234
+        return get_highlighted_string(self.string, self.spans)
 
-        s = self.string
-        offset = 0
-        for start, end in self.spans:
-            orig = self.string[start:end]  # the spans are not offset, so get the substring from the original string
-            hl = SUB_HIGHLIGHT(orig)
-            len_diff = len(hl) - len(orig)
 
-            # assume the spans are in order, so we are always getting start and end indices that are after the portion causing the offset, and thus their indices will be offset
-            start_in_s = start + offset
-            end_in_s = end + offset
+def get_highlighted_string(string: str, spans: List[Tuple[int, int]]) -> str:
+    # 012345678901234
+    # asdfghjkl
+    # a[s]dfghjkl
+    # a[s]d[fg]hjkl
+    # a[s]d[fg][h]jkl
+    # 012345678901234
 
-            s = s[:start_in_s] + hl + s[end_in_s:]
+    s = string
+    offset = 0
+    for start, end in spans:
+        orig = string[start:end]  # the spans are not offset, so get the substring from the original string
+        hl = SUB_HIGHLIGHT(orig)
+        len_diff = len(hl) - len(orig)
 
-            # offset goes up if we add chars when highlighting the substring
-            offset += len_diff
-            if offset < 0:
-                raise ValueError(f"offset went negative: {offset}\nin SearchResult: {self.to_detailed_display_string()}")
-        
-        return s
+        # assume the spans are in order, so we are always getting start and end indices that are after the portion causing the offset, and thus their indices will be offset
+        start_in_s = start + offset
+        end_in_s = end + offset
+
+        s = s[:start_in_s] + hl + s[end_in_s:]
+
+        # offset goes up if we add chars when highlighting the substring
+        offset += len_diff
+        if offset < 0:
+            raise ValueError(f"offset went negative: {offset}\nin string {string!r} with spans {spans}")
+    
+    return s
 
 
 
@@ -0,0 +1,157 @@
+# the state kept for an interactive search session: the loaded index, the worker processes if any, and the results of recent queries
+# repeating a query (e.g. with `;;`) shows the results from the first time straight away, instead of searching the corpus again
+# regexes are run in a worker process with a time limit (if the session has one), so one that never finishes can be cancelled without losing the loaded index
+# `:reload` picks up changes to the .dry files (only re-indexing the files that changed) and forgets just the cached results those changes could affect
+
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Set, Tuple
+
+from drybones.BooleanQuery import BooleanQuery
+from drybones.DiacriticsUtil import get_char_to_alternatives_dict, get_diacritics_conf_fp
+from drybones.ReadingUtil import get_drybones_file_states
+from drybones.SearchIndex import get_search_index
+from drybones.SearchMacros import SearchMacros, get_search_macros
+from drybones.SearchResult import SearchResult
+from drybones.SearchShardPool import SearchShardPool, SearchTimeoutException
+from drybones.SearchUtil import iter_search_matches, get_search_plan, iter_text_matches_in_index, get_fuzzy_query, is_regex_is_match
+
+
+MAX_CACHED_QUERIES = 100
+
+
+class SearchSession:
+    def __init__(self, corpus_dir: Path, macros: SearchMacros, use_cache: bool=True, n_workers: int|None=None, n_search_processes: int|None=None, regex_timeout: float|None=None):
+        self.corpus_dir = corpus_dir
+        self.macros = macros  # the search macros from the config, with every query that has been expanded with them so far
+        self.use_cache = use_cache
+        self.n_workers = n_workers
+        self.n_search_processes = n_search_processes
+        self.regex_timeout = regex_timeout  # seconds, or None for no limit (and for running regexes in this process if there's no pool anyway)
+        self.diacritics_conf_fp = get_diacritics_conf_fp()
+        self.search_index = None
+        self.pool = None
+        self.file_states = None
+        self.diacritics_conf_state = None
+        # query key -> (search results, file paths that the results are in, the query), least recently used first
+        self.cached_results = OrderedDict()
+        self.load(show_progress=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def load(self, show_progress: bool=False) -> None:
+        # the file states are taken before reading the files, so a file saved while we're reading it counts as changed next time
+        self.file_states = get_drybones_file_states(self.corpus_dir)
+        self.diacritics_conf_state = get_file_state(self.diacritics_conf_fp)
+        diacritic_dict = get_char_to_alternatives_dict(self.diacritics_conf_fp)
+        self.search_index = get_search_index(self.corpus_dir, diacritic_dict, use_cache=self.use_cache, n_workers=self.n_workers, show_progress=show_progress)
+        if self.pool is not None:
+            # the workers have their own copies of the rows, which are out of date now
+            self.pool.close()
+            self.pool = None
+        if (self.n_search_processes is not None and self.n_search_processes > 1) or self.regex_timeout is not None:
+            self.pool = SearchShardPool(self.search_index, max(1, self.n_search_processes or 1), timeout=self.regex_timeout)
+
+    def search(self, row_query: str, text_query: str) -> Tuple[List[SearchResult], bool]:
+        # the results, and whether they came from the cache
+        # raises SearchTimeoutException if a regex takes longer than the session's regex timeout
+        # the queries should already have their macros expanded (with expand_search_query()), so the cache doesn't confuse queries from before and after a change to the macros
+        return self.get_search_results(get_query_key(row_query, text_query), (row_query, text_query), lambda: iter_search_matches(row_query, text_query, self.search_index, pool=self.pool, patterns=self.macros.patterns))
+
+    def search_boolean(self, query: BooleanQuery) -> Tuple[List[SearchResult], bool]:
+        return self.get_search_results(query.get_key(), query, lambda: query.iter_matches(self.search_index, pool=self.pool, patterns=self.macros.patterns))
+
+    def get_search_results(self, key: tuple, query, get_matches) -> Tuple[List[SearchResult], bool]:
+        cached = self.cached_results.get(key)
+        if cached is not None:
+            self.cached_results.move_to_end(key)
+            search_results, _, _ = cached
+            return search_results, True
+
+        search_results = []
+        result_fps = set()
+        for row_id, spans in get_matches():
+            row, line = self.search_index.get_row_and_line(row_id)
+            search_results.append(SearchResult(string=self.search_index.row_contents[row_id], spans=spans, row=row, line=line))
+            result_fps.add(self.search_index.fps[self.search_index.row_file_ids[row_id]])
+        self.cached_results[key] = (search_results, result_fps, query)
+        if len(self.cached_results) > MAX_CACHED_QUERIES:
+            self.cached_results.popitem(last=False)
+        return search_results, False
+
+    def expand_search_query(self, query):
+        return self.macros.expand_search_query(query)
+
+    def reload(self) -> Tuple[List[Path], int]:
+        # the files that were added, removed, or changed since the last load, and how many cached queries were forgotten because of them
+        # also reads the search macros again, in case they were changed in the config; raises ValueError (before reloading anything) if one is defined wrong
+        self.macros = get_search_macros(self.corpus_dir)
+        old_file_states = self.file_states
+        old_diacritics_conf_state = self.diacritics_conf_state
+        new_file_states = get_drybones_file_states(self.corpus_dir)
+        changed_fps = sorted(fp for fp in set(old_file_states) | set(new_file_states) if old_file_states.get(fp) != new_file_states.get(fp))
+        diacritics_changed = get_file_state(self.diacritics_conf_fp) != old_diacritics_conf_state
+        if len(changed_fps) == 0 and not diacritics_changed:
+            return [], 0
+
+        self.load()
+        n_cached = len(self.cached_results)
+        if diacritics_changed:
+            # every row's normalized contents may be different now
+            self.cached_results.clear()
+            return changed_fps, n_cached
+
+        changed_fps_set = set(changed_fps)
+        for key, (_, result_fps, query) in list(self.cached_results.items()):
+            # a query is affected if it had results in a changed file (they may be gone or different now), or if it has results in one now
+            if len(result_fps & changed_fps_set) > 0:
+                del self.cached_results[key]
+                continue
+            try:
+                # in the pool, with the regex timeout, like the query itself was
+                has_matches = has_search_matches_in_files(query, self.search_index, changed_fps_set, pool=self.pool, patterns=self.macros.patterns)
+            except SearchTimeoutException:
+                # can't tell without waiting who knows how long, so just forget it
+                has_matches = True
+            if has_matches:
+                del self.cached_results[key]
+        return changed_fps, n_cached - len(self.cached_results)
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+
+def get_query_key(row_query: str, text_query: str) -> tuple:
+    # queries that mean the same thing, like "abc" and "s/abc", share a key (but "f/abc" and "s/f/abc" don't)
+    return (is_regex_is_match(row_query), is_regex_is_match(text_query), get_fuzzy_query(text_query))
+
+
+def has_search_matches_in_files(query, search_index, fps: Set[Path], pool=None, patterns: dict|None=None) -> bool:
+    # query is a (row query, text query) pair or a BooleanQuery
+    # raises SearchTimeoutException if the pool has a timeout and a regex takes longer than it
+    file_ids = {file_id for file_id, fp in enumerate(search_index.fps) if fp in fps}
+    if len(file_ids) == 0:
+        return False
+    if type(query) is BooleanQuery:
+        row_line_ids = search_index.get_row_line_ids()
+        line_ids = {row_line_ids[row_id] for row_id in range(len(search_index)) if search_index.row_file_ids[row_id] in file_ids}
+        return query.has_matches_in_lines(search_index, line_ids, pool=pool, patterns=patterns)
+    row_query, text_query = query
+    row_ids_to_search, text_match_query = get_search_plan(row_query, text_query, search_index, patterns=patterns)
+    row_ids = [row_id for row_id in row_ids_to_search if search_index.row_file_ids[row_id] in file_ids]
+    return any(True for _ in iter_text_matches_in_index(text_match_query, row_ids, search_index, pool=pool, patterns=patterns))
+
+
+def get_file_state(fp: Path) -> Tuple[int, int] | None:
+    try:
+        st = os.stat(fp)
+    except FileNotFoundError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
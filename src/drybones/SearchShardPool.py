@@ -0,0 +1,122 @@
+# worker processes for running a search over a big corpus on more than one core
+# the rows are split into contiguous shards by row id, and each worker keeps its own shard's normalized contents for as long as the pool is open,
+# so in an interactive session only the first query pays for starting the workers and sending them the rows
+# with a timeout, the pool also keeps a regex that takes too long (e.g. from catastrophic backtracking) from freezing the session:
+# the workers are killed and new ones started in their place, while the index stays loaded in the parent process
+
+import multiprocessing
+import signal
+import time
+from array import array
+from bisect import bisect_left
+from typing import Iterator, List, Tuple
+
+from drybones.SearchUtil import iter_text_matches
+
+
+class SearchTimeoutException(Exception):
+    pass
+
+
+class SearchShardPool:
+    def __init__(self, search_index, n_workers: int, timeout: float|None=None):
+        self.search_index = search_index  # kept for starting new workers if the old ones have to be killed
+        self.timeout = timeout  # seconds a query can take before it's cancelled, or None to wait as long as it takes
+        self.n_workers = n_workers
+        n_rows = len(search_index)
+        # shard i has the rows with ids from bounds[i] up to (but not including) bounds[i+1]
+        self.bounds = [n_rows * i // n_workers for i in range(n_workers + 1)]
+        self.connections = []
+        self.processes = []
+        self.start_workers()
+
+    def start_workers(self) -> None:
+        for i in range(len(self.bounds) - 1):
+            first_row_id, end_row_id = self.bounds[i], self.bounds[i+1]
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=run_search_shard_worker, args=(child_conn, first_row_id, self.search_index.row_normalized_contents[first_row_id:end_row_id]), daemon=True)
+            process.start()
+            child_conn.close()
+            self.connections.append(parent_conn)
+            self.processes.append(process)
+
+    def restart_workers(self) -> None:
+        # for when a worker is stuck on a query; there's no way to interrupt a regex from outside its process, so the workers are killed instead
+        for process in self.processes:
+            process.kill()
+        for process in self.processes:
+            process.join()
+        for conn in self.connections:
+            conn.close()
+        self.connections = []
+        self.processes = []
+        self.start_workers()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def iter_text_matches(self, text_query: str, row_ids: List[int]) -> Iterator[Tuple[int, List[Tuple[int, int]]]]:
+        # same as SearchUtil.iter_text_matches() on the whole index, with every shard searched at the same time
+        # row_ids has to be sorted; since the shards are in order too, the results come back in corpus order just by going through the shards in order
+        shard_starts = [bisect_left(row_ids, bound) for bound in self.bounds]
+        for i, conn in enumerate(self.connections):
+            conn.send((text_query, array("I", row_ids[shard_starts[i] : shard_starts[i+1]])))
+        # every worker has to be heard from before the next query, even if the caller stops early (e.g. --limit), or its answer would get read as the next query's
+        # raises SearchTimeoutException if the query takes longer than the timeout, and lets KeyboardInterrupt through, in both cases with the workers replaced by new ones
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        connections = self.connections
+        n_received = 0
+        try:
+            for conn in connections:
+                status, result = self.receive(conn, deadline)
+                n_received += 1
+                if status == "error":
+                    raise RuntimeError(f"search worker failed: {result}")
+                yield from result
+        finally:
+            # after a restart, the workers that haven't answered are gone, and the new ones don't owe us anything
+            if connections is self.connections:
+                for conn in connections[n_received:]:
+                    self.receive(conn, deadline)
+
+    def receive(self, conn, deadline: float|None):
+        try:
+            if deadline is not None and not conn.poll(max(0, deadline - time.monotonic())):
+                self.restart_workers()
+                raise SearchTimeoutException(f"search took longer than {self.timeout:g} seconds and was cancelled")
+            return conn.recv()
+        except KeyboardInterrupt:
+            self.restart_workers()
+            raise
+
+    def close(self) -> None:
+        for conn in self.connections:
+            try:
+                conn.send(None)
+                conn.close()
+            except OSError:
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+        self.connections = []
+        self.processes = []
+
+
+def run_search_shard_worker(conn, first_row_id: int, normalized_contents: List[str]) -> None:
+    # runs in its own process until the pool sends None
+    # Ctrl-C is for the parent process to deal with (by replacing the workers), not for every worker to print a traceback about
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        task = conn.recv()
+        if task is None:
+            return
+        text_query, row_ids = task
+        try:
+            result = list(iter_text_matches(text_query, row_ids, normalized_contents, first_row_id=first_row_id))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+            continue
+        conn.send(("ok", result))
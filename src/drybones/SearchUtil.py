@@ -0,0 +1,216 @@
+# running `dry search` queries against the search index, apart from how the results are shown
+# shared by the search command itself and the search daemon
+
+import re
+from typing import Iterator, List, Tuple
+
+from drybones.BKTree import get_bk_tree
+from drybones.Cell import Cell
+from drybones.Row import Row
+from drybones.SearchResult import SearchResult
+from drybones.StringMatch import StringMatch
+
+
+STRING_MATCH_MARKER = "m/"
+REGEX_SEARCH_MARKER = "r/"
+REGEX_MATCH_MARKER = "rm/"
+EXPLICIT_STRING_SEARCH_MARKER = "s/"
+# text queries only: f/omore is every word or morpheme within edit distance 1 of omore, f2/omore within 2, and so on
+FUZZY_SEARCH_MARKER_PATTERN = re.compile(r"f(\d*)/")
+DEFAULT_FUZZY_DISTANCE = 1
+
+PARALLEL_SEARCH_MIN_ROWS = 20000  # below this, sending the rows to the worker processes and the results back takes longer than just searching them here
+
+
+def iter_search_matches(row_query, text_query, search_index, pool=None, patterns: dict|None=None) -> Iterator[Tuple[int, List[Tuple[int, int]]]]:
+    # (row id, spans of the row's contents as in the file) for every matching row, in corpus order, as they're found
+    # nothing here loads the actual lines, so this is all that's needed for counting results or printing them in batch mode
+    # pool is a SearchShardPool to spread the matching across, if there's enough of it to be worth it
+    # patterns is regex queries that have already been compiled, query -> re.Pattern (SearchMacros.patterns), so they aren't compiled again
+    text_query_is_regex, _, text_query_stripped = is_regex_is_match(text_query)
+    if text_query_is_regex and (patterns is None or text_query not in patterns):
+        # so an invalid regex fails here, the same way whether or not the matching is done in other processes
+        re.compile(text_query_stripped)
+    row_ids_to_search, text_match_query = get_search_plan(row_query, text_query, search_index, patterns=patterns)
+    normalized_matches = iter_text_matches_in_index(text_match_query, row_ids_to_search, search_index, pool=pool, patterns=patterns)
+    for row_id, spans in normalized_matches:
+        # highlight the matches in the row as it is in the file, not the converted one they were found in
+        yield row_id, search_index.get_original_spans(row_id, spans)
+
+
+def get_search_plan(row_query, text_query, search_index, patterns: dict|None=None) -> Tuple[List[int], str]:
+    # (the rows the text query has to be run on, in order; what to run on them, see get_text_match_query())
+    # for a fuzzy query, the BK-tree is only searched once, for both
+    fuzzy_tokens = get_query_fuzzy_tokens(text_query, search_index)
+    return get_row_ids_to_search(row_query, text_query, search_index, fuzzy_tokens=fuzzy_tokens, patterns=patterns), get_text_match_query(text_query, fuzzy_tokens)
+
+
+def get_row_ids_to_search(row_query, text_query, search_index, fuzzy_tokens: List[str]|None=None, patterns: dict|None=None) -> List[int]:
+    # the rows the text query has to be run on, in order
+    # fuzzy_tokens is what get_query_fuzzy_tokens() gave for the text query, if it's already been looked up
+    # patterns as in iter_search_matches()
+    text_query_is_regex, text_query_is_match, text_query_stripped = is_regex_is_match(text_query)
+    if fuzzy_tokens is None:
+        fuzzy_tokens = get_query_fuzzy_tokens(text_query, search_index)
+
+    # only look at the rows that the index says could match: the ones with the right words in them for plain string and fuzzy queries, or the right trigrams for regex queries
+    if fuzzy_tokens is not None:
+        candidate_row_ids = search_index.get_row_ids_with_any_token(fuzzy_tokens)
+    elif text_query_is_regex:
+        candidate_row_ids = search_index.get_candidate_row_ids_for_regex_query(text_query_stripped)
+    else:
+        candidate_row_ids = search_index.get_candidate_row_ids_for_string_query(text_query_stripped, full_match=text_query_is_match)
+
+    # the row query only needs checking once for each distinct label, not for every row
+    row_match_func = get_match_func(row_query, patterns=patterns)
+    labels_to_search = [label for label, normalized_label in search_index.normalized_labels.items() if len(row_match_func(normalized_label)) > 0]
+    if candidate_row_ids is None:
+        return search_index.get_row_ids_with_labels(labels_to_search)
+    else:
+        labels_to_search = set(labels_to_search)
+        return sorted(row_id for row_id in candidate_row_ids if search_index.row_labels[row_id] in labels_to_search)
+
+
+def iter_text_matches(text_query, row_ids, normalized_contents, first_row_id: int=0, patterns: dict|None=None) -> Iterator[Tuple[int, List[Tuple[int, int]]]]:
+    # (row id, spans of the normalized contents) for the rows that match; normalized_contents[i] is the row with id first_row_id + i
+    # a fuzzy text query has to be turned into the words it matches with get_search_plan() first, since this doesn't have the index
+    text_match_func = get_match_func(text_query, patterns=patterns)
+    for row_id in row_ids:
+        matches = text_match_func(normalized_contents[row_id - first_row_id])
+        if len(matches) > 0:
+            yield row_id, [m.span() for m in matches]
+
+
+def iter_text_matches_in_index(text_query, row_ids, search_index, pool=None, patterns: dict|None=None) -> Iterator[Tuple[int, List[Tuple[int, int]]]]:
+    # iter_text_matches() on the index's rows, in the pool's processes if there's a pool and it's worth it:
+    # when there are enough rows to split between its workers, or for any regex if the pool has a timeout, so a regex that never finishes can be cancelled without losing the index
+    # the workers compile the query themselves, so patterns is only used when it's run here
+    text_query_is_regex, _, _ = is_regex_is_match(text_query)
+    if pool is not None and ((pool.n_workers > 1 and len(row_ids) >= PARALLEL_SEARCH_MIN_ROWS) or (text_query_is_regex and pool.timeout is not None)):
+        return pool.iter_text_matches(text_query, row_ids)
+    return iter_text_matches(text_query, row_ids, search_index.row_normalized_contents, patterns=patterns)
+
+
+def get_match_func(query, patterns: dict|None=None):
+    # TODO add option for user to require matching diacritics (e.g. imagine searching a corpus of Vietnamese and you don't want all the words that differ only in diacritics from your query)
+    # the index already has every label and row with diacritics converted to base, so that doesn't need to be done again for every query
+    # patterns as in iter_search_matches(); a query that isn't in it is compiled here
+    is_regex, is_match, stripped = is_regex_is_match(query)
+    if is_regex:
+        # compiled once here rather than looked up in re's cache for every row
+        pattern = None if patterns is None else patterns.get(query)
+        if pattern is None:
+            pattern = re.compile(stripped)
+        return lambda test_str: get_regex_matches(pattern, test_str, full_match=is_match)
+    else:
+        return lambda test_str: get_string_matches(stripped, test_str, full_match=is_match)
+
+
+def get_fuzzy_query(query) -> Tuple[str, int] | None:
+    # (the word, the maximum edit distance) if it's a fuzzy query, else None
+    m = FUZZY_SEARCH_MARKER_PATTERN.match(query)
+    if m is None:
+        return None
+    return query[m.end():], (int(m.group(1)) if m.group(1) != "" else DEFAULT_FUZZY_DISTANCE)
+
+
+def get_fuzzy_tokens(word: str, max_distance: int, search_index) -> List[str]:
+    # the words and morphemes in the corpus within max_distance of word, closest first
+    return [token for _, token in get_bk_tree(search_index).find(word, max_distance)]
+
+
+def get_query_fuzzy_tokens(text_query, search_index) -> List[str] | None:
+    # the tokens a fuzzy text query matches, or None if it's not a fuzzy query
+    fuzzy_query = get_fuzzy_query(text_query)
+    if fuzzy_query is None:
+        return None
+    return get_fuzzy_tokens(*fuzzy_query, search_index)
+
+
+def get_text_match_query(text_query, fuzzy_tokens: List[str]|None):
+    # what to run on the rows for this text query: the query itself, or for a fuzzy query (with the tokens from get_query_fuzzy_tokens()), a regex for any of the words and morphemes it matches
+    if fuzzy_tokens is None:
+        return text_query
+    tokens = fuzzy_tokens
+    if len(tokens) == 0:
+        # matches nothing
+        return REGEX_SEARCH_MARKER + "(?!)"
+    # only whole tokens, so a morpheme that's close to the query isn't highlighted inside a longer word; the longest first, so a whole word wins over its first morpheme
+    delimiters = re.escape(Row.INTRA_ROW_DELIMITER + Cell.INTRA_CELL_DELIMITER)
+    alternatives = "|".join(re.escape(token) for token in sorted(tokens, key=len, reverse=True))
+    return REGEX_SEARCH_MARKER + f"(?<![^{delimiters}])(?:{alternatives})(?![^{delimiters}])"
+
+
+def get_search_results(row_query, text_query, search_index, pool=None) -> List[SearchResult]:
+    search_results = []
+    for row_id, spans in iter_search_matches(row_query, text_query, search_index, pool=pool):
+        row, line = search_index.get_row_and_line(row_id)  # want reference back to the parent line so user can see where it is
+        sr = SearchResult(string=search_index.row_contents[row_id], spans=spans, row=row, line=line)
+        search_results.append(sr)
+    return search_results
+
+
+def get_search_match_dict(search_index, row_id: int, spans: List[Tuple[int, int]]) -> dict:
+    # what batch mode prints for each result (as a JSON object, for --jsonl), also what the search daemon sends for it
+    return {"text": search_index.row_contents[row_id], "designation": search_index.row_designations[row_id], "label": search_index.row_labels[row_id], "spans": spans}
+
+
+def strip_marker(original_s, enforce_only_one_marker=False):
+    s = original_s
+    
+    if s.startswith(EXPLICIT_STRING_SEARCH_MARKER):
+        # this one behaves differently: if the string starts with it, accept the rest as a raw string and don't check for other markers; who knows, maybe user wants to search for the actual string "r/a" or something that we don't want the command to parse
+        # doesn't matter if enforce_only_one_marker is true
+        return s[len(EXPLICIT_STRING_SEARCH_MARKER):]
+    # otherwise, check for the other special markers
+    
+    already_changed = False  # for enforcing only one marker on the string        
+    for marker in [STRING_MATCH_MARKER, REGEX_SEARCH_MARKER, REGEX_MATCH_MARKER]:
+        if enforce_only_one_marker:
+            s, changed = strip_single_marker(s, marker)
+            if already_changed and changed:
+                raise ValueError(f"string {original_s!r} starts with more than one special marker for regex/match functionality")
+            elif changed:
+                already_changed = True
+        else:
+            # just take the first one
+            s, changed = strip_single_marker(s, marker)
+            if changed:
+                break
+    return s
+
+
+def is_regex_is_match(s):
+    is_regex = s.startswith(REGEX_SEARCH_MARKER) or s.startswith(REGEX_MATCH_MARKER)
+    is_match = s.startswith(STRING_MATCH_MARKER) or s.startswith(REGEX_MATCH_MARKER)
+    s_stripped = strip_marker(s)
+    return is_regex, is_match, s_stripped
+
+
+def strip_single_marker(s, marker):
+    return (s[len(marker):], True) if s.startswith(marker) else (s, False)
+
+
+def get_regex_matches(pattern: str|re.Pattern, test_string, full_match: bool) -> List[re.Match]:
+    if full_match:
+        m = re.fullmatch(pattern, test_string)
+        return [m] if m is not None else []
+    else:
+        # list of re.Match objects
+        return list(re.finditer(pattern, test_string))
+
+
+def get_string_matches(pattern, test_string, full_match: bool) -> List[StringMatch]:
+    if full_match:
+        return [StringMatch(test_string, 0, len(test_string))] if pattern == test_string else []
+    elif pattern == "":
+        # would "match" between every pair of chars, with nothing to highlight
+        return []
+    else:
+        # non-overlapping, left to right, like re.finditer, so the spans can all be highlighted
+        matches = []
+        i = test_string.find(pattern)
+        while i != -1:
+            matches.append(StringMatch(test_string, i, i+len(pattern)))
+            i = test_string.find(pattern, i+len(pattern))
+        return matches
@@ -0,0 +1,52 @@
+# which .dry file each text name refers to, saved in the project's .drybones cache dir
+# so looking up a text by name doesn't have to walk the whole corpus dir every time
+# it also records the mtime of every dir it looked in; adding, removing, or renaming a file or subdir changes its parent dir's mtime, so if any of those changed, the registry is stale and the corpus dir gets scanned again
+
+import json
+import os
+from pathlib import Path
+from typing import Dict
+
+from drybones.ParseCache import write_atomically
+
+
+class TextRegistry:
+    FORMAT_VERSION = 1
+    FILE_NAME = "text_registry.json"
+
+    def __init__(self, scanned_dir: Path, fps_by_name: Dict[str, Path], dir_mtimes: Dict[str, int]):
+        self.scanned_dir = scanned_dir
+        self.fps_by_name = fps_by_name
+        self.dir_mtimes = dir_mtimes  # dir path relative to scanned_dir -> st_mtime_ns when it was scanned
+
+    def is_up_to_date(self) -> bool:
+        for rel_dir, mtime_ns in self.dir_mtimes.items():
+            try:
+                if os.stat(self.scanned_dir / rel_dir).st_mtime_ns != mtime_ns:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def save(self, fp: Path) -> None:
+        contents = {
+            "version": TextRegistry.FORMAT_VERSION,
+            "scanned_dir": self.scanned_dir.absolute().as_posix(),
+            "texts": {name: text_fp.relative_to(self.scanned_dir).as_posix() for name, text_fp in self.fps_by_name.items()},
+            "dirs": self.dir_mtimes,
+        }
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        write_atomically(fp, json.dumps(contents, indent=1).encode("utf-8"))
+
+    @staticmethod
+    def load(fp: Path, scanned_dir: Path):
+        # returns None if there is no registry for this dir yet, so the caller knows to scan
+        try:
+            with open(fp, encoding="utf-8") as f:
+                contents = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if contents.get("version") != TextRegistry.FORMAT_VERSION or contents.get("scanned_dir") != scanned_dir.absolute().as_posix():
+            return None
+        fps_by_name = {name: scanned_dir / rel_fp for name, rel_fp in contents["texts"].items()}
+        return TextRegistry(scanned_dir, fps_by_name, contents["dirs"])
@@ -10,7 +10,7 @@ from drybones.BasicREPL import BasicREPL
 from drybones.DiacriticsUtil import get_char_to_alternatives_dict, translate_diacritic_alternatives_in_string
 from drybones.InvalidInput import InvalidInput
 from drybones.ProjectUtil import get_corpus_dir
-from drybones.ReadingUtil import get_lines_from_all_drybones_files_in_dir
+from drybones.ReadingUtil import iter_lines_from_all_drybones_files_in_dir
 from drybones.REPLUtil import unpack_args, validate_int
 from drybones.WordAnalysis import WordAnalysis
 
@@ -18,10 +18,12 @@ from drybones.WordAnalysis import WordAnalysis
 @click.command()
 @click.pass_context
 @click.option("--match-diacritics", "-d", type=bool, is_flag=True, help="Force matching of diacritics (ignored by default)")
-def analyze(ctx, match_diacritics: bool=False):
+@click.option("--no-cache", type=bool, is_flag=True, help="Re-parse every .dry file instead of using the parsed copies cached in the project's .drybones dir.")
+@click.option("--workers", "-j", type=click.IntRange(min=1), default=None, help="Number of processes to use for parsing .dry files that aren't cached (default: one per CPU; 1 parses everything in this process).")
+def analyze(ctx, match_diacritics: bool=False, no_cache: bool=False, workers: int|None=None):
     """Show/add/modify analyses for a given wordform."""
     corpus_dir = get_corpus_dir(Path.cwd())
-    lines_from_all_files = get_lines_from_all_drybones_files_in_dir(corpus_dir)
+    lines_from_all_files = iter_lines_from_all_drybones_files_in_dir(corpus_dir, use_cache=not no_cache, n_workers=workers)  # only need to go through them once, to get the analyses
     known_analyses_by_word = get_known_analyses(lines_from_all_files, match_diacritics=match_diacritics)
 
     diacritics_dict = get_char_to_alternatives_dict()
@@ -0,0 +1,94 @@
+# checking every text in the project for problems, all at once
+# so on a big (e.g. just imported) corpus you don't have to keep re-running a command that stops at the first error
+
+import click
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from drybones.CheckCache import CheckCache
+from drybones.CheckingUtil import check_drybones_file_for_cache, get_designation_problems_across_texts
+from drybones.ProjectUtil import get_corpus_dir, get_cache_dir
+from drybones.ReadingUtil import scan_dir_for_drybones_files, PARALLEL_LOAD_MIN_FILES
+
+
+@click.command()
+@click.option("--no-cache", type=bool, is_flag=True, help="Check every file again, even the ones that haven't changed since the last check.")
+@click.option("--workers", "-j", type=click.IntRange(min=1), default=None, help="Number of processes to use for checking files (default: one per CPU; 1 checks everything in this process).")
+@click.pass_context
+def check(ctx, no_cache, workers):
+    """Check all texts for problems, and report all of them at once."""
+    corpus_dir = get_corpus_dir(Path.cwd())
+    # scan the dir ourselves rather than going through the text registry, which stops at duplicate text names, and we want to report those along with everything else
+    fps, _dir_mtimes = scan_dir_for_drybones_files(corpus_dir)
+    cache_dir = get_cache_dir(corpus_dir)
+    cache = None if cache_dir is None else CheckCache(cache_dir, root_dir=cache_dir.parent.parent.absolute())
+
+    results = {}
+    if cache is not None and not no_cache:
+        for fp in fps:
+            result = cache.get(fp)
+            if result is not None:
+                results[fp] = result
+    n_unchanged = len(results)
+    fps_to_check = [fp for fp in fps if fp not in results]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1 and len(fps_to_check) >= PARALLEL_LOAD_MIN_FILES:
+        with ProcessPoolExecutor(max_workers=min(workers, len(fps_to_check))) as executor:
+            checked = executor.map(check_drybones_file_for_cache, fps_to_check, chunksize=4)
+            record_check_results(fps_to_check, checked, results, cache)
+    else:
+        checked = (check_drybones_file_for_cache(fp) for fp in fps_to_check)
+        record_check_results(fps_to_check, checked, results, cache)
+
+    if cache is not None:
+        cache.prune(fps)
+        cache.save()
+
+    n_problems = 0
+    fps_with_problems = set()
+    for fp in fps:
+        problems, designations = results[fp]
+        for line_number, message in sorted(problems):
+            click.echo(f"{fp}:{line_number}: {message}")
+            n_problems += 1
+            fps_with_problems.add(fp)
+
+    fps_by_text_name = defaultdict(list)
+    for fp in fps:
+        fps_by_text_name[fp.stem].append(fp)
+    for name, these_fps in sorted(fps_by_text_name.items()):
+        if len(these_fps) > 1:
+            click.echo(f"Text name {name!r} is used by more than one file:")
+            for fp in these_fps:
+                click.echo(f"\t{fp}")
+            n_problems += 1
+            fps_with_problems.update(these_fps)
+
+    designations_by_fp = {fp: results[fp][1] for fp in fps}
+    for designation, locations in get_designation_problems_across_texts(designations_by_fp):
+        click.echo(f"Line designation {designation!r} is used in more than one text:")
+        for fp, line_number in locations:
+            click.echo(f"\t{fp}:{line_number}")
+        n_problems += 1
+        fps_with_problems.update(fp for fp, line_number in locations)
+
+    click.echo(f"\nChecked {len(fps)} files ({n_unchanged} unchanged since the last check). ", nl=False)
+    if n_problems == 0:
+        click.echo("No problems found.")
+    else:
+        click.echo(f"Found {n_problems} problems in {len(fps_with_problems)} files.")
+        ctx.exit(1)
+
+
+def record_check_results(fps_to_check, checked, results, cache):
+    for i, (fp, (size, mtime_ns, result)) in enumerate(zip(fps_to_check, checked)):
+        click.echo(f"checking file {i+1}/{len(fps_to_check)}\r", nl=False, err=True)
+        results[fp] = result
+        if cache is not None and size is not None:
+            cache.put(fp, size, mtime_ns, result)
+    if len(fps_to_check) > 0:
+        click.echo(err=True)
@@ -0,0 +1,75 @@
+# keyword-in-context view of every occurrence of a word, morpheme, or gloss in the corpus
+
+import click
+import shutil
+from pathlib import Path
+
+from colorama import Fore, Style
+
+from drybones.ColorUtil import SUB_HIGHLIGHT
+from drybones.Concordance import get_concordance, SORT_ORDERS, SORT_BY_RIGHT
+from drybones.DiacriticsUtil import get_char_to_alternatives_dict, translate_diacritic_alternatives_in_string
+from drybones.PrintingUtil import get_display_width
+from drybones.ProjectUtil import get_corpus_dir
+from drybones.RowLabel import DEFAULT_BASELINE_LABEL, DEFAULT_PARSE_LABEL, DEFAULT_GLOSS_LABEL, DEFAULT_LINE_DESIGNATION_LABEL
+from drybones.SearchIndex import get_search_index
+
+
+DEFAULT_CONCORDANCE_LABELS = [DEFAULT_BASELINE_LABEL.string, DEFAULT_PARSE_LABEL.string, DEFAULT_GLOSS_LABEL.string]
+TRUNCATION_STR = "…"
+
+
+@click.command(no_args_is_help=True)
+@click.argument("query")
+@click.option("--label", "-l", "labels", multiple=True, default=DEFAULT_CONCORDANCE_LABELS, show_default=True, help="Label of the rows to look in. Can be given more than once.")
+@click.option("--context", "-w", "n_context_tokens", type=click.IntRange(min=0), default=5, show_default=True, help="Number of words (or morphemes, with --morphemes) to show on each side.")
+@click.option("--sort", "sort_by", type=click.Choice(SORT_ORDERS), default=SORT_BY_RIGHT, show_default=True, help="Sort the occurrences by what comes after them (right) or before them (left).")
+@click.option("--morphemes", "-m", "split_morphemes", type=bool, is_flag=True, help="Split words into morphemes (at hyphens), so QUERY can be a single morpheme or gloss, and context is counted in morphemes.")
+@click.option("--no-pager", type=bool, is_flag=True, help="Print everything at once instead of showing it in a pager.")
+def concordance(query: str, labels: tuple, n_context_tokens: int, sort_by: str, split_morphemes: bool, no_pager: bool):
+    """Show every occurrence of QUERY (a word, morpheme, or gloss, or several of them separated by spaces) with the words around it."""
+    corpus_dir = get_corpus_dir(Path.cwd())
+    diacritic_dict = get_char_to_alternatives_dict()
+    search_index = get_search_index(corpus_dir, diacritic_dict, show_progress=True)
+    missing_labels = [label for label in labels if label not in search_index.row_ids_by_label]
+    if len(missing_labels) > 0:
+        click.echo(f"No rows labeled {', '.join(missing_labels)} in the corpus.", err=True)
+        labels = [label for label in labels if label in search_index.row_ids_by_label]
+        if len(labels) == 0:
+            click.echo(f"Labels in the corpus: {', '.join(sorted(search_index.row_ids_by_label))}", err=True)
+            raise click.Abort()
+    conc = get_concordance(search_index, list(labels), split_morphemes=split_morphemes)
+    normalized_query = translate_diacritic_alternatives_in_string(query, diacritic_dict, to_base=True)
+
+    n_occurrences = len(conc.get_occurrence_positions(normalized_query, sort_by=sort_by))
+    if n_occurrences == 0:
+        click.echo(f"No occurrences of {query!r} in rows labeled {', '.join(labels)}.")
+        return
+    click.echo(f"{n_occurrences} occurrence{'' if n_occurrences == 1 else 's'} of {query!r}, sorted by {sort_by} context:", err=True)
+
+    terminal_width = shutil.get_terminal_size().columns
+    left_width = max(10, (terminal_width - get_display_width(query)) // 2 - 1)
+    lines = iter_concordance_lines(conc, search_index, normalized_query, n_context_tokens, sort_by, left_width)
+    if no_pager:
+        for line in lines:
+            click.echo(line, nl=False)
+    else:
+        # the pager takes the lines as they're made, so it can show the first ones before the rest are ready
+        click.echo_via_pager(lines)
+
+
+def iter_concordance_lines(conc, search_index, normalized_query: str, n_context_tokens: int, sort_by: str, left_width: int):
+    for row_id, left, occurrence, right in conc.iter_occurrences(normalized_query, n_context_tokens, sort_by=sort_by):
+        left = truncate_left(left, left_width)
+        padding = " " * (left_width - get_display_width(left))
+        reference = f"{Fore.YELLOW}({DEFAULT_LINE_DESIGNATION_LABEL}: {search_index.row_designations[row_id]} / {search_index.row_labels[row_id]}){Style.RESET_ALL}"
+        yield f"{padding}{left}{SUB_HIGHLIGHT(occurrence)}{right}  {reference}\n"
+
+
+def truncate_left(s: str, width: int) -> str:
+    # keep the end of the string, since that's the part next to the occurrence
+    if get_display_width(s) <= width:
+        return s
+    while get_display_width(TRUNCATION_STR + s) > width:
+        s = s[1:]
+    return TRUNCATION_STR + s
@@ -0,0 +1,67 @@
+# running a background process that keeps the project's search index in memory, so one-shot `dry search` commands don't each have to load it
+
+import click
+from pathlib import Path
+
+from drybones.ProjectUtil import get_corpus_dir
+from drybones.SearchDaemon import SearchDaemon, query_search_daemon, start_search_daemon, get_search_daemon_socket_fp, DEFAULT_IDLE_TIMEOUT_MINUTES
+
+
+@click.group(no_args_is_help=True)
+def daemon():
+    """Run a background process to answer `dry search` queries quickly."""
+    pass
+
+
+@click.command(name="start")
+@click.option("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT_MINUTES, help=f"Stop the daemon after this many minutes without any queries (default: {DEFAULT_IDLE_TIMEOUT_MINUTES}).")
+def daemon_start(idle_timeout: float):
+    """Start the search daemon for the current project, if it isn't running already."""
+    corpus_dir = get_corpus_dir(Path.cwd())
+    if get_search_daemon_socket_fp(corpus_dir) is None:
+        click.echo("The search daemon can only be run inside a project, on a system with Unix domain sockets.", err=True)
+        raise click.Abort()
+    click.echo("Starting search daemon (loading the search index)...", err=True)
+    try:
+        status = start_search_daemon(corpus_dir, idle_timeout)
+    except (TimeoutError, RuntimeError) as e:
+        click.echo(str(e), err=True)
+        raise click.Abort()
+    echo_status(status)
+daemon.add_command(daemon_start)
+
+
+@click.command(name="stop")
+def daemon_stop():
+    """Stop the search daemon for the current project."""
+    corpus_dir = get_corpus_dir(Path.cwd())
+    if query_search_daemon(corpus_dir, {"command": "stop"}) is None:
+        click.echo("No search daemon is running for this project.", err=True)
+    else:
+        click.echo("Stopped search daemon.", err=True)
+daemon.add_command(daemon_stop)
+
+
+@click.command(name="status")
+def daemon_status():
+    """Show whether the search daemon is running for the current project."""
+    corpus_dir = get_corpus_dir(Path.cwd())
+    status = query_search_daemon(corpus_dir, {"command": "status"})
+    if status is None:
+        click.echo("No search daemon is running for this project.")
+    else:
+        echo_status(status)
+daemon.add_command(daemon_status)
+
+
+@click.command(name="run", hidden=True)
+@click.option("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT_MINUTES)
+def daemon_run(idle_timeout: float):
+    """Run the search daemon in the foreground (`dry daemon start` runs this in the background)."""
+    corpus_dir = get_corpus_dir(Path.cwd())
+    SearchDaemon(corpus_dir, idle_timeout).serve()
+daemon.add_command(daemon_run)
+
+
+def echo_status(status: dict) -> None:
+    click.echo(f"Search daemon is running for {status['corpus_dir']} (pid {status['pid']}), with {status['n_rows']} rows indexed. It will stop after {status['idle_timeout_minutes']:g} minutes without queries.")
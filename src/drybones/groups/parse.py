@@ -17,7 +17,7 @@ from drybones.OptionsUtil import get_ordered_suggestions, show_ordered_suggestio
 from drybones.Parse import Parse
 from drybones.ParsingUtil import UNKNOWN_GLOSS, MORPHEME_DELIMITER, WORD_DELIMITER
 from drybones.ProjectUtil import get_corpus_dir
-from drybones.ReadingUtil import get_lines_from_all_drybones_files_in_dir, get_drybones_file_from_text_name, validate_text_name
+from drybones.ReadingUtil import iter_lines_from_all_drybones_files_in_dir, get_drybones_file_from_text_name, validate_text_name
 from drybones.Row import Row
 from drybones.RowLabel import RowLabel, DEFAULT_LINE_DESIGNATION_LABEL, DEFAULT_ROW_LABELS_BY_STRING, DEFAULT_BASELINE_LABEL, DEFAULT_TRANSLATION_LABEL, DEFAULT_PARSE_LABEL, DEFAULT_GLOSS_LABEL, DEFAULT_PRODUCTION_LABEL, DEFAULT_JUDGMENT_LABEL
 from drybones.Validation import Validated, Invalidated
@@ -52,8 +52,10 @@ from drybones.WordAnalysis import WordAnalysis
 @click.argument("line_designation", required=False, type=str)
 @click.option("--shuffle", "-s", type=bool, is_flag=True, help="Shuffle the lines during parsing.")
 @click.option("--overwrite", "-w", type=bool, is_flag=True, help="Overwrite the input file. If false, a separate file will be created.")
+@click.option("--no-cache", type=bool, is_flag=True, help="Re-parse every .dry file instead of using the parsed copies cached in the project's .drybones dir.")
+@click.option("--workers", "-j", type=click.IntRange(min=1), default=None, help="Number of processes to use for parsing .dry files that aren't cached (default: one per CPU; 1 parses everything in this process).")
 @click.pass_context
-def parse(ctx, text_name, line_designation, shuffle, overwrite):
+def parse(ctx, text_name, line_designation, shuffle, overwrite, no_cache, workers):
     """Parse text contents."""
     corpus_dir = get_corpus_dir(Path.cwd())
     text_name_validation = validate_text_name(text_name, corpus_dir)
@@ -63,7 +65,7 @@ def parse(ctx, text_name, line_designation, shuffle, overwrite):
     click.echo(f"Parsing text {text_name}", err=True)
     drybones_fp = get_drybones_file_from_text_name(text_name, corpus_dir)
 
-    new_drybones_fp, lines, residues_by_location, line_designations_in_order, new_lines_by_designation, initial_hash = setup_file_editing_operation(drybones_fp, overwrite)
+    new_drybones_fp, lines, residues_by_location, line_designations_in_order, new_lines_by_designation, initial_hash = setup_file_editing_operation(drybones_fp, overwrite, use_cache=not no_cache)
 
     if line_designation is not None:
         try:
@@ -93,7 +95,7 @@ def parse(ctx, text_name, line_designation, shuffle, overwrite):
         else:
             click.echo(f"This file is already completely parsed and glossed ({len(lines)} lines, {len(lines_with_baselines)} with baselines).")
     else:
-        lines_from_all_files = get_lines_from_all_drybones_files_in_dir(corpus_dir)
+        lines_from_all_files = iter_lines_from_all_drybones_files_in_dir(corpus_dir, use_cache=not no_cache, n_workers=workers)  # only need to go through them once, to get the analyses
         known_analyses_by_word = get_known_analyses(lines_from_all_files)
         known_parses_by_word = get_known_parses(known_analyses_by_word)
         known_glosses_by_morpheme = get_known_glosses(known_analyses_by_word)
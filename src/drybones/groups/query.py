@@ -0,0 +1,46 @@
+# finding words by what's in their column across the aligned rows (Baseline, Parse, Gloss, ...) and by the line's other rows
+# unlike `dry search`, which only ever looks at one row at a time
+
+import click
+import itertools
+from pathlib import Path
+
+from colorama import Fore, Style
+
+from drybones.ColumnIndex import get_column_index, parse_column_query
+from drybones.DiacriticsUtil import get_char_to_alternatives_dict, translate_diacritic_alternatives_in_string
+from drybones.ProjectUtil import get_corpus_dir
+from drybones.RowLabel import DEFAULT_LINE_DESIGNATION_LABEL
+from drybones.SearchIndex import get_search_index
+
+
+@click.command(no_args_is_help=True)
+@click.argument("conditions", nargs=-1, required=True)
+@click.option("--limit", "-n", type=click.IntRange(min=0), default=None, help="Stop after this many results.")
+@click.option("--count", "-c", "count_only", type=bool, is_flag=True, help="Only print the number of matching words.")
+def query(conditions: tuple, limit: int|None, count_only: bool):
+    """Find words whose column meets every one of CONDITIONS. Each condition is a row label, then '=' or '~', then a value.
+    For aligned rows, '=' matches the whole cell and '~' matches one of its morphemes; morpheme conditions on rows with the same number of morphemes (like Parse and Gloss) have to be met by the same morpheme.
+    For other rows, the condition is about the whole line: '=' matches the whole row and '~' matches one of its words.
+    e.g. `dry query Parse~kha Gloss~irr.ss`, `dry query Baseline=akai Judgment=*`"""
+    try:
+        parsed_conditions = parse_column_query(list(conditions))
+    except ValueError as e:
+        click.echo(str(e), err=True)
+        raise click.Abort()
+
+    corpus_dir = get_corpus_dir(Path.cwd())
+    diacritic_dict = get_char_to_alternatives_dict()
+    search_index = get_search_index(corpus_dir, diacritic_dict, show_progress=True)
+    column_index = get_column_index(search_index)
+    # compared the same way as the index, with diacritics converted to base
+    normalized_conditions = [(label, operator, translate_diacritic_alternatives_in_string(value, diacritic_dict, to_base=True)) for label, operator, value in parsed_conditions]
+
+    column_ids = itertools.islice(column_index.iter_matching_columns(normalized_conditions), limit)
+    if count_only:
+        click.echo(sum(1 for _ in column_ids))
+        return
+    for column_id in column_ids:
+        cells = column_index.get_column_cells(column_id)
+        cells_str = " | ".join(f"{label}: {cell}" for label, cell in cells.items())
+        click.echo(f"{Fore.YELLOW}{DEFAULT_LINE_DESIGNATION_LABEL}: {column_index.get_column_designation(column_id)} (word {column_index.column_word_indices[column_id] + 1}):{Style.RESET_ALL} {cells_str}")
@@ -3,7 +3,8 @@
 import click
 from pathlib import Path
 
-from drybones.ReadingUtil import get_text_names_in_dir, get_lines_and_residues_from_text_name, validate_text_name, validate_line_number
+from drybones.LineIndex import get_line_index
+from drybones.ReadingUtil import get_text_names_in_dir, get_lines_and_residues_from_text_name, get_drybones_file_from_text_name, validate_text_name, validate_line_number
 from drybones.PrintingUtil import print_lines_in_pager, print_lines_in_terminal
 from drybones.ProjectUtil import get_corpus_dir
 from drybones.StringValidation import validate_string
@@ -12,10 +13,10 @@ from drybones.Validation import Validated, Invalidated
 
 @click.command(no_args_is_help=True)
 @click.argument("text_name")
-@click.argument("line_number", required=False, type=int)
+@click.argument("line", required=False)
 @click.pass_context
-def read(ctx, text_name: str, line_number: int):
-    """View text contents without editing."""
+def read(ctx, text_name: str, line: str|None):
+    """View text contents without editing. LINE (optional) is a line designation or a line number, e.g. `dry read T001 "T001 4"` or `dry read T001 4`; if a designation is also a number, the line with that designation is the one shown."""
     corpus_dir = get_corpus_dir(Path.cwd())
     text_name_validation = validate_text_name(text_name, corpus_dir)
     if text_name_validation is None or type(text_name_validation) is Invalidated:
@@ -23,19 +24,25 @@ def read(ctx, text_name: str, line_number: int):
     text_name = text_name_validation.match
     click.echo(f"Reading text {text_name}", err=True)
 
-    lines = get_lines_and_residues_from_text_name(text_name, corpus_dir).lines  # should make a cache so it's not re-parsing the whole text file every time user runs a command
-
-    line_numbers_to_read = None
-    if line_number is None:
-        # read the whole text, leave line numbers as None
-        pass
+    if line is None:
+        # read the whole text
+        lines = get_lines_and_residues_from_text_name(text_name, corpus_dir).lines
     else:
-        if type(validate_line_number(line_number, lines, text_name)) is Invalidated:
+        # only parse the line group we want, the line index says where it is in the file
+        fp = get_drybones_file_from_text_name(text_name, corpus_dir)
+        line_index = get_line_index(fp, corpus_dir)
+        # a designation first, since designations can be numbers too, then a line number
+        index = line_index.get_index_of_designation(line.strip())
+        if index is None:
+            try:
+                index = int(line) - 1
+            except ValueError:
+                click.echo(f"Text '{text_name}' has no line with designation {line!r}.", err=True)
+                return
+        if type(validate_line_number(index + 1, line_index, text_name)) is Invalidated:
             return
-        line_numbers_to_read = [line_number]
-    
-    if line_numbers_to_read is not None:
-        lines = [lines[i-1] for i in line_numbers_to_read]
+        lines = [line_index.read_line(index)]
+
     if len(lines) > 1:
         print_lines_in_pager(lines)
     else:
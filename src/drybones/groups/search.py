@@ -2,6 +2,9 @@
 # this is NOT about searching for row labels themselves; it is about the row contents
 
 import click
+import contextlib
+import itertools
+import json
 import os
 import yaml
 import shutil
@@ -15,87 +18,166 @@ from colorama import init as colorama_init
 from colorama import Fore, Back, Style
 colorama_init()
 
-from drybones.DiacriticsUtil import get_char_to_alternatives_dict, translate_diacritic_alternatives_in_string
+from drybones.BasicREPL import get_directive_from_command, NotACommandException, COMMAND_CHAR
+from drybones.BooleanQuery import BooleanQuery, parse_boolean_query, is_boolean_query, AND_KEYWORD, OR_KEYWORD, NOT_KEYWORD
+from drybones.DiacriticsUtil import get_char_to_alternatives_dict
 from drybones.InvalidInput import InvalidInput
 from drybones.ProjectUtil import get_corpus_dir
-from drybones.ReadingUtil import get_lines_from_all_drybones_files_in_dir
+from drybones.SearchDaemon import search_with_daemon, search_matches_with_daemon, count_matches_with_daemon
+from drybones.SearchIndex import get_search_index
+from drybones.SearchMacros import get_search_macros
+from drybones.SearchSession import SearchSession
+from drybones.SearchShardPool import SearchShardPool, SearchTimeoutException
+from drybones.SearchUtil import iter_search_matches, get_search_match_dict, get_fuzzy_query, is_regex_is_match
 from drybones.RowLabel import RowLabel, DEFAULT_LINE_DESIGNATION_LABEL
-from drybones.SearchResult import SearchResult
-from drybones.StringMatch import StringMatch
+from drybones.SearchResult import get_highlighted_string
 
 
-STRING_MATCH_MARKER = "m/"
-REGEX_SEARCH_MARKER = "r/"
-REGEX_MATCH_MARKER = "rm/"
-EXPLICIT_STRING_SEARCH_MARKER = "s/"
-
 REPEAT_CHAR, REPEAT_CHAR_INDEF, REPEAT_CHAR_PLURAL = ";", "a semicolon", "semicolons"
 # REPEAT_CHAR, REPEAT_CHAR_INDEF, REPEAT_CHAR_PLURAL = ":", "a colon", "colons"
 
 PROMPT_STR = "> "
 
+DEFAULT_REGEX_TIMEOUT_SECONDS = 10
+
 
 # @click.group(no_args_is_help=True)
 @click.command(no_args_is_help=False)
 @click.argument("row_query", required=False)
 @click.argument("text_query", required=False)
 @click.option("--interactive", "-i", type=bool, is_flag=True, help="Open an interactive session to run multiple search queries (one at a time) while keeping the corpus loaded into RAM.")
-def search(row_query: str, text_query: str, interactive: bool):
+@click.option("--no-cache", type=bool, is_flag=True, help="Re-parse every .dry file instead of using the parsed copies cached in the project's .drybones dir.")
+@click.option("--workers", "-j", type=click.IntRange(min=1), default=None, help="Number of processes to use for parsing .dry files that aren't cached (default: one per CPU; 1 parses everything in this process).")
+@click.option("--no-daemon", type=bool, is_flag=True, help="Load the search index here even if a search daemon (`dry daemon start`) is running for this project.")
+@click.option("--batch", "-b", type=bool, is_flag=True, help="Print each result as soon as it's found and exit, without asking which result to look at (for use in scripts and pipelines).")
+@click.option("--jsonl", type=bool, is_flag=True, help="In batch mode, print each result as a JSON object (text, designation, label, spans) on its own line. Implies --batch.")
+@click.option("--limit", "-n", type=click.IntRange(min=0), default=None, help="In batch mode, stop after this many results.")
+@click.option("--count", "-c", "count_only", type=bool, is_flag=True, help="Only print the number of matching rows. Implies --batch.")
+@click.option("--query", "-q", "boolean_query_str", type=str, default=None, help="Search whole lines with terms combined by AND, OR, NOT, and parentheses, where each term is a row query and a text query, e.g. -q 'Gloss fut AND Translation r/will AND NOT Judgment *'. Use instead of `row_query` and `text_query`.")
+@click.option("--parallel", "-p", type=int, default=None, help="Split the rows between this many processes to search them on more than one core (for very big corpora). The processes are started once and kept for the whole interactive session.")
+@click.option("--regex-timeout", type=float, default=DEFAULT_REGEX_TIMEOUT_SECONDS, show_default=True, help="Outside of batch mode, cancel a regex search that takes longer than this many seconds (e.g. because of catastrophic backtracking) while keeping the corpus loaded. 0 for no limit.")
+def search(row_query: str, text_query: str, interactive: bool, no_cache: bool, workers: int|None, no_daemon: bool, batch: bool, jsonl: bool, limit: int|None, count_only: bool, boolean_query_str: str|None, parallel: int|None, regex_timeout: float):
     # TODO test this function on various possibilities for m/, r/, rm/, and plain substring search (no marker)
-    """Search row contents using string/regex match. For `row_query` and `text_query`, begin the argument with 'm/' for simple full match, 'r/' for regex search, 'rm/' for regex full match, and nothing for simple string search (or 's/' to force simple string search in order to escape special characters). While this function is being developed and tested, you will probably get better results from just using `grep` or another well-established regex search function."""
+    """Search row contents using string/regex match. For `row_query` and `text_query`, begin the argument with 'm/' for simple full match, 'r/' for regex search, 'rm/' for regex full match, and nothing for simple string search (or 's/' to force simple string search in order to escape special characters). `text_query` can also begin with 'f/' for fuzzy search, which finds the words and morphemes within edit distance 1 of the rest of the query (or 'f2/' for distance 2, and so on). Search macros defined under `search-macros` in the project config (or the global config) can be used in either query by putting their name in square brackets, e.g. 'r/[DS]$'. While this function is being developed and tested, you will probably get better results from just using `grep` or another well-established regex search function."""
+
+    qsum = (row_query is not None) + (text_query is not None)
+    if qsum == 1:
+        click.echo("`row_query` and `text_query` should either both be passed or both be omitted", err=True)
+        raise click.Abort()
+    boolean_query = None
+    if boolean_query_str is not None:
+        if qsum > 0:
+            click.echo("--query is used instead of `row_query` and `text_query`, not with them", err=True)
+            raise click.Abort()
+        try:
+            boolean_query = parse_boolean_query(boolean_query_str)
+        except ValueError as e:
+            click.echo(f"invalid query: {e}", err=True)
+            raise click.Abort()
+        qsum = 2
+    batch = batch or jsonl or count_only
+    if batch and (qsum == 0 or interactive):
+        click.echo("batch mode (--batch, --jsonl, --count) needs `row_query` and `text_query`, and can't be used with --interactive", err=True)
+        raise click.Abort()
+    if limit is not None and not batch:
+        click.echo("--limit only works in batch mode (--batch, --jsonl, --count)", err=True)
+        raise click.Abort()
 
     corpus_dir = get_corpus_dir(Path.cwd())
+    try:
+        macros = get_search_macros(corpus_dir)
+    except ValueError as e:
+        click.echo(f"invalid search macros: {e}", err=True)
+        raise click.Abort()
+    if qsum == 2 and (batch or not interactive):
+        # the session expands its own queries, but the daemon and the batch search get them already expanded
+        try:
+            if boolean_query is not None:
+                expanded_boolean_query = macros.expand_search_query(boolean_query)
+            else:
+                expanded_row_query, expanded_text_query = macros.expand_search_query((row_query, text_query))
+        except re.error as e:
+            click.echo(f"invalid regex: {e}", err=True)
+            raise click.Abort()
+    if batch:
+        # only the results go to stdout, nothing else that would get in the way of piping them somewhere
+        if boolean_query is not None:
+            boolean_query = expanded_boolean_query
+        else:
+            row_query, text_query = expanded_row_query, expanded_text_query
+        run_batch_search(corpus_dir, row_query, text_query, boolean_query=boolean_query, jsonl=jsonl, limit=limit, count_only=count_only, use_daemon=not (no_daemon or no_cache), no_cache=no_cache, workers=workers, parallel=parallel, patterns=macros.patterns)
+        return
     print(f"{corpus_dir = }")
-    lines_from_all_files = get_lines_from_all_drybones_files_in_dir(corpus_dir)
-    diacritic_dict = get_char_to_alternatives_dict()
-    click.echo()  # to add space between the "loaded lines from ..." and the input prompt
 
-    qsum = (row_query is not None) + (text_query is not None)
-    if qsum == 0:
-        # open an interactive session, whether the user specified -i or not
-        run_interactive_search_session(lines_from_all_files, diacritic_dict)
-    elif qsum == 2:
-        # do a search query immediately based on the args passed
-        if interactive:
-            # do the initial query and then continue as an interactive session
-            run_interactive_search_session(lines_from_all_files, diacritic_dict, initial_row_query=row_query, initial_text_query=text_query)
-        else:
+    # the daemon can't cancel a regex that runs too long, so with a timeout, regexes are searched here (in the session's worker) instead
+    regex_needs_timeout = regex_timeout > 0 and qsum == 2 and not interactive and boolean_query is None and is_regex_is_match(expanded_text_query)[0]
+    if qsum == 2 and not interactive and not no_daemon and not no_cache and boolean_query is None and not regex_needs_timeout:
+        # the daemon already has the index loaded, if it's running
+        try:
+            search_results = search_with_daemon(corpus_dir, expanded_row_query, expanded_text_query)
+        except RuntimeError as e:
+            click.echo(str(e), err=True)
+            raise click.Abort()
+        if search_results is not None:
+            echo_search_query_description(expanded_row_query, expanded_text_query)
+            process_search_results(search_results)
+            return
+
+    # the search index has the contents of every row, so the lines themselves are only loaded for the files that have search results in them
+    with SearchSession(corpus_dir, macros, use_cache=not no_cache, n_workers=workers, n_search_processes=parallel, regex_timeout=regex_timeout if regex_timeout > 0 else None) as session:
+        if qsum == 2 and not interactive:
             # do this query only, do not continue into interactive session
-            search_results = run_search_query(row_query, text_query, lines_from_all_files, diacritic_dict)
+            try:
+                search_results = run_search_query((row_query, text_query) if boolean_query is None else boolean_query, session)
+            except SearchTimeoutException as e:
+                click.echo(str(e), err=True)
+                raise click.Abort()
             process_search_results(search_results)
-    else:
-        click.echo("`row_query` and `text_query` should either both be passed or both be omitted", err=True)
-        raise click.Abort()
+            return
+
+        click.echo()  # to add space between the "loaded lines from ..." and the input prompt
+        if qsum == 0:
+            # open an interactive session, whether the user specified -i or not
+            run_interactive_search_session(session)
+        elif boolean_query is not None:
+            run_interactive_search_session(session, initial_boolean_query=boolean_query)
+        else:
+            # do the initial query and then continue as an interactive session
+            run_interactive_search_session(session, initial_row_query=row_query, initial_text_query=text_query)
 
     # TODO print with highlighted 
     # TODO add flag for case-insensitive
-    # TODO add custom pseudo-chars user can define, like [DS] to be replaced with regex "(pa|mana|ne|p[ui](n)a)"
 
 
-def run_interactive_search_session(lines_from_all_files, diacritic_dict, initial_row_query=None, initial_text_query=None):
+def run_interactive_search_session(session, initial_row_query=None, initial_text_query=None, initial_boolean_query=None):
     last_row_query = None
     last_text_query = None
+    last_query = None  # the last search that was run: a (row query, text query) pair or a BooleanQuery
 
     if (initial_row_query is not None) or (initial_text_query is not None):
         if not ((initial_row_query is not None) and (initial_text_query is not None)):
             click.echo("`row_query` and `text_query` should either both be passed or both be omitted", err=True)
             raise click.Abort()
         run_initial = True
+    elif initial_boolean_query is not None:
+        run_initial = True
     else:
         run_initial = False
 
     while True:
         if run_initial:
-            row_query = initial_row_query
-            text_query = initial_text_query
+            query = initial_boolean_query if initial_boolean_query is not None else (initial_row_query, initial_text_query)
             run_initial = False
         else:
             try:
-                query_from_user = get_query_from_user(last_row_query, last_text_query)
+                query_from_user = get_query_from_user(last_row_query, last_text_query, last_query)
                 if query_from_user is InvalidInput:
                     continue
+                elif type(query_from_user) is list:
+                    run_search_session_directive(session, query_from_user)
+                    continue
                 else:
-                    row_query, text_query = query_from_user
+                    query = query_from_user
             except KeyboardInterrupt:
                 click.echo("\n")
                 continue
@@ -103,46 +185,124 @@ def run_interactive_search_session(lines_from_all_files, diacritic_dict, initial
                 click.echo("\nQuitting search session.")
                 return
         
-        search_results = run_search_query(row_query, text_query, lines_from_all_files, diacritic_dict)
-        last_row_query = row_query
-        last_text_query = text_query
+        try:
+            search_results = run_search_query(query, session)
+        except re.error as e:
+            click.echo(f"invalid regex: {e}\n")
+            continue
+        except SearchTimeoutException as e:
+            # the corpus is still loaded, only the search workers were replaced
+            click.echo(f"{e}. Try a regex that does less backtracking, or a longer --regex-timeout.\n")
+            continue
+        except KeyboardInterrupt:
+            click.echo("\nSearch cancelled.\n")
+            continue
+        if type(query) is not BooleanQuery:
+            last_row_query, last_text_query = query
+        last_query = query
         process_search_results(search_results)
         click.echo()
 
 
-def run_search_query(row_query, text_query, lines_from_all_files, diacritic_dict):
-    row_query_is_regex, row_query_is_match, row_query_stripped = is_regex_is_match(row_query)
-    text_query_is_regex, text_query_is_match, text_query_stripped = is_regex_is_match(text_query)
+def run_search_session_directive(session, directive: List[str]) -> None:
+    if directive == ["reload"]:
+        click.echo("Checking for changed files...")
+        try:
+            changed_fps, n_forgotten = session.reload()
+        except ValueError as e:
+            click.echo(f"invalid search macros: {e}\n")
+            return
+        if len(changed_fps) == 0:
+            click.echo("No files have changed.\n")
+        else:
+            click.echo(f"Reloaded {len(changed_fps)} changed file{'' if len(changed_fps) == 1 else 's'}: {', '.join(fp.name for fp in changed_fps)}")
+            click.echo(f"Forgot the results of {n_forgotten} earlier quer{'y' if n_forgotten == 1 else 'ies'} that the changes could affect.\n")
+    else:
+        click.echo(f"unknown command {' '.join(directive)!r}; available commands: {COMMAND_CHAR}reload (load any changes to the corpus files)\n")
+
+
+def run_batch_search(corpus_dir, row_query, text_query, boolean_query, jsonl: bool, limit: int|None, count_only: bool, use_daemon: bool, no_cache: bool, workers: int|None, parallel: int|None, patterns: dict|None=None):
+    # the daemon only runs single (row query, text query) pairs
+    use_daemon = use_daemon and boolean_query is None
+    try:
+        if count_only:
+            n = count_matches_with_daemon(corpus_dir, row_query, text_query, limit) if use_daemon else None
+            if n is None:
+                search_index = get_search_index(corpus_dir, get_char_to_alternatives_dict(), use_cache=not no_cache, n_workers=workers)
+                # just counting, so no result objects or lines needed at all
+                with get_search_shard_pool(search_index, parallel) or contextlib.nullcontext() as pool:
+                    n = sum(1 for _ in itertools.islice(iter_local_search_matches(row_query, text_query, boolean_query, search_index, pool, patterns), limit))
+            click.echo(n)
+            return
+
+        match_dicts = search_matches_with_daemon(corpus_dir, row_query, text_query, limit) if use_daemon else None
+        if match_dicts is None:
+            search_index = get_search_index(corpus_dir, get_char_to_alternatives_dict(), use_cache=not no_cache, n_workers=workers)
+            with get_search_shard_pool(search_index, parallel) or contextlib.nullcontext() as pool:
+                for row_id, spans in itertools.islice(iter_local_search_matches(row_query, text_query, boolean_query, search_index, pool, patterns), limit):
+                    echo_search_match(get_search_match_dict(search_index, row_id, spans), jsonl)
+            return
+        for match_dict in match_dicts:
+            echo_search_match(match_dict, jsonl)
+    except RuntimeError as e:
+        # from the search daemon
+        click.echo(str(e), err=True)
+        raise click.Abort()
+    except re.error as e:
+        click.echo(f"invalid regex: {e}", err=True)
+        raise click.Abort()
 
-    click.echo(f"Searching rows labeled with {'regex' if row_query_is_regex else 'string'} {row_query_stripped!r} ({'full match' if row_query_is_match else 'partial search'}) for {'regex' if text_query_is_regex else 'string'} {text_query_stripped!r} ({'full match' if text_query_is_match else 'partial search'}).\n")
 
-    # later possible optimization: only get the rows that match in the first place, don't get all rows from all files
+def iter_local_search_matches(row_query, text_query, boolean_query, search_index, pool, patterns):
+    # patterns is the queries' regexes already compiled when their macros were expanded (SearchMacros.patterns)
+    if boolean_query is not None:
+        return boolean_query.iter_matches(search_index, pool=pool, patterns=patterns)
+    return iter_search_matches(row_query, text_query, search_index, pool=pool, patterns=patterns)
 
-    # TODO add option for user to require matching diacritics (e.g. imagine searching a corpus of Vietnamese and you don't want all the words that differ only in diacritics from your query)
-    convert = lambda s: translate_diacritic_alternatives_in_string(s, diacritic_dict, to_base=True)
 
-    row_match_func = lambda test_str: get_regex_matches(row_query_stripped, convert(test_str), full_match=row_query_is_match) if row_query_is_regex else get_string_matches(row_query_stripped, convert(test_str), full_match=row_query_is_match)
-    text_match_func = lambda test_str: get_regex_matches(text_query_stripped, convert(test_str), full_match=text_query_is_match) if text_query_is_regex else get_string_matches(text_query_stripped, convert(test_str), full_match=text_query_is_match)
+def echo_search_match(match_dict: dict, jsonl: bool) -> None:
+    if jsonl:
+        click.echo(json.dumps(match_dict, ensure_ascii=False))
+    else:
+        # same as print_search_results() but without the numbers; the colors are left out automatically when not printing to a terminal
+        highlighted = get_highlighted_string(match_dict["text"], match_dict["spans"])
+        click.echo(f"{Fore.YELLOW}{DEFAULT_LINE_DESIGNATION_LABEL}: {match_dict['designation']} / {match_dict['label']}:{Style.RESET_ALL} {highlighted}")
+
 
-    rows_to_search = []
-    for line in lines_from_all_files:
-        for row in line.rows:
-            matches = row_match_func(row.label.string)
-            if len(matches) > 0:
-                tup = (row, line)  # want reference back to the parent line so user can see where it is
-                rows_to_search.append(tup)
+def get_search_shard_pool(search_index, n_processes: int|None) -> SearchShardPool | None:
+    if n_processes is None or n_processes <= 1:
+        return None
+    return SearchShardPool(search_index, n_processes)
 
-    search_results = []
-    for row, line in rows_to_search:
-        contents = row.get_contents()
-        matches = text_match_func(contents)
-        if len(matches) > 0:
-            sr = SearchResult(string=contents, spans=[m.span() for m in matches], row=row, line=line)
-            search_results.append(sr)
 
+def run_search_query(query, session):
+    # query is a (row query, text query) pair or a BooleanQuery
+    # raises re.error if a macro makes an invalid regex with the rest of the query
+    query = session.expand_search_query(query)
+    if type(query) is BooleanQuery:
+        click.echo(f"Searching lines for {query}.\n")
+        search_results, from_cache = session.search_boolean(query)
+    else:
+        row_query, text_query = query
+        echo_search_query_description(row_query, text_query)
+        search_results, from_cache = session.search(row_query, text_query)
+    if from_cache:
+        click.echo(f"(These are the results from when this query was run earlier in the session. Type {COMMAND_CHAR}reload to load any changes to the corpus files since then.)")
     return search_results
 
 
+def echo_search_query_description(row_query, text_query):
+    row_query_is_regex, row_query_is_match, row_query_stripped = is_regex_is_match(row_query)
+    text_query_is_regex, text_query_is_match, text_query_stripped = is_regex_is_match(text_query)
+    fuzzy_query = get_fuzzy_query(text_query)
+    if fuzzy_query is not None:
+        word, max_distance = fuzzy_query
+        text_description = f"words and morphemes within edit distance {max_distance} of {word!r}"
+    else:
+        text_description = f"{'regex' if text_query_is_regex else 'string'} {text_query_stripped!r} ({'full match' if text_query_is_match else 'partial search'})"
+    click.echo(f"Searching rows labeled with {'regex' if row_query_is_regex else 'string'} {row_query_stripped!r} ({'full match' if row_query_is_match else 'partial search'}) for {text_description}.\n")
+
+
 def print_search_results(search_results):
     if len(search_results) > 0:
         click.echo("\nSearch results:\n")
@@ -153,10 +313,16 @@ def print_search_results(search_results):
         click.echo("\nNo results found.")
 
 
-def get_query_from_user(last_row_query, last_text_query):
-    click.echo(f"Type your row and text queries, separated by space. Use quotation marks around either of these if it contains spaces. To repeat the last row or text query, type {REPEAT_CHAR_INDEF} ({REPEAT_CHAR}) as the query. To repeat the last search, type {REPEAT_CHAR_PLURAL} ({REPEAT_CHAR*2}).")
+def get_query_from_user(last_row_query, last_text_query, last_query=None):
+    click.echo(f"Type your row and text queries, separated by space. Use quotation marks around either of these if it contains spaces. To search whole lines, combine several row and text query pairs with {AND_KEYWORD}, {OR_KEYWORD}, {NOT_KEYWORD}, and parentheses. To repeat the last row or text query, type {REPEAT_CHAR_INDEF} ({REPEAT_CHAR}) as the query. To repeat the last search, type {REPEAT_CHAR_PLURAL} ({REPEAT_CHAR*2}). To load changes made to the corpus files during the session, type {COMMAND_CHAR}reload.")
     raw = prompt("query")
+    try:
+        return get_directive_from_command(raw.strip())
+    except NotACommandException:
+        pass
     if raw.replace(" ", "") == REPEAT_CHAR*2:  # because shlex will split on arbitrary number of spaces, and we want "; ;" to behave the same as ";;" (where ';' is the REPEAT_CHAR)
+        if type(last_query) is BooleanQuery:
+            return last_query
         if last_row_query is None and last_text_query is None:
             click.echo("Last row and text query must both be defined, but neither is.\n")
             return InvalidInput
@@ -170,7 +336,18 @@ def get_query_from_user(last_row_query, last_text_query):
             return last_row_query, last_text_query
     else:
         try:
-            row_query, text_query = shlex.split(raw)  # preserve quoted substrings that have space in them
+            tokens = shlex.split(raw)  # preserve quoted substrings that have space in them
+        except ValueError:
+            click.echo("invalid input\n")
+            return InvalidInput
+        if is_boolean_query(tokens):
+            try:
+                return parse_boolean_query(raw)
+            except ValueError as e:
+                click.echo(f"invalid query: {e}\n")
+                return InvalidInput
+        try:
+            row_query, text_query = tokens
         except ValueError:
             click.echo("invalid input\n")
             return InvalidInput
@@ -191,63 +368,6 @@ def get_query_from_user(last_row_query, last_text_query):
     return row_query, text_query
 
 
-def strip_marker(original_s, enforce_only_one_marker=False):
-    s = original_s
-    
-    if s.startswith(EXPLICIT_STRING_SEARCH_MARKER):
-        # this one behaves differently: if the string starts with it, accept the rest as a raw string and don't check for other markers; who knows, maybe user wants to search for the actual string "r/a" or something that we don't want the command to parse
-        # doesn't matter if enforce_only_one_marker is true
-        return s[len(EXPLICIT_STRING_SEARCH_MARKER):]
-    # otherwise, check for the other special markers
-    
-    already_changed = False  # for enforcing only one marker on the string        
-    for marker in [STRING_MATCH_MARKER, REGEX_SEARCH_MARKER, REGEX_MATCH_MARKER]:
-        if enforce_only_one_marker:
-            s, changed = strip_single_marker(s, marker)
-            if already_changed and changed:
-                raise ValueError(f"string {original_s!r} starts with more than one special marker for regex/match functionality")
-            elif changed:
-                already_changed = True
-        else:
-            # just take the first one
-            s, changed = strip_single_marker(s, marker)
-            if changed:
-                break
-    return s
-
-
-def is_regex_is_match(s):
-    is_regex = s.startswith(REGEX_SEARCH_MARKER) or s.startswith(REGEX_MATCH_MARKER)
-    is_match = s.startswith(STRING_MATCH_MARKER) or s.startswith(REGEX_MATCH_MARKER)
-    s_stripped = strip_marker(s)
-    return is_regex, is_match, s_stripped
-
-
-def strip_single_marker(s, marker):
-    return (s[len(marker):], True) if s.startswith(marker) else (s, False)
-
-
-def get_regex_matches(pattern, test_string, full_match: bool) -> List[re.Match]:
-    if full_match:
-        m = re.fullmatch(pattern, test_string)
-        return [m] if m is not None else []
-    else:
-        # list of re.Match objects
-        return list(re.finditer(pattern, test_string))
-
-
-def get_string_matches(pattern, test_string, full_match: bool) -> List[StringMatch]:
-    if full_match:
-        return [StringMatch(test_string, 0, len(test_string))] if pattern == test_string else []
-    else:
-        matches = []
-        for i in range(len(test_string) - len(pattern) + 1):
-            substring = test_string[i : i+len(pattern)]
-            if substring == pattern:
-                matches.append(StringMatch(test_string, i, i+len(pattern)))
-        return matches
-
-
 def process_search_results(search_results):
     print_search_results(search_results)
     while True:
@@ -76,13 +76,17 @@ def print_help(ctx=None, subcommand=None):
 
 from drybones.groups.accent import accent as accent_group
 from drybones.groups.analyze import analyze as analyze_group
+from drybones.groups.check import check as check_group
+from drybones.groups.concordance import concordance as concordance_group
 from drybones.groups.config import config as config_group
+from drybones.groups.daemon import daemon as daemon_group
 from drybones.groups.edit import edit as edit_group
 from drybones.groups.enter import enter as enter_group
 from drybones.groups.map import map as map_group
 from drybones.groups.merge import merge as merge_group
 from drybones.groups.parse import parse as parse_group
 from drybones.groups.project import project as project_group
+from drybones.groups.query import query as query_group
 from drybones.groups.read import read as read_group
 from drybones.groups.search import search as search_group
 from drybones.groups.text import text as text_group
@@ -90,13 +94,17 @@ from drybones.groups.wrap import wrap as wrap_group
 
 main.add_command(accent_group)
 main.add_command(analyze_group)
+main.add_command(check_group)
+main.add_command(concordance_group)
 main.add_command(config_group)
+main.add_command(daemon_group)
 main.add_command(edit_group)
 main.add_command(enter_group)
 main.add_command(map_group)
 main.add_command(merge_group)
 main.add_command(parse_group)
 main.add_command(project_group)
+main.add_command(query_group)
 main.add_command(read_group)
 main.add_command(search_group)
 main.add_command(text_group)